@@ -0,0 +1,193 @@
+# analysis/bet.py
+"""
+Multipoint BET for whole batches of stored isotherms, with the fit range
+chosen automatically by the Rouquerol criteria.
+
+For every sample, every contiguous window [i, j] of adsorption points is a
+candidate fit of the linear BET form
+
+    p / (v (1 - p)) = 1 / (v_m C) + (C - 1) / (v_m C) * p
+
+Window regressions come from prefix sums, so all windows of all samples are
+one set of (n, m, m) array expressions. A window is accepted when
+
+    1. it ends at or below the maximum of v (1 - p)     (Rouquerol 1)
+    2. C > 0                                             (Rouquerol 2)
+    3. p_m = 1 / (sqrt(C) + 1) lies inside the window    (Rouquerol 3)
+    4. p at v = v_m on the isotherm is within 10% of p_m (Rouquerol 4)
+    and it has at least MIN_POINTS points between P_MIN and P_MAX.
+
+The accepted window with the most points wins, then the one with the best R².
+The surface area is v_m times the adsorbate area from sample_info
+(吸附质面积[m^2/cc], N2 = 4.353 if missing).
+
+    python -m analysis.bet adsorption.db [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import time
+
+import numpy as np
+
+from analysis.isotherm_data import (IsothermBatch, as_floats, info_values, interp_rows, load_isotherms,
+                                    result_values, write_results)
+
+N2_AREA = 4.353            # m^2 per cc(STP), 0.162 nm^2 per N2 molecule
+MIN_POINTS = 3
+P_MIN = 1e-3               # micropore-filling points below this never fit BET
+P_MAX = 0.5
+CHUNK = 500                # samples per (n, m, m) block
+
+RESULT_AREA = "BET Surface Area (calc) [m^2/g]"
+RESULT_C = "BET C (calc)"
+RESULT_VM = "BET Monolayer Volume (calc) [cc/g]"
+RESULT_R2 = "BET R^2 (calc)"
+RESULT_RANGE = "BET Range (calc) [P/P0]"
+RESULT_DELTA = "BET vs vendor (calc) [%]"
+VENDOR_AREA = "%多点BET比表面积%"
+
+
+@dataclass
+class BetResult:
+    ids: np.ndarray
+    names: list[str]
+    area: np.ndarray          # (n,) m^2/g, NaN = no valid window
+    c: np.ndarray
+    v_m: np.ndarray           # cc(STP)/g
+    r2: np.ndarray
+    p_lo: np.ndarray
+    p_hi: np.ndarray
+    n_points: np.ndarray      # (n,) int
+
+    def ok(self) -> np.ndarray:
+        return np.isfinite(self.area)
+
+
+def _fit_chunk(P: np.ndarray, V: np.ndarray, min_points: int, p_min: float, p_max: float):
+    """Best Rouquerol window for each row of P/V (NaN padded, ascending P)."""
+    n = P.shape[0]
+    usable = np.isfinite(P) & np.isfinite(V) & (P >= p_min) & (P <= p_max) & (V > 0)
+    # push unusable points to the end of each row so usable ones are contiguous
+    order = np.argsort(~usable, axis=1, kind="stable")
+    P = np.take_along_axis(np.where(usable, P, np.nan), order, axis=1)
+    V = np.take_along_axis(np.where(usable, V, np.nan), order, axis=1)
+    cnt = usable.sum(axis=1)
+    m = max(int(cnt.max()) if n else 0, 1)
+    P, V = P[:, :m], V[:, :m]
+
+    x = P
+    y = P / (V * (1.0 - P))
+    zero = np.zeros((n, 1))
+
+    def csum(a):
+        return np.concatenate([zero, np.cumsum(np.nan_to_num(a), axis=1)], axis=1)   # (n, m+1)
+
+    Sx, Sy, Sxx, Sxy, Syy = csum(x), csum(y), csum(x * x), csum(x * y), csum(y * y)
+    i = np.arange(m)[:, None]            # window start
+    j = np.arange(m)[None, :]            # window end (inclusive)
+
+    def win(S):
+        return S[:, None, 1:] - S[:, :m, None]      # sum over [i, j] -> (n, i, j)
+
+    k = (j - i + 1).astype(float)[None]
+    sx, sy, sxx, sxy, syy = win(Sx), win(Sy), win(Sxx), win(Sxy), win(Syy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vx = sxx - sx * sx / k
+        vy = syy - sy * sy / k
+        cxy = sxy - sx * sy / k
+        slope = cxy / vx
+        icpt = (sy - slope * sx) / k
+        r2 = cxy * cxy / (vx * vy)
+        v_m = 1.0 / (slope + icpt)
+        c = 1.0 + slope / icpt
+        p_m = 1.0 / (np.sqrt(c) + 1.0)
+
+    # Rouquerol 1: window ends at or before the maximum of v (1 - p)
+    vq = np.where(np.isfinite(V), V * (1.0 - P), -np.inf)
+    jmax = np.argmax(vq, axis=1)
+    p_lo = P[:, :, None] * np.ones((1, 1, m))
+    p_hi = P[:, None, :] * np.ones((1, m, 1))
+    valid = (j >= i)[None] & (k >= min_points) & (j[None] < cnt[:, None, None]) & (j[None] <= jmax[:, None, None])
+    valid &= (icpt > 0) & (slope > 0) & (c > 0)                   # Rouquerol 2
+    valid &= (p_m >= p_lo) & (p_m <= p_hi)                         # Rouquerol 3
+    # Rouquerol 4: pressure where the measured isotherm reaches v_m
+    Vmono = np.fmax.accumulate(np.where(np.isfinite(V), V, -np.inf), axis=1)
+    Vmono = np.where(np.isfinite(V), Vmono, np.nan)
+    p_at_vm = interp_rows(np.where(valid, v_m, np.nan).reshape(n, -1), Vmono, P).reshape(n, m, m)
+    valid &= np.abs(p_at_vm - p_m) <= 0.1 * p_m
+
+    # most points, then best R^2
+    score = np.where(valid, k * 10.0 + np.nan_to_num(r2), -np.inf).reshape(n, -1)
+    best = np.argmax(score, axis=1)
+    found = np.isfinite(score[np.arange(n), best])
+    bi, bj = np.divmod(best, m)
+    rows = np.arange(n)
+
+    def pick(a):
+        return np.where(found, a[rows, bi, bj], np.nan)
+
+    return (pick(v_m), pick(c), pick(r2), np.where(found, P[rows, bi], np.nan),
+            np.where(found, P[rows, bj], np.nan), np.where(found, bj - bi + 1, 0))
+
+
+def compute(batch: IsothermBatch, cross_section=None, min_points: int = MIN_POINTS,
+            p_min: float = P_MIN, p_max: float = P_MAX) -> BetResult:
+    """BET for every sample of the batch; cross_section: (n,) m^2/cc, default N2."""
+    n = len(batch)
+    out = [np.full(n, np.nan) for _ in range(5)] + [np.zeros(n, dtype=int)]
+    for s in range(0, n, CHUNK):
+        part = _fit_chunk(batch.p_ads[s:s + CHUNK], batch.v_ads[s:s + CHUNK], min_points, p_min, p_max)
+        for dst, src in zip(out, part):
+            dst[s:s + CHUNK] = src
+    v_m, c, r2, p_lo, p_hi, npts = out
+    sigma = np.full(n, N2_AREA) if cross_section is None else np.where(np.isfinite(cross_section),
+                                                                          cross_section, N2_AREA)
+    return BetResult(batch.ids, batch.names, v_m * sigma, c, v_m, r2, p_lo, p_hi, npts)
+
+
+def run(conn, names=None, min_points: int = MIN_POINTS) -> BetResult:
+    batch = load_isotherms(conn, names)
+    sigma = as_floats(info_values(conn, batch.ids, "%吸附质面积%"), batch.ids)
+    return compute(batch, sigma, min_points)
+
+
+def write_bet(conn, result: BetResult) -> int:
+    """Store the BET results next to the vendor values; returns the number of samples written."""
+    vendor = as_floats(result_values(conn, result.ids, VENDOR_AREA), result.ids)
+    values = {}
+    for i in np.flatnonzero(result.ok()):
+        row = {
+            RESULT_AREA: round(float(result.area[i]), 4),
+            RESULT_C: round(float(result.c[i]), 3),
+            RESULT_VM: round(float(result.v_m[i]), 5),
+            RESULT_R2: round(float(result.r2[i]), 6),
+            RESULT_RANGE: f"{result.p_lo[i]:.4g}–{result.p_hi[i]:.4g} ({result.n_points[i]} pts)",
+        }
+        if np.isfinite(vendor[i]) and vendor[i] > 0:
+            row[RESULT_DELTA] = round(float((result.area[i] - vendor[i]) / vendor[i] * 100.0), 2)
+        values[int(result.ids[i])] = row
+    write_results(conn, values)
+    conn.commit()
+    return len(values)
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Rouquerol multipoint BET for stored isotherms")
+    ap.add_argument("db")
+    ap.add_argument("--samples", nargs="*", help="sample names (default: all)")
+    ap.add_argument("--write", action="store_true", help="store results in sample_results")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.samples)
+    print(f"⏱ BET for {len(res.ids)} samples in {time.perf_counter() - t0:.2f}s, {int(res.ok().sum())} valid")
+    vendor = as_floats(result_values(conn, res.ids, VENDOR_AREA), res.ids)
+    for k, name in enumerate(res.names):
+        print(f"  {name}: S = {res.area[k]:.1f} m2/g (vendor {vendor[k]:.1f}), C = {res.c[k]:.1f}, "
+              f"R2 = {res.r2[k]:.5f}, P/P0 {res.p_lo[k]:.4g}-{res.p_hi[k]:.4g} ({res.n_points[k]} pts)")
+    if opts.write:
+        print(f"💾 {write_bet(conn, res)} samples written")
@@ -0,0 +1,202 @@
+# analysis/bjh.py
+"""
+BJH pore-size analysis of the adsorption and desorption branches for
+batches of samples.
+
+Both branches are read at the pressures of a shared, log-spaced grid of pore
+diameters (D_MIN..D_MAX). Going from high to low pressure, each step empties
+the pores whose diameter d = 2 (r_k + t) lies in the step, after removing
+the volume released by film thinning in the pores already emptied
+(Barrett, Joyner & Halenda, cylindrical pores):
+
+    r_k = KELVIN / -ln(p)                      N2 at 77 K, nm
+    dVp = (r_p / (r_k + dt/2))^2 * (dV - dt * sum_j c_j dA_j)
+    dA  = 2 dVp / r_p,   c_j = (r_p_j - t) / r_p_j
+
+The step loop is over grid bins, with every sample of the batch updated at
+once. Each sample's result (the cumulative values and the mode diameter for
+d > 2 nm as in the vendor BJH fields, plus its dV/dlog(d) curve) is cached under a hash of its
+isotherm. Repeated views and exports therefore only recompute changed data.
+
+    python -m analysis.bjh adsorption.db [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import time
+
+import numpy as np
+
+from analysis import cache
+from analysis.isotherm_data import IsothermBatch, as_floats, interp_rows, load_isotherms, result_values, write_results
+from analysis.micropore import GAS_TO_LIQUID, THICKNESS
+
+KELVIN = 0.9545            # 2 γ V_m / RT for N2 at 77.35 K [nm]
+D_MIN, D_MAX = 1.7, 300.0  # nm
+N_BINS = 80
+D_CUT = 2.0                # cumulative values are for d > 2 nm
+BRANCHES = ("ads", "des")
+RESULT_VERSION = 2         # bump when compute() changes, so cached results are recomputed
+
+RESULT_NAMES = {
+    "area": "BJH {branch} (calc) cumulative area d>2nm [m^2/g]",
+    "volume": "BJH {branch} (calc) cumulative volume d>2nm [cc/g]",
+    "radius": "BJH {branch} (calc) average radius [nm]",
+    "mode": "BJH {branch} (calc) mode diameter [nm]",
+}
+# vendor fields (SampleExporter.EXCEL_CELL_MAP) holding the same quantities
+VENDOR_FIELDS = {
+    ("ads", "area"): "BJH吸附累积比表面积(d>2[nm])[m^2/g]",
+    ("des", "area"): "BJH解吸累积比表面积(d>2[nm])[m^2/g]",
+    ("ads", "volume"): "BJH吸附累积总孔体积(d>2[nm])[cc/g]",
+    ("des", "volume"): "BJH解吸累积总孔体积(d>2[nm])[cc/g]",
+    ("ads", "radius"): "BJH吸附平均孔半径[nm]",
+    ("des", "radius"): "BJH解吸平均孔半径[nm]",
+    ("ads", "mode"): "BJH吸附最可几孔径[nm]",
+    ("des", "mode"): "BJH解吸最可几孔径[nm]",
+}
+
+
+def result_name(branch: str, quantity: str) -> str:
+    return RESULT_NAMES[quantity].format(branch=branch)
+
+
+@dataclass
+class BjhGrid:
+    thickness: str = "harkins-jura"
+    d_min: float = D_MIN
+    d_max: float = D_MAX
+    n_bins: int = N_BINS
+
+    def key(self) -> str:
+        return cache.params_key(dict(self.__dict__, version=RESULT_VERSION))
+
+    def bounds(self):
+        """Bin edges from large to small pores: diameters, pressures, t and r_p at the edges."""
+        t = THICKNESS[self.thickness]
+        p = np.geomspace(1e-4, 0.99999, 20000)
+        d = 2.0 * (KELVIN / -np.log(p) + t(p))
+        d_edges = np.geomspace(self.d_max, self.d_min, self.n_bins + 1)
+        p_edges = np.interp(np.log(d_edges), np.log(d), p)
+        return d_edges, p_edges, t(p_edges), d_edges / 2.0
+
+
+def _bjh_branch(P: np.ndarray, V: np.ndarray, grid: BjhGrid):
+    """Pore volume per bin (n, bins) [cc/g liquid] and bin centre diameters."""
+    d_edges, p_edges, t_edges, r_edges = grid.bounds()
+    n = P.shape[0]
+    # interp_rows needs ascending queries; read the grid bottom-up and flip
+    Vl = interp_rows(p_edges[::-1], P, V)[:, ::-1] * GAS_TO_LIQUID
+    dVp = np.zeros((n, grid.n_bins))
+    sum_a = np.zeros(n)          # Σ dA_j        (cc/g/nm)
+    sum_ar = np.zeros(n)         # Σ dA_j / r_j
+    for i in range(grid.n_bins):
+        dv = np.nan_to_num(Vl[:, i] - Vl[:, i + 1])
+        dt = t_edges[i] - t_edges[i + 1]
+        t_avg = 0.5 * (t_edges[i] + t_edges[i + 1])
+        rp = 0.5 * (r_edges[i] + r_edges[i + 1])
+        rk = rp - t_avg
+        thinning = dt * (sum_a - t_avg * sum_ar)
+        vp = np.maximum((rp / (rk + dt / 2.0)) ** 2 * (dv - thinning), 0.0)
+        dA = 2.0 * vp / rp
+        dVp[:, i] = vp
+        sum_a += dA
+        sum_ar += dA / rp
+    return dVp, np.sqrt(d_edges[:-1] * d_edges[1:]), np.log10(d_edges[:-1] / d_edges[1:])
+
+
+def compute(batch: IsothermBatch, grid: BjhGrid) -> list[dict]:
+    """Per sample {branch: {area, volume, radius, mode, dv_dlogd}}; NaN when a branch has no data."""
+    out = [dict() for _ in range(len(batch))]
+    for branch, P, V in (("ads", batch.p_ads, batch.v_ads), ("des", batch.p_des, batch.v_des)):
+        dVp, d, dlogd = _bjh_branch(P, V, grid)
+        big = d > D_CUT
+        vol = dVp[:, big].sum(1)
+        area = (2000.0 * dVp[:, big] / (d[big] / 2.0)).sum(1)       # m^2/g
+        curve = dVp / dlogd
+        has = dVp.sum(1) > 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            radius = 2000.0 * vol / area
+        # peak of dV/dlog(d) among d > 2 nm; the grid's edge bins below it would otherwise win
+        mode = d[big][np.argmax(curve[:, big], axis=1)]
+        for k in range(len(batch)):
+            out[k][branch] = {
+                "area": float(area[k]) if has[k] else np.nan,
+                "volume": float(vol[k]) if has[k] else np.nan,
+                "radius": float(radius[k]) if has[k] else np.nan,
+                "mode": float(mode[k]) if has[k] else np.nan,
+                "dv_dlogd": np.round(curve[k], 6).tolist() if has[k] else [],
+            }
+    return out
+
+
+def bin_diameters(grid: BjhGrid | None = None) -> np.ndarray:
+    d_edges = (grid or BjhGrid()).bounds()[0]
+    return np.sqrt(d_edges[:-1] * d_edges[1:])
+
+
+@dataclass
+class BjhResult:
+    ids: np.ndarray
+    names: list[str]
+    values: list[dict]
+    cached: int = 0
+
+
+def run(conn, names=None, grid: BjhGrid | None = None, report=print) -> BjhResult:
+    """BJH for the named samples (all if None), computing only samples not in the cache."""
+    grid = grid or BjhGrid()
+    key = grid.key()
+    batch = load_isotherms(conn, names)
+    hashes = cache.isotherm_hashes(batch)
+    hit = cache.load(conn, "bjh", key, batch.ids, hashes)
+    todo = np.array([k for k in range(len(batch)) if k not in hit], dtype=int)
+    report(f"BJH: {len(hit)} cached, {len(todo)} to compute")
+    n_cached = len(hit)
+    if len(todo):
+        new = dict(zip(todo.tolist(), compute(batch.subset(todo), grid)))
+        cache.store(conn, "bjh", key, batch.ids, hashes, new)
+        hit.update(new)
+    return BjhResult(batch.ids, batch.names, [hit[k] for k in range(len(batch))], n_cached)
+
+
+def write_bjh(conn, result: BjhResult) -> int:
+    values = {}
+    for sid, row in zip(result.ids, result.values):
+        stored = {result_name(b, q): round(row[b][q], 4)
+                  for b in BRANCHES for q in RESULT_NAMES if row[b][q] == row[b][q]}
+        if stored:
+            values[int(sid)] = stored
+    write_results(conn, values)
+    conn.commit()
+    return len(values)
+
+
+def vendor_values(conn, ids) -> dict[tuple, np.ndarray]:
+    """Vendor BJH values aligned to ids, {(branch, quantity): (n,)}."""
+    return {k: as_floats(result_values(conn, ids, name), ids)
+            for k, name in VENDOR_FIELDS.items()}
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Batch BJH for stored isotherms")
+    ap.add_argument("db")
+    ap.add_argument("--samples", nargs="*", help="sample names (default: all)")
+    ap.add_argument("--write", action="store_true", help="store results in sample_results")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.samples)
+    conn.commit()
+    print(f"⏱ BJH for {len(res.ids)} samples in {time.perf_counter() - t0:.2f}s ({res.cached} cached)")
+    vendor = vendor_values(conn, res.ids)
+    for k, name in enumerate(res.names):
+        print(f"  {name}")
+        for b in BRANCHES:
+            print("    " + b + ": " + ", ".join(f"{q} {res.values[k][b][q]:.4g} (vendor {vendor[(b, q)][k]:.4g})"
+                                             for q in RESULT_NAMES))
+    if opts.write:
+        print(f"💾 {write_bjh(conn, res)} samples written")
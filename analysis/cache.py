@@ -0,0 +1,87 @@
+# analysis/cache.py
+"""
+Per-sample result cache for the analysis engines.
+
+Rows of analysis_cache are keyed by (sample_id, engine, params) and carry a
+hash of the sample's isotherm, so a cached result is reused only while the
+isotherm and the engine settings are unchanged:
+
+    hashes = isotherm_hashes(batch)
+    hit = load(conn, "tplot", key, batch.ids, hashes)       # {row: result dict}
+    ... compute the rows not in hit ...
+    store(conn, "tplot", key, ids, hashes, results)
+"""
+from __future__ import annotations
+import hashlib
+import json
+
+import numpy as np
+
+from analysis.isotherm_data import IsothermBatch
+
+_CHUNK = 900
+
+
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            sample_id INTEGER,
+            engine TEXT,
+            params TEXT,
+            isotherm_hash TEXT,
+            result_json TEXT,
+            PRIMARY KEY(sample_id, engine, params),
+            FOREIGN KEY(sample_id) REFERENCES samples(id)
+        )
+    """)
+
+
+def params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+def isotherm_hashes(batch: IsothermBatch) -> list[str]:
+    """sha1 of each sample's adsorption and desorption points."""
+    out = []
+    for i in range(len(batch)):
+        h = hashlib.sha1()
+        for a in (batch.p_ads[i], batch.v_ads[i], batch.p_des[i], batch.v_des[i]):
+            h.update(np.ascontiguousarray(a[np.isfinite(a)]).tobytes())
+            h.update(b"|")
+        out.append(h.hexdigest())
+    return out
+
+
+def load(conn, engine: str, key: str, ids, hashes) -> dict[int, dict]:
+    """{row index: result} for the rows whose cached isotherm hash still matches."""
+    ensure_table(conn)
+    c = conn.cursor()
+    ids = [int(x) for x in ids]
+    row_of = {sid: k for k, sid in enumerate(ids)}
+    out = {}
+    for i in range(0, len(ids), _CHUNK):
+        part = ids[i:i + _CHUNK]
+        q = ("SELECT sample_id, isotherm_hash, result_json FROM analysis_cache "
+             f"WHERE engine=? AND params=? AND sample_id IN ({','.join('?' * len(part))})")
+        for sid, h, data in c.execute(q, [engine, key] + part):
+            k = row_of[sid]
+            if h == hashes[k]:
+                out[k] = json.loads(data)
+    return out
+
+
+def store(conn, engine: str, key: str, ids, hashes, results: dict[int, dict]):
+    """Cache {row index: result} for the given rows (replacing older entries)."""
+    ensure_table(conn)
+    conn.executemany(
+        "INSERT OR REPLACE INTO analysis_cache(sample_id, engine, params, isotherm_hash, result_json) "
+        "VALUES(?,?,?,?,?)",
+        [(int(ids[k]), engine, key, hashes[k], json.dumps(r)) for k, r in results.items()])
+
+
+def clear(conn, engine: str | None = None):
+    ensure_table(conn)
+    if engine is None:
+        conn.execute("DELETE FROM analysis_cache")
+    else:
+        conn.execute("DELETE FROM analysis_cache WHERE engine=?", (engine,))
@@ -0,0 +1,315 @@
+# analysis/iast.py
+"""
+Ideal Adsorbed Solution Theory (Myers & Prausnitz) for binary gas mixtures,
+computed on a composition × pressure grid from the single-component isotherms
+in the database.
+
+For each material (样品名称) the isotherms of gas 1 and gas 2 (吸附质) measured
+at the same analysis temperature form one sorbent. Both are fitted with a
+model from analysis/model_fit.py. The fits are cached there, and only models
+with a closed-form reduced spreading pressure ψ = ∫ q/P dP are offered:
+
+    langmuir    ψ = qm ln(1 + K P)             P°(ψ) = (e^(ψ/qm) - 1) / K
+    sips        ψ = qm/n ln(1 + (K P)^n)      P°(ψ) = (e^(ψn/qm) - 1)^(1/n) / K
+    freundlich  ψ = Kf n P^(1/n)              P°(ψ) = (ψ / (Kf n))^n
+
+At every (sorbent, y1, P) the mixture ψ solves
+
+    y1 P / P1°(ψ) + y2 P / P2°(ψ) = 1
+
+The left side decreases in ψ, and the root lies between the pure-component
+values ψ1(P) and ψ2(P). A log-space bisection on the whole
+(sorbents, compositions, pressures) array therefore finds every root at
+once. Then
+
+    xi = yi P / Pi°(ψ),   1/qT = Σ xi / qi(Pi°),   qi = xi qT,
+    S12 = (x1/y1) / (x2/y2)
+
+Pressures are P/P0 times the saturation pressure from sample_info (see
+analysis/isosteric.py). Without that field they are relative pressures on a
+common reference P0. A pair where only one gas has P0 is skipped, so that
+one grid never mixes the two. The results go to the Excel export as two extra sheets
+(SampleExporter extra_sheets, see sheets()).
+
+    python -m analysis.iast adsorption.db CO2 N2 [--model sips] [--samples A B ...]
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import argparse
+import time
+
+import numpy as np
+
+from analysis import model_fit
+from analysis.isosteric import saturation_pressures, temperatures
+from analysis.isotherm_data import info_values, sample_ids
+
+MODELS = ("sips", "langmuir", "freundlich")
+N_BISECT = 64
+
+
+@dataclass
+class IastSettings:
+    gas1: str
+    gas2: str
+    model: str = "sips"
+    p_min: float = 0.01
+    p_max: float = 1.0
+    n_pressure: int = 20
+    n_composition: int = 11
+
+    def pressures(self) -> np.ndarray:
+        return np.geomspace(self.p_min, self.p_max, self.n_pressure)
+
+    def compositions(self) -> np.ndarray:
+        return np.linspace(0.0, 1.0, self.n_composition)
+
+
+@dataclass
+class IastResult:
+    settings: IastSettings
+    materials: list[str]
+    temperatures: np.ndarray      # (m,) K, NaN if unknown
+    names: list[tuple]            # (m,) (gas-1 sample, gas-2 sample)
+    r2: np.ndarray                # (m, 2) fit R² per gas
+    y1: np.ndarray                # (ny,)
+    pressure: np.ndarray          # (np,)
+    x1: np.ndarray                # (m, ny, np) adsorbed-phase mole fraction of gas 1
+    q1: np.ndarray                # (m, ny, np) cc(STP)/g
+    q2: np.ndarray
+    skipped: dict = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.materials)
+
+    @property
+    def selectivity(self) -> np.ndarray:
+        y1 = self.y1[None, :, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.x1 / y1) / ((1.0 - self.x1) / (1.0 - y1))
+
+    def ranking(self, y1: float = 0.5) -> np.ndarray:
+        """Rows ordered by selectivity at composition y1 and the highest pressure."""
+        j = int(np.abs(self.y1 - y1).argmin())
+        s = self.selectivity[:, j, -1]
+        return np.argsort(np.where(np.isfinite(s), -s, np.inf), kind="stable")
+
+    def sheets(self) -> dict:
+        """{sheet title: (headers, rows)} for SampleExporter.export(extra_sheets=...)."""
+        g1, g2 = self.settings.gas1, self.settings.gas2
+        j = int(np.abs(self.y1 - 0.5).argmin())
+        S = self.selectivity
+        summary = [(self.materials[i], _t(self.temperatures[i]), *self.names[i],
+                    _r(self.r2[i, 0]), _r(self.r2[i, 1]), _r(S[i, j, -1]), _r(self.q1[i, j, -1]),
+                    _r(self.q2[i, j, -1]))
+                   for i in self.ranking()]
+        rows = [(self.materials[i], _t(self.temperatures[i]), _r(p), _r(y), _r(self.x1[i, a, b]),
+                 _r(self.q1[i, a, b]), _r(self.q2[i, a, b]), _r(S[i, a, b]))
+                for i in range(len(self)) for a, y in enumerate(self.y1) for b, p in enumerate(self.pressure)]
+        head = ["Material", "T [K]"]
+        return {
+            "IAST summary": (
+                head + [f"Sample ({g1})", f"Sample ({g2})", f"R² {g1}", f"R² {g2}",
+                        f"S {g1}/{g2} (y=0.5, P={self.pressure[-1]:g})",
+                        f"q {g1} [cc/g]", f"q {g2} [cc/g]"],
+                summary),
+            f"IAST {g1}-{g2}": (
+                head + ["P", f"y {g1}", f"x {g1}", f"q {g1} [cc/g]", f"q {g2} [cc/g]", f"S {g1}/{g2}"],
+                rows),
+        }
+
+
+def _r(v, digits=6):
+    return None if v != v or not np.isfinite(v) else float(f"{v:.{digits}g}")
+
+
+def _t(v):
+    return None if v != v else round(float(v), 2)
+
+
+# ---------------- pure-component functions (parameters broadcast against P) ----------------
+def _log_p0(model, th, psi):
+    """log Pi°(ψ)."""
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        if model == "freundlich":
+            Kf, n = th
+            return n * np.log(psi / (Kf * n))
+        qm, K, n = th
+        z = psi * n / qm
+        log_em1 = np.where(z > 30, z, np.log(np.expm1(np.minimum(z, 30))))
+        return log_em1 / n - np.log(K)
+
+
+def _psi(model, th, log_p):
+    with np.errstate(over="ignore"):
+        if model == "freundlich":
+            Kf, n = th
+            return Kf * n * np.exp(log_p / n)
+        qm, K, n = th
+        return qm / n * np.logaddexp(0.0, n * (np.log(K) + log_p))
+
+
+def _q(model, th, log_p):
+    with np.errstate(over="ignore"):
+        if model == "freundlich":
+            Kf, n = th
+            return Kf * np.exp(log_p / n)
+        qm, K, n = th
+        return qm / (1.0 + np.exp(-n * (np.log(K) + log_p)))
+
+
+def solve(model: str, th1, th2, y1: np.ndarray, pressure: np.ndarray):
+    """
+    Binary IAST for m sorbents. th1/th2 are tuples of (m,) parameter arrays in
+    absolute pressure units. Returns x1, q1, q2, each (m, ny, np).
+    """
+    th1 = tuple(np.asarray(a, float)[:, None, None] for a in th1)
+    th2 = tuple(np.asarray(a, float)[:, None, None] for a in th2)
+    y = y1[None, :, None]
+    log_p = np.log(pressure)[None, None, :]
+    shape = np.broadcast_shapes(th1[0].shape, y.shape, log_p.shape)
+
+    psi_1 = np.broadcast_to(_psi(model, th1, log_p), shape)
+    psi_2 = np.broadcast_to(_psi(model, th2, log_p), shape)
+    lo = np.log(np.minimum(psi_1, psi_2))
+    hi = np.log(np.maximum(psi_1, psi_2))
+    with np.errstate(divide="ignore"):
+        log_y1, log_y2 = np.log(y), np.log(1.0 - y)
+    for _ in range(N_BISECT):
+        mid = 0.5 * (lo + hi)
+        psi = np.exp(mid)
+        f = (np.exp(log_y1 + log_p - _log_p0(model, th1, psi))
+             + np.exp(log_y2 + log_p - _log_p0(model, th2, psi)))
+        above = f > 1.0                       # ψ too small
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+    psi = np.exp(0.5 * (lo + hi))
+    lp1, lp2 = _log_p0(model, th1, psi), _log_p0(model, th2, psi)
+    x1 = np.clip(np.exp(log_y1 + log_p - lp1), 0.0, 1.0)
+    x2 = 1.0 - x1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        q_tot = 1.0 / (x1 / _q(model, th1, lp1) + x2 / _q(model, th2, lp2))
+    return x1, x1 * q_tot, x2 * q_tot
+
+
+def adsorbates(conn, names=None) -> list[str]:
+    """Distinct 吸附质 values among the materials of the given samples (all if None)."""
+    ids, _ = sample_ids(conn)
+    material = info_values(conn, ids, "样品名称")
+    gas = info_values(conn, ids, "吸附质")
+    wanted = None if names is None else {material.get(int(s)) for s in sample_ids(conn, names)[0]}
+    return sorted({str(gas[int(s)]).strip() for s in ids
+                   if int(s) in gas and (wanted is None or material.get(int(s)) in wanted)})
+
+
+def _label(key) -> str:
+    mat, t = key
+    return mat if t is None else f"{mat} @ {t:g} K"
+
+
+def _absolute(model, params, P0):
+    """Fitted (relative-pressure) parameters -> absolute-pressure parameter tuple."""
+    p = np.array(params, float)
+    if model == "freundlich":
+        Kf, n = p[:, 0], p[:, 1]
+        return Kf * P0 ** (-1.0 / n), n
+    if model == "langmuir":
+        return p[:, 0], p[:, 1] / P0, np.ones(len(p))
+    return p[:, 0], p[:, 1] / P0, p[:, 2]
+
+
+def run(conn, settings: IastSettings, names=None, report=print) -> IastResult:
+    """IAST for every material among the given samples (all if None) that has both gases at one temperature."""
+    if settings.model not in MODELS:
+        raise ValueError(f"IAST needs a model with a closed-form spreading pressure: {', '.join(MODELS)}")
+    all_ids, all_names = sample_ids(conn)
+    id_name = dict(zip(all_ids.tolist(), all_names))
+    material = info_values(conn, all_ids, "样品名称")
+    gas = info_values(conn, all_ids, "吸附质")
+    wanted = None if names is None else {material.get(int(s)) for s in sample_ids(conn, names)[0]}
+    gases = (settings.gas1.strip().lower(), settings.gas2.strip().lower())
+    cand = [int(s) for s in all_ids
+            if str(gas.get(int(s), "")).strip().lower() in gases
+            and (wanted is None or material.get(int(s)) in wanted)]
+    T = dict(zip(cand, temperatures(conn, cand)))
+    P0 = dict(zip(cand, saturation_pressures(conn, cand, default=np.nan)))
+
+    # (material, T) -> [gas-1 sample, gas-2 sample]; the highest sample id (newest) wins
+    pairs, skipped = {}, {}
+    for sid in sorted(cand):
+        mat = str(material.get(sid, id_name[sid])).strip()
+        key = (mat, None if T[sid] != T[sid] else round(float(T[sid]), 2))
+        slot = gases.index(str(gas[sid]).strip().lower())
+        pair = pairs.setdefault(key, [None, None])
+        if pair[slot] is not None:
+            skipped[f"{_label(key)}: {id_name[pair[slot]]}"] = (
+                f"duplicate {(settings.gas1, settings.gas2)[slot]} isotherm, {id_name[sid]} used instead")
+        pair[slot] = sid
+    keys = []
+    for key, (a, b) in pairs.items():
+        if a is None or b is None:
+            skipped[_label(key)] = f"no {settings.gas1 if a is None else settings.gas2} isotherm"
+        elif np.isnan(P0[a]) != np.isnan(P0[b]):
+            # one gas in P0 units, the other relative: the shared pressure grid would mix units
+            skipped[_label(key)] = "saturation pressure (P0) known for only one of the two gases"
+        else:
+            keys.append(key)
+    report(f"IAST {settings.gas1}/{settings.gas2}: {len(keys)} sorbent(s), {len(skipped)} skipped")
+
+    fit_ids = sorted({sid for k in keys for sid in pairs[k]})
+    fs = model_fit.FitSettings(models=(settings.model,))
+    fits = model_fit.run(conn, [id_name[s] for s in fit_ids], fs, report=report)
+    conn.commit()
+    fit_of = {int(sid): row.get(settings.model) for sid, row in zip(fits.ids, fits.values)}
+    ok = []
+    for key in keys:
+        bad = [id_name[s] for s in pairs[key] if not fit_of.get(s)]
+        if bad:
+            skipped[_label(key)] = f"{settings.model} fit failed for {', '.join(bad)}"
+        else:
+            ok.append(key)
+
+    y1, pressure = settings.compositions(), settings.pressures()
+    m = len(ok)
+    if not m:
+        empty = np.empty((0, len(y1), len(pressure)))
+        return IastResult(settings, [], np.empty(0), [], np.empty((0, 2)), y1, pressure,
+                          empty, empty.copy(), empty.copy(), skipped)
+    s1 = [pairs[k][0] for k in ok]
+    s2 = [pairs[k][1] for k in ok]
+    p0 = lambda ids: np.nan_to_num(np.array([P0[s] for s in ids]), nan=1.0)     # relative pairs stay relative
+    th1 = _absolute(settings.model, [fit_of[s]["params"] for s in s1], p0(s1))
+    th2 = _absolute(settings.model, [fit_of[s]["params"] for s in s2], p0(s2))
+    x1, q1, q2 = solve(settings.model, th1, th2, y1, pressure)
+    return IastResult(
+        settings, [k[0] for k in ok], np.array([T[s] for s in s1], float),
+        [(id_name[a], id_name[b]) for a, b in zip(s1, s2)],
+        np.array([[fit_of[a]["r2"], fit_of[b]["r2"]] for a, b in zip(s1, s2)]),
+        y1, pressure, x1, q1, q2, skipped)
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Binary IAST over stored single-component isotherms")
+    ap.add_argument("db")
+    ap.add_argument("gas1")
+    ap.add_argument("gas2")
+    ap.add_argument("--model", default="sips", choices=MODELS)
+    ap.add_argument("--p-min", type=float, default=0.01)
+    ap.add_argument("--p-max", type=float, default=1.0)
+    ap.add_argument("--samples", nargs="*", help="sample names; their materials are used (default: all)")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    s = IastSettings(opts.gas1, opts.gas2, opts.model, opts.p_min, opts.p_max)
+    t0 = time.perf_counter()
+    res = run(conn, s, opts.samples)
+    print(f"⏱ {len(res)} sorbents in {time.perf_counter() - t0:.2f}s")
+    S = res.selectivity
+    j = int(np.abs(res.y1 - 0.5).argmin())
+    for i in res.ranking()[:20]:
+        print(f"  {res.materials[i]}: S = {S[i, j, -1]:.3g}, q1 = {res.q1[i, j, -1]:.3g}, "
+              f"q2 = {res.q2[i, j, -1]:.3g} cc/g at y1 = 0.5, P = {res.pressure[-1]:g}")
+    for mat, why in list(res.skipped.items())[:20]:
+        print(f"  skipped {mat}: {why}")
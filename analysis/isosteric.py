@@ -0,0 +1,295 @@
+# analysis/isosteric.py
+"""
+Isosteric heat of adsorption from isotherms of one material measured at
+several temperatures (Clausius–Clapeyron):
+
+    Qst(n) = -R * d ln P / d(1/T)   at constant loading n
+
+Samples are grouped by 样品名称 and 吸附质. Each group needs at least two
+distinct analysis temperatures, read from the first sample_info field that
+matches TEMP_PATTERNS (degas fields, 烘干…, are ignored). Field names
+containing ℃/°C are read as Celsius, names containing K as Kelvin. Without a
+unit, values up to 60 are taken as °C.
+
+Each adsorption branch is made monotonic and then inverted, ln P at given
+loading, on LOADING_POINTS loadings spread over the range that every member
+of its group covers. All samples are inverted in one interp_rows call. The
+ln P vs 1/T line of every group and loading is a least-squares fit built
+from per-group sums (np.add.reduceat over group-sorted rows), so all
+materials are solved at once.
+
+P is P/P0 times the saturation pressure from the first field matching
+P0_PATTERNS. Without such a field, P0 is taken to be the same at every
+temperature: the instrument's relative pressure then refers to a fixed
+reference pressure, as it does for supercritical gases. In that case the
+slope of ln(P/P0) is used as is.
+
+Each group's curve is cached (analysis/cache.py) under its lowest sample id.
+The hash covers the members' isotherms, temperatures and P0. Summary values
+go to sample_results for every member.
+
+    python -m analysis.isosteric adsorption.db [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import hashlib
+import re
+import time
+
+import numpy as np
+
+from analysis import cache
+from analysis.isotherm_data import (
+    IsothermBatch, as_floats, info_values, interp_rows, load_isotherms, sample_ids, write_results
+)
+
+R_GAS = 8.314462618e-3     # kJ/(mol K)
+TEMP_PATTERNS = ("%分析温度%", "%吸附温度%", "%测试温度%", "%浴温%", "%Analysis Temp%", "%Bath Temp%")
+P0_PATTERNS = ("%饱和压力%", "%饱和蒸汽压%", "%Saturation Pressure%")
+CELSIUS_MAX = 60.0
+
+RESULT_LOW = "Isosteric Heat (calc) low coverage [kJ/mol]"
+RESULT_MEAN = "Isosteric Heat (calc) mean [kJ/mol]"
+RESULT_TEMPS = "Isosteric Heat (calc) temperatures [K]"
+
+
+@dataclass
+class IsostericSettings:
+    loading_points: int = 40
+    min_temperatures: int = 2
+
+    def key(self) -> str:
+        return cache.params_key(self.__dict__)
+
+
+@dataclass
+class IsostericGroup:
+    material: str
+    adsorbate: str
+    ids: list[int]
+    names: list[str]
+    temperatures: list[float]   # K, per member
+    loading: np.ndarray         # cc(STP)/g
+    qst: np.ndarray             # kJ/mol
+    r2: np.ndarray
+
+    def summary(self) -> tuple[float, float]:
+        """(low-coverage Qst, mean Qst)"""
+        ok = np.isfinite(self.qst)
+        if not ok.any():
+            return np.nan, np.nan
+        return float(self.qst[ok][0]), float(self.qst[ok].mean())
+
+
+@dataclass
+class IsostericResult:
+    groups: list[IsostericGroup]
+    skipped: dict               # {material: reason}
+    cached: int = 0
+
+
+def temperatures(conn, ids) -> np.ndarray:
+    """Analysis temperature [K] per sample id (NaN if no field is found)."""
+    out = np.full(len(ids), np.nan)
+    ids = [int(x) for x in ids]
+    row_of = {sid: k for k, sid in enumerate(ids)}
+    for pattern in TEMP_PATTERNS:
+        todo = [sid for sid in ids if np.isnan(out[row_of[sid]])]
+        if not todo:
+            break
+        for i in range(0, len(todo), 900):
+            part = todo[i:i + 900]
+            rows = conn.execute(
+                f"SELECT sample_id, field_name, field_value FROM sample_info WHERE field_name LIKE ? "
+                f"AND field_name NOT LIKE '%烘干%' AND sample_id IN ({','.join('?' * len(part))})",
+                [pattern] + part)
+            for sid, name, value in rows:
+                k = row_of[sid]
+                if np.isnan(out[k]):
+                    out[k] = _kelvin(name, value)
+    return out
+
+
+def saturation_pressures(conn, ids, default: float = 1.0) -> np.ndarray:
+    """P0 per sample id from the first field matching P0_PATTERNS (default if none is found)."""
+    P0 = np.full(len(ids), np.nan)
+    for pattern in P0_PATTERNS:
+        P0 = np.where(np.isnan(P0), as_floats(info_values(conn, ids, pattern), ids), P0)
+    return np.where(P0 > 0, P0, default)
+
+
+def _kelvin(field_name: str, value) -> float:
+    try:
+        v = float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return np.nan
+    if "℃" in field_name or "°C" in field_name:
+        return v + 273.15
+    if re.search(r"[\[(（]\s*K\s*[\])）]", field_name):
+        return v
+    return v + 273.15 if v <= CELSIUS_MAX else v
+
+
+def _group_hash(iso_hashes, temps, p0) -> str:
+    h = hashlib.sha1()
+    for ih, t, p in sorted(zip(iso_hashes, temps, p0)):
+        h.update(f"{ih}|{t:.4f}|{p:.6g};".encode())
+    return h.hexdigest()
+
+
+def compute(batch: IsothermBatch, group: np.ndarray, T: np.ndarray, P0: np.ndarray, n_points: int):
+    """
+    Rows of batch sorted by group (0..g-1). Returns per group (loading, qst, r2),
+    each (g, n_points).
+    """
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+
+    P, V = batch.p_ads, batch.v_ads
+    ok = np.isfinite(P) & np.isfinite(V) & (P > 0)
+    Vm = np.where(ok, np.fmax.accumulate(np.where(ok, V, np.nan), axis=1), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lnP = np.where(ok, np.log(P * P0[:, None]), np.nan)
+        lo = np.nanmin(Vm, axis=1)
+        hi = np.nanmax(Vm, axis=1)
+    lo = np.where(np.isfinite(lo), lo, np.inf)
+    hi = np.where(np.isfinite(hi), hi, -np.inf)
+    g_lo = np.maximum.reduceat(lo, starts)
+    g_hi = np.minimum.reduceat(hi, starts)
+    frac = (np.arange(n_points) + 0.5) / n_points
+    with np.errstate(invalid="ignore"):
+        loading = g_lo[:, None] + (g_hi - g_lo)[:, None] * frac[None, :]
+    loading[~(g_hi > g_lo)] = np.nan
+
+    Y = interp_rows(loading[group], Vm, lnP)          # ln P at the group's loadings, per sample
+    X = np.broadcast_to((1.0 / T)[:, None], Y.shape)
+    M = np.isfinite(Y)
+    x, y = np.where(M, X, 0.0), np.where(M, Y, 0.0)
+    S1, Sx, Sy, Sxx, Sxy, Syy = (np.add.reduceat(a, starts, axis=0)
+                                 for a in (M.astype(float), x, y, x * x, x * y, y * y))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx = Sxx - Sx * Sx / S1
+        sxy = Sxy - Sx * Sy / S1
+        syy = Syy - Sy * Sy / S1
+        slope = sxy / sxx
+        r2 = np.where(syy > 0, sxy * sxy / (sxx * syy), 1.0)
+    good = (S1 >= 2) & (sxx > 1e-14)
+    qst = np.where(good, -R_GAS * slope, np.nan)
+    return loading, qst, np.where(good, r2, np.nan)
+
+
+def run(conn, names=None, settings: IsostericSettings | None = None, report=print) -> IsostericResult:
+    """
+    Isosteric heat for every material among the given samples (all samples if
+    names is None); each material uses all of its samples in the database.
+    """
+    settings = settings or IsostericSettings()
+    all_ids, all_names = sample_ids(conn)
+    material = info_values(conn, all_ids, "样品名称")
+    adsorbate = info_values(conn, all_ids, "吸附质")
+    key_of = {int(sid): (str(material.get(int(sid), name)).strip(), str(adsorbate.get(int(sid), "")).strip())
+              for sid, name in zip(all_ids, all_names)}
+    wanted = None if names is None else {key_of[int(s)] for s in sample_ids(conn, names)[0]}
+
+    members = {}
+    for sid, name in zip(all_ids, all_names):
+        k = key_of[int(sid)]
+        if wanted is None or k in wanted:
+            members.setdefault(k, []).append((int(sid), name))
+    ids = np.array([sid for k in members for sid, _ in members[k]], dtype=np.int64)
+    T = temperatures(conn, ids)
+    P0 = saturation_pressures(conn, ids)
+
+    skipped, groups, rows = {}, [], []
+    pos = 0
+    for (mat, ads), mem in members.items():
+        sl = np.arange(pos, pos + len(mem))
+        pos += len(mem)
+        t = T[sl]
+        label = f"{mat} ({ads})" if ads else mat
+        n_temps = len(np.unique(np.round(t[np.isfinite(t)], 2)))
+        if n_temps < settings.min_temperatures:
+            skipped[label] = "no analysis temperature field" if not n_temps else f"{n_temps} temperature(s)"
+            continue
+        sl = sl[np.isfinite(t)]
+        groups.append((mat, ads))
+        rows.append(sl)
+    report(f"Isosteric heat: {len(groups)} material(s), {len(skipped)} skipped")
+    if not groups:
+        return IsostericResult([], skipped)
+
+    order = np.concatenate(rows)
+    group = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+    id_names = dict(zip(all_ids.tolist(), all_names))
+    batch = load_isotherms(conn, [id_names[int(s)] for s in ids[order]])
+    # load_isotherms returns sample_ids order; align it with ours
+    where = {int(s): k for k, s in enumerate(batch.ids)}
+    batch = batch.subset([where[int(s)] for s in ids[order]])
+    iso_hashes = cache.isotherm_hashes(batch)
+    rep_ids = [int(ids[r].min()) for r in rows]
+    g_hashes, start = [], 0
+    for r in rows:
+        g_hashes.append(_group_hash(iso_hashes[start:start + len(r)], T[r], P0[r]))
+        start += len(r)
+
+    key = settings.key()
+    hit = cache.load(conn, "isosteric", key, rep_ids, g_hashes)
+    todo = [k for k in range(len(rows)) if k not in hit]
+    if todo:
+        sel = np.flatnonzero(np.isin(group, todo))
+        sub_group = np.searchsorted(todo, group[sel])
+        loading, qst, r2 = compute(batch.subset(sel), sub_group, T[order][sel], P0[order][sel],
+                                   settings.loading_points)
+        new = {k: {"loading": loading[j].tolist(), "qst": qst[j].tolist(), "r2": r2[j].tolist()}
+               for j, k in enumerate(todo)}
+        cache.store(conn, "isosteric", key, rep_ids, g_hashes, new)
+        hit.update(new)
+
+    out = []
+    for k, ((mat, ads), r) in enumerate(zip(groups, rows)):
+        c = hit[k]
+        out.append(IsostericGroup(mat, ads, ids[r].tolist(), [id_names[int(s)] for s in ids[r]], T[r].tolist(),
+                                  np.array(c["loading"], float), np.array(c["qst"], float),
+                                  np.array(c["r2"], float)))
+    return IsostericResult(out, skipped, len(groups) - len(todo))
+
+
+def write_isosteric(conn, result: IsostericResult) -> int:
+    values = {}
+    for g in result.groups:
+        low, mean = g.summary()
+        temps = "/".join(f"{t:g}" for t in sorted(set(round(t, 2) for t in g.temperatures)))
+        for sid in g.ids:
+            values[sid] = {
+                RESULT_LOW: round(low, 2) if low == low else "",
+                RESULT_MEAN: round(mean, 2) if mean == mean else "",
+                RESULT_TEMPS: temps,
+            }
+    write_results(conn, values)
+    conn.commit()
+    return len(values)
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Isosteric heat of adsorption (Clausius–Clapeyron)")
+    ap.add_argument("db")
+    ap.add_argument("--samples", nargs="*", help="sample names; their materials are used (default: all)")
+    ap.add_argument("--points", type=int, default=40, help="loadings per material")
+    ap.add_argument("--write", action="store_true", help="store summary values in sample_results")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.samples, IsostericSettings(opts.points))
+    conn.commit()
+    print(f"⏱ {len(res.groups)} materials in {time.perf_counter() - t0:.2f}s ({res.cached} cached)")
+    for g in res.groups[:20]:
+        low, mean = g.summary()
+        print(f"  {g.material} {g.adsorbate} @ {sorted(set(g.temperatures))} K: "
+              f"Qst {low:.1f} (low coverage), {mean:.1f} kJ/mol (mean)")
+    for mat, why in list(res.skipped.items())[:20]:
+        print(f"  skipped {mat}: {why}")
+    if opts.write:
+        print(f"💾 {write_isosteric(conn, res)} samples written")
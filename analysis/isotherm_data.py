@@ -0,0 +1,193 @@
+# analysis/isotherm_data.py
+"""
+Batch access to stored isotherms for the analysis engines.
+
+load_isotherms() reads adsorption_data for many samples in one query and packs
+each branch into NaN-padded (n_samples, n_points) arrays sorted by P/P0, so the
+engines can work on the whole selection with array operations:
+
+    batch = load_isotherms(conn, names)          # or names=None for the whole DB
+    batch.p_ads[i], batch.v_ads[i]                # sample i, NaN after its last point
+    v = interp_rows(grid, batch.p_ads, batch.v_ads)   # (n, len(grid)), NaN outside range
+
+info_values() / result_values() fetch one metadata field per sample in a
+single query; write_results() stores computed values in sample_results,
+replacing earlier values of the same name.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import numpy as np
+
+_CHUNK = 900   # stay below SQLite's bound-parameter limit
+
+
+@dataclass
+class IsothermBatch:
+    ids: np.ndarray           # (n,) samples.id
+    names: list[str]          # (n,) samples.name
+    p_ads: np.ndarray         # (n, m) P/P0, NaN padded
+    v_ads: np.ndarray         # (n, m) adsorbed volume [cc/g STP]
+    p_des: np.ndarray         # (n, k)
+    v_des: np.ndarray         # (n, k)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def n_ads(self) -> np.ndarray:
+        return np.sum(~np.isnan(self.p_ads), axis=1)
+
+    def n_des(self) -> np.ndarray:
+        return np.sum(~np.isnan(self.p_des), axis=1)
+
+    def subset(self, rows) -> "IsothermBatch":
+        rows = np.asarray(rows)
+        return IsothermBatch(self.ids[rows], [self.names[i] for i in rows],
+                             self.p_ads[rows], self.v_ads[rows], self.p_des[rows], self.v_des[rows])
+
+
+def sample_ids(conn, names=None) -> tuple[np.ndarray, list[str]]:
+    """(ids, names) for the given sample names in the given order, or all samples by name."""
+    c = conn.cursor()
+    if names is None:
+        rows = c.execute("SELECT id, name FROM samples ORDER BY name").fetchall()
+    else:
+        names = list(names)
+        found = {}
+        for i in range(0, len(names), _CHUNK):
+            part = names[i:i + _CHUNK]
+            q = f"SELECT id, name FROM samples WHERE name IN ({','.join('?' * len(part))})"
+            found.update({name: sid for sid, name in c.execute(q, part)})
+        rows = [(found[n], n) for n in names if n in found]
+    return np.array([r[0] for r in rows], dtype=np.int64), [r[1] for r in rows]
+
+
+def _fetch_points(conn, ids: np.ndarray) -> np.ndarray:
+    """All (sample_id, q, i_ads, i_des) rows for ids as a float array, NULL -> NaN."""
+    c = conn.cursor()
+    chunks = []
+    for i in range(0, len(ids), _CHUNK):
+        part = [int(x) for x in ids[i:i + _CHUNK]]
+        q = ("SELECT sample_id, q, i_ads, i_des FROM adsorption_data "
+             f"WHERE sample_id IN ({','.join('?' * len(part))})")
+        rows = c.execute(q, part).fetchall()
+        if rows:
+            chunks.append(np.array(rows, dtype=float))   # None -> nan
+    return np.concatenate(chunks) if chunks else np.empty((0, 4))
+
+
+def _pack(row_of: np.ndarray, x: np.ndarray, y: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Scatter (row, x, y) triples into NaN-padded (n, max_count) arrays sorted by x per row."""
+    keep = np.isfinite(x) & np.isfinite(y)
+    row_of, x, y = row_of[keep], x[keep], y[keep]
+    order = np.lexsort((x, row_of))
+    row_of, x, y = row_of[order], x[order], y[order]
+    counts = np.bincount(row_of, minlength=n)
+    width = int(counts.max()) if counts.size and counts.max() > 0 else 0
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    col = np.arange(len(row_of)) - starts[row_of]
+    X = np.full((n, width), np.nan)
+    Y = np.full((n, width), np.nan)
+    X[row_of, col] = x
+    Y[row_of, col] = y
+    return X, Y
+
+
+def load_isotherms(conn, names=None) -> IsothermBatch:
+    ids, names = sample_ids(conn, names)
+    pts = _fetch_points(conn, ids)
+    row_of = np.searchsorted(np.sort(ids), pts[:, 0].astype(np.int64))
+    # map sorted-id positions back to the caller's order
+    pos = np.argsort(ids)[row_of] if len(ids) else row_of
+    p_ads, v_ads = _pack(pos, pts[:, 1], pts[:, 2], len(ids))
+    p_des, v_des = _pack(pos, pts[:, 1], pts[:, 3], len(ids))
+    return IsothermBatch(ids, names, p_ads, v_ads, p_des, v_des)
+
+
+def interp_rows(xq, X: np.ndarray, Y: np.ndarray) -> np.ndarray:
+    """
+    Row-wise linear interpolation: out[i] = interp(xq, X[i], Y[i]) with NaN
+    outside each row's data range. X rows must be ascending with NaN padding
+    at the end. xq is a shared 1-D grid or an (n, q) array of per-row queries.
+
+    All rows are handled by a single searchsorted over the concatenated rows,
+    shifted apart by a per-row offset so they stay globally sorted.
+    """
+    X = np.asarray(X, float)
+    Y = np.asarray(Y, float)
+    n = X.shape[0]
+    xq = np.asarray(xq, float)
+    Q = np.broadcast_to(xq, (n, xq.shape[-1])) if xq.ndim == 1 else xq
+    out = np.full(Q.shape, np.nan)
+    valid = np.isfinite(X) & np.isfinite(Y)
+    if n == 0 or not valid.any():
+        return out
+    lo = np.nanmin(np.where(valid, X, np.nan))
+    hi = np.nanmax(np.where(valid, X, np.nan))
+    span = (hi - lo) * 2 + 1.0
+    rows = np.broadcast_to(np.arange(n)[:, None], X.shape)
+    xs = np.append((X - lo + rows * span)[valid], np.inf)   # sentinel keeps j+1 in bounds
+    ys = np.append(Y[valid], np.nan)
+    counts = valid.sum(axis=1)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    qrows = np.broadcast_to(np.arange(n)[:, None], Q.shape)
+    qs = Q - lo + qrows * span
+    j = np.searchsorted(xs, qs, side="right")        # first point > q
+    s, e = starts[qrows], ends[qrows]
+    last = np.maximum(e - 1, 0)
+    at_end = (e > s) & (qs == xs[last])              # q equal to the row's last x
+    inside = ((j > s) & (j < e)) | at_end
+    j = np.clip(j, 1, len(xs) - 1)
+    x0, x1 = xs[j - 1], xs[j]
+    y0, y1 = ys[j - 1], ys[j]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(x1 > x0, (qs - x0) / (x1 - x0), 0.0)
+        val = np.where(at_end, ys[last], y0 + t * (y1 - y0))
+    out[inside] = val[inside]
+    return out
+
+
+def _field_values(conn, table: str, key: str, value: str, ids, pattern: str) -> dict[int, str]:
+    c = conn.cursor()
+    out = {}
+    ids = [int(x) for x in ids]
+    for i in range(0, len(ids), _CHUNK):
+        part = ids[i:i + _CHUNK]
+        q = (f"SELECT sample_id, {value} FROM {table} WHERE {key} LIKE ? "
+             f"AND sample_id IN ({','.join('?' * len(part))})")
+        for sid, v in c.execute(q, [pattern] + part):
+            out.setdefault(sid, v)
+    return out
+
+
+def info_values(conn, ids, pattern: str) -> dict[int, str]:
+    """{sample_id: field_value} of the first sample_info field matching the LIKE pattern."""
+    return _field_values(conn, "sample_info", "field_name", "field_value", ids, pattern)
+
+
+def result_values(conn, ids, pattern: str) -> dict[int, str]:
+    """{sample_id: result_value} of the first sample_results entry matching the LIKE pattern."""
+    return _field_values(conn, "sample_results", "result_name", "result_value", ids, pattern)
+
+
+def as_floats(values: dict, ids, default: float = np.nan) -> np.ndarray:
+    """Align {sample_id: text} to ids as floats; unparsable/missing -> default."""
+    out = np.full(len(ids), default, dtype=float)
+    for i, sid in enumerate(ids):
+        try:
+            v = float(str(values[int(sid)]).replace(",", ""))
+        except (KeyError, TypeError, ValueError):
+            continue
+        if np.isfinite(v):
+            out[i] = v
+    return out
+
+
+def write_results(conn, values: dict[int, dict[str, object]]):
+    """Store {sample_id: {result_name: value}} in sample_results, replacing same-name rows."""
+    c = conn.cursor()
+    pairs = [(sid, name) for sid, res in values.items() for name in res]
+    c.executemany("DELETE FROM sample_results WHERE sample_id=? AND result_name=?", pairs)
+    c.executemany(
+        "INSERT INTO sample_results(sample_id, result_name, result_value) VALUES(?,?,?)",
+        [(sid, name, "" if v is None else str(v)) for sid, res in values.items() for name, v in res.items()])
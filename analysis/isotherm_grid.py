@@ -0,0 +1,155 @@
+# analysis/isotherm_grid.py
+"""
+Isotherms resampled on one fixed, log-spaced P/P0 grid.
+
+Every sample's adsorption and desorption branch is interpolated (linearly in
+log P/P0) onto GRID and stored as float32 blobs in isotherm_grid, one row per
+sample. load_matrix() stacks the rows into dense (n_samples, GRID_SIZE)
+matrices with a sample-id index, so comparisons, averages and overlays are
+array slices:
+
+    m = load_matrix(conn)                 # whole DB
+    rows = m.rows(ids)                    # sample ids -> matrix rows
+    mean_ads = np.nanmean(m.ads[rows], axis=0)
+
+Grid points outside a branch's measured range are NaN. Rows are written at
+ingest (ingest_samples) and by backfill(), which only touches samples whose
+isotherm changed since their row was written.
+
+    python -m analysis.isotherm_grid adsorption.db [--force]
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import argparse
+import time
+
+import numpy as np
+
+from analysis import cache
+from analysis.isotherm_data import IsothermBatch, interp_rows, load_isotherms, sample_ids
+
+P_MIN, P_MAX = 1e-7, 0.999
+GRID_SIZE = 128
+GRID = np.geomspace(P_MIN, P_MAX, GRID_SIZE)
+GRID_KEY = f"log:{P_MIN:g}:{P_MAX:g}:{GRID_SIZE}"
+_CHUNK = 2000
+_LOG_GRID = np.log10(GRID)
+
+
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS isotherm_grid (
+            sample_id INTEGER PRIMARY KEY,
+            grid TEXT,
+            isotherm_hash TEXT,
+            ads BLOB,
+            des BLOB,
+            FOREIGN KEY(sample_id) REFERENCES samples(id)
+        )
+    """)
+
+
+def resample(P: np.ndarray, V: np.ndarray) -> np.ndarray:
+    """(n, m) NaN-padded branch -> (n, GRID_SIZE) float32 on GRID."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        LP = np.where(P > 0, np.log10(P), np.nan)
+    return interp_rows(_LOG_GRID, LP, V).astype(np.float32)
+
+
+def store(conn, batch: IsothermBatch, hashes=None):
+    ensure_table(conn)
+    hashes = hashes or cache.isotherm_hashes(batch)
+    ads = resample(batch.p_ads, batch.v_ads)
+    des = resample(batch.p_des, batch.v_des)
+    conn.executemany(
+        "INSERT OR REPLACE INTO isotherm_grid(sample_id, grid, isotherm_hash, ads, des) VALUES(?,?,?,?,?)",
+        [(int(sid), GRID_KEY, h, ads[i].tobytes(), des[i].tobytes())
+         for i, (sid, h) in enumerate(zip(batch.ids, hashes))])
+
+
+def ingest_samples(conn, names):
+    """Grid rows for freshly ingested samples (called from DatabaseModel.ingest_excel)."""
+    store(conn, load_isotherms(conn, names))
+
+
+def backfill(conn, force: bool = False, report=print) -> int:
+    """Write grid rows for samples that have none or whose isotherm changed; returns rows written."""
+    ensure_table(conn)
+    ids, names = sample_ids(conn)
+    have = {} if force else {
+        sid: h for sid, h in conn.execute("SELECT sample_id, isotherm_hash FROM isotherm_grid WHERE grid=?",
+                                          (GRID_KEY,))}
+    written = 0
+    for s in range(0, len(ids), _CHUNK):
+        batch = load_isotherms(conn, names[s:s + _CHUNK])
+        hashes = cache.isotherm_hashes(batch)
+        stale = [i for i, (sid, h) in enumerate(zip(batch.ids, hashes)) if have.get(int(sid)) != h]
+        if stale:
+            store(conn, batch.subset(stale), [hashes[i] for i in stale])
+            written += len(stale)
+        conn.commit()
+        report(f"Isotherm grid: {min(s + _CHUNK, len(ids))}/{len(ids)} checked, {written} written")
+    conn.execute("DELETE FROM isotherm_grid WHERE sample_id NOT IN (SELECT id FROM samples)")
+    conn.commit()
+    return written
+
+
+@dataclass
+class GridMatrix:
+    ids: np.ndarray          # (n,) sample ids, row order
+    ads: np.ndarray          # (n, GRID_SIZE) float32
+    des: np.ndarray
+    grid: np.ndarray = field(default_factory=lambda: GRID)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, ids) -> np.ndarray:
+        """Matrix rows for the given sample ids (-1 where a sample has no grid row)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(ids), -1)
+        order = np.argsort(self.ids)
+        pos = np.clip(np.searchsorted(self.ids[order], ids), 0, len(self.ids) - 1)
+        found = self.ids[order][pos] == ids
+        return np.where(found, order[pos], -1)
+
+
+def load_matrix(conn, ids=None) -> GridMatrix:
+    """Dense grid matrices for the given sample ids (all rows if None)."""
+    ensure_table(conn)
+    if ids is None:
+        rows = conn.execute("SELECT sample_id, ads, des FROM isotherm_grid WHERE grid=? ORDER BY sample_id",
+                            (GRID_KEY,)).fetchall()
+    else:
+        rows = []
+        ids = [int(x) for x in ids]
+        for s in range(0, len(ids), 900):
+            part = ids[s:s + 900]
+            rows += conn.execute(
+                f"SELECT sample_id, ads, des FROM isotherm_grid WHERE grid=? AND sample_id IN "
+                f"({','.join('?' * len(part))}) ORDER BY sample_id", [GRID_KEY] + part).fetchall()
+    if not rows:
+        empty = np.empty((0, GRID_SIZE), np.float32)
+        return GridMatrix(np.empty(0, np.int64), empty, empty.copy())
+    sid = np.array([r[0] for r in rows], dtype=np.int64)
+    ads = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(len(rows), GRID_SIZE)
+    des = np.frombuffer(b"".join(r[2] for r in rows), dtype=np.float32).reshape(len(rows), GRID_SIZE)
+    return GridMatrix(sid, ads, des)
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Backfill the common P/P0 grid store")
+    ap.add_argument("db")
+    ap.add_argument("--force", action="store_true", help="rewrite every row")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    n = backfill(conn, opts.force)
+    t1 = time.perf_counter()
+    m = load_matrix(conn)
+    print(f"⏱ {n} rows written in {t1 - t0:.2f}s; {len(m)} x {GRID_SIZE} matrix loaded in "
+          f"{time.perf_counter() - t1:.3f}s ({m.ads.nbytes * 2 / 1e6:.1f} MB)")
@@ -0,0 +1,230 @@
+# analysis/iupac.py
+"""
+IUPAC isotherm type (I–VI) and hysteresis loop type (H1–H5) for batches of
+samples, following the shape descriptions of Thommes et al., Pure Appl.
+Chem. 87 (2015) 1051.
+
+Both branches are interpolated (linearly in log P/P0) onto P_GRID. P_GRID
+is log-spaced below 0.1 and linear above it, so that the loop is resolved
+finely. The adsorption branch is normalised by its last point. Every rule
+below is then a column comparison over the whole batch:
+
+    VI   >= 3 separate steep steps below P/P0 = 0.9
+    V    convex start (little uptake at 0.05 and 0.3) with a loop
+    III  convex start, no loop
+    IV   loop and a plateau at high P/P0, or no loop but a plateau after a
+         mesopore rise between 0.3 and 0.8 (IVb)
+    I    most of the uptake below 0.05 and a plateau, no loop
+    II   everything else (also the adsorption branch under H3/H4 loops)
+
+    H5   two separate loop regions, closing at the cavitation limit
+    H2   desorption falls much more steeply than adsorption rises
+    H1   narrow, near-parallel branches with a plateau
+    H4   no plateau, strong micropore uptake (Type I + II composite)
+    H3   no plateau, little micropore uptake
+
+The loop area is the integral of (desorption − adsorption) over P/P0 >= 0.1.
+Its unit is cc(STP)/g times P/P0. The closure pressure is the lowest P/P0 at
+which the branches are still apart. Samples whose adsorption branch does not
+cover 0.05–0.8 are not classified.
+
+The labels and loop values are written to sample_results at ingest and by
+the whole-DB batch job. sample_results is indexed on (result_name,
+result_value), so the Trace window's Advanced Filter and grouping on
+"IUPAC Type" / "Hysteresis Type" stay fast.
+
+    python -m analysis.iupac adsorption.db [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+import argparse
+import time
+
+import numpy as np
+
+from analysis.isotherm_data import IsothermBatch, interp_rows, load_isotherms, sample_ids, write_results
+
+RESULT_TYPE = "IUPAC Type"
+RESULT_HYST = "Hysteresis Type"
+RESULT_AREA = "Hysteresis Loop Area (calc) [cc/g × P/P0]"
+RESULT_CLOSURE = "Hysteresis Closure (calc) [P/P0]"
+RESULT_NAMES = (RESULT_TYPE, RESULT_HYST, RESULT_AREA, RESULT_CLOSURE,
+                "Hysteresis Loop Area (calc) [cc/g]")     # earlier label of RESULT_AREA
+
+KEY_P = (0.05, 0.3, 0.8, 0.9)
+P_GRID = np.unique(np.r_[np.geomspace(1e-6, 0.1, 60), np.linspace(0.1, 0.999, 180), KEY_P])
+_LOG_GRID = np.log10(P_GRID)
+_LOOP = P_GRID >= 0.1
+
+KNEE = 0.6               # Type I: share of the uptake reached by 0.05
+MICRO = 0.4              # H4: share of the uptake reached by 0.05
+PLATEAU_RISE = 0.1       # plateau: less than this share is taken up above 0.8
+MESO_RISE = 0.25         # IVb: share taken up between 0.3 and 0.8
+STEP_RISE = 0.03         # VI: share taken up in one grid interval (~0.005 P/P0)
+LOOP_MIN_GAP = 0.03      # loop: largest normalised gap between the branches ...
+LOOP_MIN_AREA = 0.005    # ... and normalised area
+LOOP_TOL = 0.01          # branches count as apart above this normalised gap
+CAVITATION = (0.4, 0.52)  # forced closure range for N2 at 77 K
+H2_RATIO = 0.5           # H2: desorption width / adsorption width below this
+_CHUNK = 2000
+
+
+@dataclass
+class IupacResult:
+    ids: np.ndarray
+    names: list[str]
+    iso_type: np.ndarray     # (n,) "I".."VI", "" when not classified
+    hysteresis: np.ndarray   # (n,) "H1".."H5", "none", ""
+    loop_area: np.ndarray    # (n,) cc/g · P/P0, NaN without a loop
+    closure: np.ndarray      # (n,) P/P0, NaN without a loop
+
+    def counts(self) -> tuple[Counter, Counter]:
+        ok = self.iso_type != ""
+        return Counter(self.iso_type[ok].tolist()), Counter(self.hysteresis[ok].tolist())
+
+
+def _col(p):
+    return int(np.searchsorted(P_GRID, p))
+
+
+def _on_grid(P, V):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        LP = np.where(P > 0, np.log10(P), np.nan)
+    return interp_rows(_LOG_GRID, LP, V)
+
+
+def _runs(mask):
+    """Number of separate True runs per row."""
+    return mask[:, :1].sum(1) + (mask[:, 1:] & ~mask[:, :-1]).sum(1)
+
+
+def _first(mask, default=np.nan):
+    """P/P0 of the first True column per row."""
+    return np.where(mask.any(1), P_GRID[mask.argmax(1)], default)
+
+
+def classify(batch: IsothermBatch):
+    """(iso_type, hysteresis, loop_area, closure) arrays for every sample of the batch."""
+    n = len(batch)
+    A = _on_grid(batch.p_ads, batch.v_ads)
+    D = _on_grid(batch.p_des, batch.v_des)
+    finite = np.isfinite(A)
+    last = A.shape[1] - 1 - finite[:, ::-1].argmax(1)
+    top = A[np.arange(n), last]
+    p_end = np.where(finite.any(1), P_GRID[last], 0.0)
+    ok = finite.any(1) & (top > 0) & (p_end >= KEY_P[2]) & finite[:, _col(KEY_P[0])]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        V = A / top[:, None]
+        f05, f30, f80 = (V[:, _col(p)] for p in KEY_P[:3])
+        plateau = (1.0 - f80) < PLATEAU_RISE
+        convex = (f05 < 0.05) & (f30 < 0.25)
+
+        # VI: separate steep steps on the linear part below 0.9
+        lin = _LOOP & (P_GRID <= KEY_P[3])
+        steps = _runs(np.nan_to_num(np.diff(V[:, lin], axis=1)) > STEP_RISE)
+
+        # loop on P/P0 >= 0.1
+        P = P_GRID[_LOOP]
+        Al, Dl = A[:, _LOOP], D[:, _LOOP]
+        both = np.isfinite(Al) & np.isfinite(Dl)
+        gap = np.where(both, Dl - Al, 0.0)
+        L = gap / top[:, None]
+        L_max = L.max(1)
+        pos = np.maximum(gap, 0.0)
+        area = (0.5 * (pos[:, 1:] + pos[:, :-1]) * np.diff(P)).sum(1)
+        has_loop = ok & (L_max > LOOP_MIN_GAP) & (area / top > LOOP_MIN_AREA)
+        apart = both & (L > np.maximum(LOOP_TOL, 0.05 * L_max)[:, None])
+        closure = np.where(has_loop, P[apart.argmax(1)], np.nan)
+
+        # widths (P/P0 from 10 % to 90 % of the rise above closure) of both branches
+        above = P[None, :] >= closure[:, None]
+        below = np.maximum((~above).sum(1) - 1, 0)
+        base = np.nan_to_num(Al[np.arange(n), below])                   # adsorption just below closure
+        width = []
+        for B in (Al, Dl):
+            frac = (B - base[:, None]) / (top - base)[:, None]
+            width.append(_first(above & (frac >= 0.9), 1.0) - _first(above & (frac >= 0.1), 0.0))
+        w_ads, w_des = width
+        humps = _runs(both & (L > 0.5 * L_max[:, None]))
+        cavitation = (closure >= CAVITATION[0]) & (closure <= CAVITATION[1])
+
+    iso_type = np.select(
+        [~ok, steps >= 3, convex & has_loop, convex, has_loop & plateau, has_loop,
+         (f05 >= KNEE) & plateau, plateau & (f80 - f30 > MESO_RISE)],
+        ["", "VI", "V", "III", "IV", "II", "I", "IV"], "II")
+    hysteresis = np.select(
+        [~ok, ~has_loop, ~plateau & (f05 >= MICRO), ~plateau, (humps >= 2) & cavitation,
+         w_des < H2_RATIO * w_ads],
+        ["", "none", "H4", "H3", "H5", "H2"], "H1")
+    return iso_type, hysteresis, np.where(has_loop, area, np.nan), closure
+
+
+def run(conn, names=None, report=print) -> IupacResult:
+    """Classify the given samples (all samples if names is None), chunk by chunk."""
+    ids, names = sample_ids(conn, names)
+    parts = []
+    for s in range(0, len(ids), _CHUNK):
+        batch = load_isotherms(conn, names[s:s + _CHUNK])
+        parts.append((batch.ids, batch.names) + classify(batch))
+        report(f"IUPAC classification: {min(s + _CHUNK, len(ids))}/{len(ids)}")
+    if not parts:
+        return IupacResult(np.empty(0, np.int64), [], np.empty(0, str), np.empty(0, str), np.empty(0), np.empty(0))
+    return IupacResult(np.concatenate([p[0] for p in parts]), [n for p in parts for n in p[1]],
+                       *(np.concatenate([p[k] for p in parts]) for k in range(2, 6)))
+
+
+def _values(result: IupacResult) -> dict[int, dict]:
+    values = {}
+    for sid, t, h, a, c in zip(result.ids, result.iso_type, result.hysteresis, result.loop_area, result.closure):
+        if t:
+            values[int(sid)] = {
+                RESULT_TYPE: t,
+                RESULT_HYST: h,
+                RESULT_AREA: round(float(a), 4) if a == a else "",
+                RESULT_CLOSURE: round(float(c), 3) if c == c else "",
+            }
+    return values
+
+
+def _store(conn, result: IupacResult) -> int:
+    """Replace the labels of every sample in result; samples no longer classified lose their old ones."""
+    conn.executemany("DELETE FROM sample_results WHERE sample_id=? AND result_name=?",
+                     [(int(sid), name) for sid in result.ids for name in RESULT_NAMES])
+    values = _values(result)
+    write_results(conn, values)
+    return len(values)
+
+
+def write_iupac(conn, result: IupacResult) -> int:
+    n = _store(conn, result)
+    conn.commit()
+    return n
+
+
+def ingest_samples(conn, names):
+    """Labels for freshly ingested samples (called from DatabaseModel.ingest_excel)."""
+    _store(conn, run(conn, names, report=lambda _: None))
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="IUPAC isotherm / hysteresis classification")
+    ap.add_argument("db")
+    ap.add_argument("--samples", nargs="*", help="sample names (default: all)")
+    ap.add_argument("--write", action="store_true", help="store labels in sample_results")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.samples)
+    print(f"⏱ {len(res.ids)} samples in {time.perf_counter() - t0:.2f}s")
+    types, loops = res.counts()
+    print("  types: " + ", ".join(f"{k}: {v}" for k, v in sorted(types.items())))
+    print("  loops: " + ", ".join(f"{k}: {v}" for k, v in sorted(loops.items())))
+    for name, t, h, a, c in list(zip(res.names, res.iso_type, res.hysteresis, res.loop_area, res.closure))[:20]:
+        print(f"  {name}: {t or '—'} {h} area={a:.3g} closure={c:.3g}")
+    if opts.write:
+        print(f"💾 {write_iupac(conn, res)} samples written")
@@ -0,0 +1,234 @@
+# analysis/micropore.py
+"""
+t-plot and αs analysis of the adsorption branch for batches of samples.
+
+Each point of the isotherm is mapped to a statistical film thickness t(p)
+(t-plot) or to a reduced reference isotherm αs(p) = v_ref(p) / v_ref(0.4)
+(αs-plot). A straight line through the points inside the fit range gives
+
+    intercept -> micropore volume  (cc STP/g x gas-to-liquid factor)
+    slope     -> external surface area
+    internal area = BET area - external area
+
+Thickness equations (t in nm, p = P/P0): see THICKNESS. Reference curves for
+αs are either one of the thickness equations (αs = t(p) / t(0.4)) or the
+isotherm of a non-porous reference sample stored in the same database.
+
+Results are cached per sample (analysis/cache.py) under the settings used, so
+re-running over the whole database only computes new or changed isotherms; the
+cache hash includes the sample's 吸附质面积, which the BET (and so the internal)
+area depends on.
+
+    python -m analysis.micropore adsorption.db [--thickness harkins-jura]
+        [--reference sample:NAME] [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import argparse
+import time
+
+import numpy as np
+
+from analysis import bet, cache
+from analysis.isotherm_data import IsothermBatch, as_floats, info_values, interp_rows, load_isotherms, write_results
+
+GAS_TO_LIQUID = 0.0015468      # N2 at 77 K: cc(STP) -> cc liquid
+
+THICKNESS = {
+    "harkins-jura": lambda p: 0.1 * np.sqrt(13.99 / (0.034 - np.log10(p))),
+    "halsey": lambda p: 0.354 * (-5.0 / np.log(p)) ** (1.0 / 3.0),
+    "kjs": lambda p: 0.1 * (60.65 / (0.03071 - np.log10(p))) ** 0.3968,
+    "carbon-black": lambda p: 0.088 * p * p + 0.645 * p + 0.298,
+}
+
+RESULT_T_VMICRO = "t-Plot (calc) micropore volume [cc/g]"
+RESULT_T_EXT = "t-Plot (calc) external area [m^2/g]"
+RESULT_T_INT = "t-Plot (calc) internal area [m^2/g]"
+RESULT_T_R2 = "t-Plot (calc) R^2"
+RESULT_A_VMICRO = "αs (calc) micropore volume [cc/g]"
+RESULT_A_EXT = "αs (calc) external area [m^2/g]"
+RESULT_A_R2 = "αs (calc) R^2"
+RESULT_METHOD = "t-Plot/αs (calc) method"
+# vendor fields (SampleExporter.EXCEL_CELL_MAP) holding the same quantities
+VENDOR_FIELDS = {
+    RESULT_T_EXT: "t-Plot(吸附)外比表面积[m^2/g]",
+    RESULT_T_INT: "t-Plot(吸附)内比表面积[m^2/g]",
+    RESULT_A_EXT: "αs(吸附)中孔比表面积[m^2/g]",
+    RESULT_T_VMICRO: "t-Plot(吸附)微孔体积[cc/g]",
+    RESULT_A_VMICRO: "αs(吸附)微孔体积[cc/g]",
+}
+
+
+@dataclass
+class MicroporeSettings:
+    thickness: str = "harkins-jura"
+    t_range: tuple = (0.35, 0.50)           # nm
+    reference: str = "thickness"            # "thickness" or "sample:<name>"
+    alpha_range: tuple = (0.8, 1.2)
+    gas_to_liquid: float = GAS_TO_LIQUID
+
+    def key(self, ref_hash: str = "") -> str:
+        d = dict(self.__dict__, t_range=list(self.t_range), alpha_range=list(self.alpha_range))
+        if ref_hash:
+            d["reference_hash"] = ref_hash
+        return cache.params_key(d)
+
+    def describe(self) -> str:
+        return (f"t: {self.thickness} {self.t_range[0]}–{self.t_range[1]} nm; "
+                f"αs: {self.reference} {self.alpha_range[0]}–{self.alpha_range[1]}")
+
+
+@dataclass
+class Reference:
+    """Reduced standard curve αs(p) with its area per unit αs slope."""
+    name: str
+    alpha: object                  # callable p -> αs
+    area_per_slope: float          # m^2/g per (cc STP/g per unit αs)
+    hash: str = ""
+
+
+@dataclass
+class MicroporeResult:
+    ids: np.ndarray
+    names: list[str]
+    values: list[dict] = field(default_factory=list)     # per sample, RESULT_* -> value (NaN if no fit)
+
+
+def thickness_reference(settings: MicroporeSettings) -> Reference:
+    t = THICKNESS[settings.thickness]
+    t04 = float(t(0.4))
+    return Reference(settings.thickness, lambda p: t(p) / t04, 1000.0 * settings.gas_to_liquid / t04)
+
+
+def sample_reference(conn, name: str, settings: MicroporeSettings) -> Reference:
+    """αs curve from a non-porous reference sample; its BET area scales the slope."""
+    ref = load_isotherms(conn, [name])
+    if not len(ref) or ref.n_ads()[0] < 5:
+        raise ValueError(f"Reference sample '{name}' has no usable adsorption branch")
+    sigma = as_floats(info_values(conn, ref.ids, "%吸附质面积%"), ref.ids)
+    area = bet.compute(ref, sigma).area[0]
+    if not np.isfinite(area):
+        raise ValueError(f"No valid BET range for reference sample '{name}'")
+    p, v = ref.p_ads[:1], ref.v_ads[:1]
+    v04 = interp_rows(np.array([0.4]), p, np.fmax.accumulate(np.nan_to_num(v), axis=1))[0, 0]
+    if not np.isfinite(v04) or v04 <= 0:
+        raise ValueError(f"Reference sample '{name}' does not cover P/P0 = 0.4")
+
+    def alpha(P):
+        P = np.atleast_2d(P)
+        return interp_rows(P.reshape(1, -1), p, v).reshape(P.shape) / v04
+
+    return Reference(f"sample:{name}", alpha, float(area / v04), _hashes(ref, sigma)[0])
+
+
+def _hashes(batch, sigma) -> list[str]:
+    """Isotherm hashes extended by the cross-section (吸附质面积) the BET area was computed with."""
+    return [f"{h}:{s:.6g}" for h, s in zip(cache.isotherm_hashes(batch), sigma)]
+
+
+def _line_fit(X: np.ndarray, Y: np.ndarray, lo: float, hi: float):
+    """Row-wise least squares of Y on X for lo <= X <= hi -> slope, intercept, r2, n."""
+    m = np.isfinite(X) & np.isfinite(Y) & (X >= lo) & (X <= hi)
+    k = m.sum(axis=1).astype(float)
+    X0 = np.where(m, X, 0.0)
+    Y0 = np.where(m, Y, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mx = X0.sum(1) / k
+        my = Y0.sum(1) / k
+        dx = np.where(m, X - mx[:, None], 0.0)
+        dy = np.where(m, Y - my[:, None], 0.0)
+        sxx, syy, sxy = (dx * dx).sum(1), (dy * dy).sum(1), (dx * dy).sum(1)
+        slope = sxy / sxx
+        icpt = my - slope * mx
+        r2 = sxy * sxy / (sxx * syy)
+    bad = k < 2
+    slope[bad] = icpt[bad] = r2[bad] = np.nan
+    return slope, icpt, r2, k
+
+
+def compute(batch: IsothermBatch, settings: MicroporeSettings, reference: Reference,
+            bet_area: np.ndarray) -> list[dict]:
+    P, V = batch.p_ads, batch.v_ads
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ok = (P > 0) & (P < 1)
+        T = np.where(ok, THICKNESS[settings.thickness](np.where(ok, P, 0.5)), np.nan)
+        A = np.where(ok, reference.alpha(np.where(ok, P, 0.5)), np.nan)
+    ts, ti, tr2, _ = _line_fit(T, V, *settings.t_range)
+    as_, ai, ar2, _ = _line_fit(A, V, *settings.alpha_range)
+
+    t_ext = ts * settings.gas_to_liquid * 1000.0      # (cc STP/g/nm) -> m^2/g
+    a_ext = as_ * reference.area_per_slope
+    out = []
+    for k in range(len(batch)):
+        out.append({
+            RESULT_T_VMICRO: float(ti[k] * settings.gas_to_liquid),
+            RESULT_T_EXT: float(t_ext[k]),
+            RESULT_T_INT: float(bet_area[k] - t_ext[k]),
+            RESULT_T_R2: float(tr2[k]),
+            RESULT_A_VMICRO: float(ai[k] * settings.gas_to_liquid),
+            RESULT_A_EXT: float(a_ext[k]),
+            RESULT_A_R2: float(ar2[k]),
+        })
+    return out
+
+
+def run(conn, names=None, settings: MicroporeSettings | None = None, report=print) -> MicroporeResult:
+    """t-plot/αs for the named samples (all if None), reusing cached results."""
+    settings = settings or MicroporeSettings()
+    if settings.reference.startswith("sample:"):
+        reference = sample_reference(conn, settings.reference[len("sample:"):], settings)
+    else:
+        reference = thickness_reference(settings)
+    key = settings.key(reference.hash)
+
+    batch = load_isotherms(conn, names)
+    sigma = as_floats(info_values(conn, batch.ids, "%吸附质面积%"), batch.ids)
+    hashes = _hashes(batch, sigma)
+    hit = cache.load(conn, "micropore", key, batch.ids, hashes)
+    todo = np.array([k for k in range(len(batch)) if k not in hit], dtype=int)
+    report(f"t-plot/αs: {len(hit)} cached, {len(todo)} to compute")
+    if len(todo):
+        sub = batch.subset(todo)
+        fresh = compute(sub, settings, reference, bet.compute(sub, sigma[todo]).area)
+        new = {int(k): r for k, r in zip(todo, fresh)}
+        cache.store(conn, "micropore", key, batch.ids, hashes, new)
+        hit.update(new)
+    return MicroporeResult(batch.ids, batch.names, [hit[k] for k in range(len(batch))])
+
+
+def write_micropore(conn, result: MicroporeResult, settings: MicroporeSettings) -> int:
+    values = {}
+    for sid, row in zip(result.ids, result.values):
+        stored = {name: round(v, 6) for name, v in row.items() if v == v}
+        if stored:
+            stored[RESULT_METHOD] = settings.describe()
+            values[int(sid)] = stored
+    write_results(conn, values)
+    conn.commit()
+    return len(values)
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Batch t-plot / αs micropore analysis")
+    ap.add_argument("db")
+    ap.add_argument("--thickness", default="harkins-jura", choices=sorted(THICKNESS))
+    ap.add_argument("--t-range", nargs=2, type=float, default=(0.35, 0.50))
+    ap.add_argument("--reference", default="thickness", help='"thickness" or "sample:<name>"')
+    ap.add_argument("--alpha-range", nargs=2, type=float, default=(0.8, 1.2))
+    ap.add_argument("--samples", nargs="*", help="sample names (default: all)")
+    ap.add_argument("--write", action="store_true", help="store results in sample_results")
+    opts = ap.parse_args()
+
+    s = MicroporeSettings(opts.thickness, tuple(opts.t_range), opts.reference, tuple(opts.alpha_range))
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.samples, s)
+    conn.commit()
+    print(f"⏱ {len(res.ids)} samples in {time.perf_counter() - t0:.2f}s ({s.describe()})")
+    for name, row in zip(res.names, res.values):
+        print(f"  {name}: t Vmicro {row[RESULT_T_VMICRO]:.4f} Sext {row[RESULT_T_EXT]:.1f} "
+              f"Sint {row[RESULT_T_INT]:.1f} | αs Vmicro {row[RESULT_A_VMICRO]:.4f} Sext {row[RESULT_A_EXT]:.1f}")
+    if opts.write:
+        print(f"💾 {write_micropore(conn, res, s)} samples written")
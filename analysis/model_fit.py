@@ -0,0 +1,285 @@
+# analysis/model_fit.py
+"""
+Batch nonlinear fits of isotherm models to the adsorption branch.
+
+    langmuir    q = qm K p / (1 + K p)
+    freundlich  q = Kf p^(1/n)
+    sips        q = qm (K p)^n / (1 + (K p)^n)
+    toth        q = qm K p / (1 + (K p)^t)^(1/t)
+    dr          q = q0 exp(-(A / E)^2),  A = R T ln(1/p)  [kJ/mol]
+
+p is P/P0 and q is cc(STP)/g. All parameters are positive and are fitted as
+logarithms. A Levenberg–Marquardt loop runs on the whole batch at once.
+Each sample keeps its own damping, and converged samples drop out of the
+active set. Starting points come from linearised fits (Langmuir, Freundlich,
+DR), and Sips and Toth start from the fitted Langmuir parameters, where both
+reduce to Langmuir.
+
+Parameters, R², RMSE and the residual vectors are cached per sample
+(analysis/cache.py); the scalars also go to sample_results.
+
+    python -m analysis.model_fit adsorption.db [--models langmuir sips ...]
+        [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import time
+
+import numpy as np
+
+from analysis import cache
+from analysis.isotherm_data import IsothermBatch, load_isotherms, write_results
+
+R_GAS = 8.314462618e-3     # kJ/(mol K)
+T_N2 = 77.35
+
+
+def _langmuir(P, th, T):
+    qm, K = th[..., 0:1], th[..., 1:2]
+    return qm * K * P / (1.0 + K * P)
+
+
+def _freundlich(P, th, T):
+    Kf, n = th[..., 0:1], th[..., 1:2]
+    return Kf * P ** (1.0 / n)
+
+
+def _sips(P, th, T):
+    qm, K, n = th[..., 0:1], th[..., 1:2], th[..., 2:3]
+    x = (K * P) ** n
+    return qm * x / (1.0 + x)
+
+
+def _toth(P, th, T):
+    qm, K, t = th[..., 0:1], th[..., 1:2], th[..., 2:3]
+    return qm * K * P / (1.0 + (K * P) ** t) ** (1.0 / t)
+
+
+def _dr(P, th, T):
+    q0, E = th[..., 0:1], th[..., 1:2]
+    A = R_GAS * T * np.log(1.0 / P)
+    return q0 * np.exp(-(A / E) ** 2)
+
+
+# name -> (function, parameter names)
+MODELS = {
+    "langmuir": (_langmuir, ("qm [cc/g]", "K")),
+    "freundlich": (_freundlich, ("Kf [cc/g]", "n")),
+    "sips": (_sips, ("qm [cc/g]", "K", "n")),
+    "toth": (_toth, ("qm [cc/g]", "K", "t")),
+    "dr": (_dr, ("q0 [cc/g]", "E [kJ/mol]")),
+}
+LABELS = {"langmuir": "Langmuir", "freundlich": "Freundlich", "sips": "Sips", "toth": "Toth", "dr": "DR"}
+
+
+def result_name(model: str, quantity: str) -> str:
+    return f"Fit {LABELS[model]} (calc) {quantity}"
+
+
+@dataclass
+class FitSettings:
+    models: tuple = tuple(MODELS)
+    p_min: float = 1e-6
+    p_max: float = 0.95
+    temperature: float = T_N2       # K, for DR
+    max_iter: int = 200
+
+    def key(self) -> str:
+        return cache.params_key(dict(self.__dict__, models=sorted(self.models)))
+
+
+@dataclass
+class FitResult:
+    ids: np.ndarray
+    names: list[str]
+    values: list[dict]      # per sample: {model: {"params": [...], "r2", "rmse", "residuals"}}
+    cached: int = 0
+
+
+def _linfit(X, Y, M):
+    """Row-wise least squares Y = a + b X over mask M -> (a, b)."""
+    k = np.maximum(M.sum(1), 1)
+    X0, Y0 = np.where(M, X, 0.0), np.where(M, Y, 0.0)
+    mx, my = X0.sum(1) / k, Y0.sum(1) / k
+    dx = np.where(M, X - mx[:, None], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        b = (dx * np.where(M, Y - my[:, None], 0.0)).sum(1) / (dx * dx).sum(1)
+    return my - b * mx, b
+
+
+def _initial(model: str, P, Q, M, T, langmuir=None):
+    """Linearised starting parameters (n, k), not yet in log space."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if model == "langmuir":
+            a, b = _linfit(P, P / Q, M)                  # p/q = 1/(qm K) + p/qm
+            qm = 1.0 / b
+            K = b / a
+            bad = ~((qm > 0) & (K > 0))
+            qm = np.where(bad, np.nanmax(np.where(M, Q, np.nan), 1), qm)
+            K = np.where(bad, 100.0, K)
+            return np.c_[qm, K]
+        if model == "freundlich":
+            a, b = _linfit(np.log(P), np.log(Q), M)
+            return np.c_[np.exp(a), np.where(b > 0, 1.0 / b, 1.0)]
+        if model == "dr":
+            A2 = (R_GAS * T * np.log(1.0 / P)) ** 2
+            a, b = _linfit(A2, np.log(Q), M)
+            return np.c_[np.exp(a), np.where(b < 0, 1.0 / np.sqrt(-b), 5.0)]
+        return np.c_[langmuir, np.ones(len(P))]        # sips / toth: n = t = 1 is Langmuir
+
+
+def levenberg_marquardt(f, P, Q, M, theta0, T, max_iter=200, tol=1e-10):
+    """
+    Batched LM on log-parameters. f(P, exp(theta), T) -> (n, m) model values.
+    Returns theta (n, k) in log space and the final sum of squared residuals.
+    """
+    n, k = theta0.shape
+    theta = np.clip(np.log(np.where(np.isfinite(theta0) & (theta0 > 0), theta0, 1.0)), -40, 40)
+    lam = np.full(n, 1e-3)
+
+    def residual(P_, Q_, M_, th):
+        with np.errstate(all="ignore"):
+            r = f(P_, np.exp(th), T) - Q_
+        return np.where(M_, np.nan_to_num(r, nan=1e12, posinf=1e12, neginf=-1e12), 0.0)
+
+    r = residual(P, Q, M, theta)
+    cost = (r * r).sum(1)
+    active = np.arange(n)
+    for _ in range(max_iter):
+        if not len(active):
+            break
+        Pa, Qa, Ma, th, ra = P[active], Q[active], M[active], theta[active], r[active]
+        J = np.empty(ra.shape + (k,))
+        h = 1e-6
+        for j in range(k):
+            d = th.copy()
+            d[:, j] += h
+            J[..., j] = (residual(Pa, Qa, Ma, d) - ra) / h
+        A = np.einsum("nmi,nmj->nij", J, J)
+        g = np.einsum("nmi,nm->ni", J, ra)
+        diag = np.einsum("nii->ni", A)
+        A_damped = A + (lam[active, None] * (diag + 1e-12))[:, :, None] * np.eye(k)
+        try:
+            step = np.linalg.solve(A_damped, -g[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            step = -g / (np.einsum("nii->ni", A_damped) + 1e-12)
+        trial = np.clip(th + step, -40, 40)
+        r_new = residual(Pa, Qa, Ma, trial)
+        c_new = (r_new * r_new).sum(1)
+        better = c_new < cost[active]
+        rel = (cost[active] - c_new) / np.maximum(cost[active], 1e-300)
+        idx = active[better]
+        theta[idx], r[idx], cost[idx] = trial[better], r_new[better], c_new[better]
+        lam[idx] /= 3.0
+        lam[active[~better]] *= 4.0
+        done = (better & (rel < tol)) | (lam[active] > 1e10) | (np.abs(step).max(1) < 1e-10)
+        active = active[~done]
+    return theta, cost
+
+
+def compute(batch: IsothermBatch, settings: FitSettings) -> list[dict]:
+    P, Q = batch.p_ads, batch.v_ads
+    M = np.isfinite(P) & np.isfinite(Q) & (P > settings.p_min) & (P < settings.p_max) & (Q > 0)
+    P = np.where(M, P, 0.5)
+    Q = np.where(M, Q, 1.0)
+    n_pts = M.sum(1)
+    ss_tot = (np.where(M, Q - (np.where(M, Q, 0).sum(1) / np.maximum(n_pts, 1))[:, None], 0.0) ** 2).sum(1)
+    T = settings.temperature
+
+    out = [dict() for _ in range(len(batch))]
+    fitted = {}
+    order = sorted(settings.models, key=lambda m: m not in ("langmuir",))   # langmuir first
+    for model in order:
+        f, names = MODELS[model]
+        if model in ("sips", "toth") and "langmuir" not in fitted:
+            lm_theta, _ = levenberg_marquardt(_langmuir, P, Q, M, _initial("langmuir", P, Q, M, T), T,
+                                              settings.max_iter)
+            start = np.c_[np.exp(lm_theta), np.ones(len(P))]
+        else:
+            start = _initial(model, P, Q, M, T, fitted.get("langmuir"))
+        theta, cost = levenberg_marquardt(f, P, Q, M, start, T, settings.max_iter)
+        params = np.exp(theta)
+        fitted[model] = params
+        with np.errstate(all="ignore"):
+            resid = np.where(M, f(P, params, T) - Q, np.nan)
+            r2 = 1.0 - cost / ss_tot
+            rmse = np.sqrt(cost / np.maximum(n_pts, 1))
+        ok = n_pts > len(names)
+        for i in range(len(batch)):
+            if not ok[i]:
+                out[i][model] = None
+                continue
+            out[i][model] = {
+                "params": [float(x) for x in params[i]],
+                "r2": float(r2[i]),
+                "rmse": float(rmse[i]),
+                "residuals": np.round(resid[i][M[i]], 5).tolist(),
+            }
+    return out
+
+
+def run(conn, names=None, settings: FitSettings | None = None, report=print) -> FitResult:
+    settings = settings or FitSettings()
+    key = settings.key()
+    batch = load_isotherms(conn, names)
+    hashes = cache.isotherm_hashes(batch)
+    hit = cache.load(conn, "model_fit", key, batch.ids, hashes)
+    todo = np.array([k for k in range(len(batch)) if k not in hit], dtype=int)
+    report(f"Model fits: {len(hit)} cached, {len(todo)} to fit")
+    n_cached = len(hit)
+    if len(todo):
+        new = dict(zip(todo.tolist(), compute(batch.subset(todo), settings)))
+        cache.store(conn, "model_fit", key, batch.ids, hashes, new)
+        hit.update(new)
+    return FitResult(batch.ids, batch.names, [hit[k] for k in range(len(batch))], n_cached)
+
+
+def write_fits(conn, result: FitResult) -> int:
+    values = {}
+    for sid, row in zip(result.ids, result.values):
+        stored = {}
+        for model, fit in row.items():
+            if not fit:
+                continue
+            for pname, v in zip(MODELS[model][1], fit["params"]):
+                stored[result_name(model, pname)] = float(f"{v:.6g}")
+            stored[result_name(model, "R^2")] = round(fit["r2"], 6)
+            stored[result_name(model, "RMSE [cc/g]")] = float(f"{fit['rmse']:.4g}")
+        if stored:
+            values[int(sid)] = stored
+    write_results(conn, values)
+    conn.commit()
+    return len(values)
+
+
+def summary(result: FitResult, limit=20) -> list[str]:
+    rows = []
+    for name, row in list(zip(result.names, result.values))[:limit]:
+        fits = [f"{LABELS[m]} R²={fit['r2']:.4f}" for m, fit in row.items() if fit]
+        rows.append(f"{name}: " + (", ".join(fits) or "not enough points"))
+    return rows
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Batch isotherm model fitting")
+    ap.add_argument("db")
+    ap.add_argument("--models", nargs="*", default=list(MODELS), choices=list(MODELS))
+    ap.add_argument("--p-max", type=float, default=0.95)
+    ap.add_argument("--temperature", type=float, default=T_N2)
+    ap.add_argument("--samples", nargs="*", help="sample names (default: all)")
+    ap.add_argument("--write", action="store_true", help="store results in sample_results")
+    opts = ap.parse_args()
+
+    s = FitSettings(tuple(opts.models), p_max=opts.p_max, temperature=opts.temperature)
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.samples, s)
+    conn.commit()
+    print(f"⏱ {len(res.ids)} samples in {time.perf_counter() - t0:.2f}s ({res.cached} cached)")
+    for line in summary(res):
+        print("  " + line)
+    if opts.write:
+        print(f"💾 {write_fits(conn, res)} samples written")
@@ -0,0 +1,222 @@
+# analysis/psd_cluster.py
+"""
+Cluster all samples by pore-size distribution.
+
+Features per sample (from the psd_grid store, see analysis/similarity.py):
+
+    PSD(total) on the log diameter grid, scaled to unit length
+    the seven pore-range percentages of the overview, scaled to unit length
+
+stacked with weights sqrt(w) and sqrt(1 - w), so squared distances mix the
+two parts as w : 1 - w. Samples without a PSD are left unlabelled.
+
+    kmeans        k-means++ seeding, Lloyd iterations with BLAS distances,
+                  best of N_INIT runs
+    hierarchical  Ward linkage; above MAX_WARD samples the data are first
+                  reduced to MAX_WARD k-means micro-clusters (fitted on a
+                  subsample of MICRO_SAMPLE rows, then every row is assigned
+                  to its nearest micro-centre), which are then merged with
+                  size-weighted Ward (Lance–Williams updates)
+
+Clusters are numbered by the mean pore diameter of their members (C1 has the
+smallest pores), and the label is stored in sample_results as "PSD Cluster",
+so it shows up in the Trace window and the Advanced Filter.
+
+    python -m analysis.psd_cluster adsorption.db [--k 8] [--method kmeans] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import time
+
+import numpy as np
+
+from analysis import similarity
+from analysis.isotherm_data import write_results
+
+RESULT_CLUSTER = "PSD Cluster"
+METHODS = ("kmeans", "hierarchical")
+N_INIT = 3
+MAX_ITER = 100
+MAX_WARD = 400
+MICRO_SAMPLE = 20 * MAX_WARD
+
+
+@dataclass
+class ClusterResult:
+    ids: np.ndarray          # clustered sample ids
+    labels: np.ndarray       # (n,) 1..k
+    sizes: np.ndarray        # (k,)
+    inertia: float
+    method: str
+
+
+def features(psd: np.ndarray, ranges: np.ndarray, weight: float = 0.5) -> np.ndarray:
+    P = psd.astype(np.float32)
+    R = np.nan_to_num(ranges.astype(np.float32))
+    P /= np.maximum(np.linalg.norm(P, axis=1, keepdims=True), 1e-12)
+    R /= np.maximum(np.linalg.norm(R, axis=1, keepdims=True), 1e-12)
+    X = np.hstack([P * np.float32(np.sqrt(weight)), R * np.float32(np.sqrt(1.0 - weight))])
+    X[np.abs(X) < 1e-12] = 0.0      # PSD tails underflow to float32 denormals, which stall BLAS
+    return X
+
+
+def _sq_dist(X, C, xx=None):
+    xx = (X * X).sum(1)[:, None] if xx is None else xx
+    return np.maximum(xx - 2.0 * (X @ C.T) + (C * C).sum(1)[None, :], 0.0)
+
+
+def _cluster_sums(X, labels, k):
+    """Per-cluster row sums via one sort + reduceat (np.add.at is far slower)."""
+    order = np.argsort(labels, kind="stable")
+    counts = np.bincount(labels, minlength=k)
+    sums = np.zeros((k, X.shape[1]), X.dtype)
+    present = np.flatnonzero(counts)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+    sums[present] = np.add.reduceat(X[order], starts, axis=0)
+    return sums
+
+
+def _kmeanspp(X, k, rng, xx):
+    centers = [X[rng.integers(len(X))]]
+    d = _sq_dist(X, centers[0][None], xx)[:, 0]
+    for _ in range(1, k):
+        total = d.sum()
+        i = rng.choice(len(X), p=d / total) if total > 0 else rng.integers(len(X))
+        centers.append(X[i])
+        d = np.minimum(d, _sq_dist(X, X[i][None], xx)[:, 0])
+    return np.array(centers)
+
+
+def kmeans(X: np.ndarray, k: int, n_init: int = N_INIT, max_iter: int = MAX_ITER, seed: int = 0,
+           weights: np.ndarray | None = None):
+    """(labels 0..k-1, centres, inertia); weights give per-row multiplicity."""
+    rng = np.random.default_rng(seed)
+    w = np.ones(len(X), X.dtype) if weights is None else weights.astype(X.dtype)
+    xx = (X * X).sum(1)[:, None]
+    best = None
+    for _ in range(n_init):
+        C = _kmeanspp(X, k, rng, xx)
+        for _ in range(max_iter):
+            D = _sq_dist(X, C, xx)
+            labels = D.argmin(1)
+            mass = np.bincount(labels, weights=w, minlength=k)
+            sums = _cluster_sums(X * w[:, None], labels, k)
+            empty = mass == 0
+            newC = np.where(empty[:, None], X[rng.integers(len(X), size=k)], sums / np.maximum(mass, 1e-12)[:, None])
+            shift = np.abs(newC - C).max()
+            C = newC.astype(X.dtype)
+            if shift < 1e-6:
+                break
+        D = _sq_dist(X, C, xx)
+        labels = D.argmin(1)
+        inertia = float((D[np.arange(len(X)), labels] * w).sum())
+        if best is None or inertia < best[2]:
+            best = (labels, C, inertia)
+    return best
+
+
+def ward(X: np.ndarray, k: int, sizes: np.ndarray | None = None) -> np.ndarray:
+    """Ward agglomeration of the rows of X down to k clusters -> labels 0..k-1."""
+    m = len(X)
+    n = np.ones(m) if sizes is None else sizes.astype(float)
+    X = X.astype(float)
+    # Ward distance between singletons (weighted by their sizes)
+    D = _sq_dist(X, X) * (n[:, None] * n[None, :]) / (n[:, None] + n[None, :])
+    np.fill_diagonal(D, np.inf)
+    alive = np.ones(m, bool)
+    members = np.arange(m)
+    for _ in range(m - k):
+        i, j = np.unravel_index(np.argmin(D), D.shape)
+        if i > j:
+            i, j = j, i
+        ni, nj = n[i], n[j]
+        nk = n
+        # Lance–Williams update for Ward
+        new = ((ni + nk) * D[i] + (nj + nk) * D[j] - nk * D[i, j]) / (ni + nj + nk)
+        D[i], D[:, i] = new, new
+        D[i, i] = np.inf
+        D[j, :] = np.inf
+        D[:, j] = np.inf
+        n[i] = ni + nj
+        alive[j] = False
+        members[members == j] = i
+    roots = np.flatnonzero(alive)
+    return np.searchsorted(roots, members)
+
+
+def cluster(X: np.ndarray, k: int, method: str = "kmeans", seed: int = 0):
+    """(labels 0..k-1, inertia) for the rows of X."""
+    if method == "kmeans":
+        labels, _, inertia = kmeans(X, k, seed=seed)
+        return labels, inertia
+    if len(X) > MAX_WARD:
+        rng = np.random.default_rng(seed)
+        sub = X if len(X) <= MICRO_SAMPLE else X[rng.choice(len(X), MICRO_SAMPLE, replace=False)]
+        _, C, _ = kmeans(sub, MAX_WARD, n_init=1, max_iter=30, seed=seed)
+        micro = _sq_dist(X, C).argmin(1)
+        sizes = np.bincount(micro, minlength=MAX_WARD)
+        keep = sizes > 0
+        merged = ward(C[keep], k, sizes[keep])
+        lut = np.zeros(MAX_WARD, int)
+        lut[keep] = merged
+        labels = lut[micro]
+    else:
+        labels = ward(X, k)
+    centres = np.array([X[labels == c].mean(0) for c in range(k)])
+    inertia = float(((X - centres[labels]) ** 2).sum())
+    return labels, inertia
+
+
+def _order_by_pore_size(labels, psd, k):
+    """Renumber clusters 1..k by the PSD-weighted mean log diameter of their members."""
+    logd = np.log10(similarity.PSD_GRID)
+    mass = psd.sum(1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_logd = (psd @ logd) / mass
+    key = np.array([np.nanmean(mean_logd[labels == c]) if (labels == c).any() else np.inf for c in range(k)])
+    rank = np.empty(k, int)
+    rank[np.argsort(np.nan_to_num(key, nan=np.inf))] = np.arange(1, k + 1)
+    return rank[labels]
+
+
+def run(conn, k: int = 8, method: str = "kmeans", weight: float = 0.5, report=print) -> ClusterResult:
+    similarity.psd_backfill(conn, report=report)
+    ids, psd, ranges = similarity.load_psd_matrix(conn, with_ranges=True)
+    has = psd.any(1)
+    ids, psd, ranges = ids[has], psd[has], ranges[has]
+    if len(ids) < k:
+        raise ValueError(f"Only {len(ids)} sample(s) have a PSD; need at least k = {k}")
+    report(f"Clustering {len(ids)} PSDs into {k} clusters ({method}) …")
+    X = features(psd, ranges, weight)
+    labels, inertia = cluster(X, k, method)
+    labels = _order_by_pore_size(labels, psd, k)
+    return ClusterResult(ids, labels, np.bincount(labels, minlength=k + 1)[1:], inertia, method)
+
+
+def write_clusters(conn, result: ClusterResult) -> int:
+    """Replace every PSD Cluster label with the new ones."""
+    conn.execute("DELETE FROM sample_results WHERE result_name=?", (RESULT_CLUSTER,))
+    write_results(conn, {int(sid): {RESULT_CLUSTER: f"C{lab}"} for sid, lab in zip(result.ids, result.labels)})
+    conn.commit()
+    return len(result.ids)
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Cluster samples by PSD")
+    ap.add_argument("db")
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--method", default="kmeans", choices=METHODS)
+    ap.add_argument("--weight", type=float, default=0.5, help="share of the PSD curve vs the pore-range vector")
+    ap.add_argument("--write", action="store_true", help="store labels in sample_results")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    res = run(conn, opts.k, opts.method, opts.weight)
+    print(f"⏱ {len(res.ids)} samples in {time.perf_counter() - t0:.2f}s, inertia {res.inertia:.4g}, "
+          f"sizes {res.sizes.tolist()}")
+    if opts.write:
+        print(f"💾 {write_clusters(conn, res)} labels written")
@@ -0,0 +1,269 @@
+# analysis/psd_inversion.py
+"""
+Native PSD inversion: stored isotherm -> pore size distribution with an
+NLDFT/GCMC kernel, without the Soran GUI.
+
+    V(p_i) = sum_j K[i, j] * g_j ,   g_j >= 0
+
+K[i, j] is the kernel's adsorbed amount at pressure p_i per unit pore volume
+of width w_j [cc(STP)/cc], g_j the pore volume in width class j [cc/g]. The
+PSD is g / dw. The fit minimises
+
+    || W (K G - Y) ||^2 + lam * || D G ||^2     subject to  G >= 0
+
+for all samples at once (columns of G and Y), where D is the second
+difference operator (smoothness) and W masks pressures a sample does not
+cover. It is solved by FISTA (accelerated projected gradient), so each iteration
+is two matrix products over the whole selection.
+
+settings.json supplies min_pressure / max_pressure (fit range) and
+smooth_factor: lam = smooth_factor * 1e-3 * ||K||^2, 0 = plain NNLS.
+
+Kernel files (user supplied):
+    .csv   first row: label, w_1 ... w_n   (pore widths, nm)
+           then rows: p/p0, K[i, 1] ... K[i, n]
+    .npz   arrays "pressures", "widths", "kernel" (len(pressures) x len(widths))
+
+    python -m analysis.psd_inversion adsorption.db kernel.csv [--samples A B ...] [--write]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from analysis.isotherm_data import IsothermBatch, interp_rows, load_isotherms, write_results
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SETTINGS_PATH = os.path.join(ROOT_DIR, "settings.json")
+
+# pore range labels used by get_sample_overview / the LeftPanel columns [nm]
+PORE_RANGES = [("0~0.5", 0.0, 0.5), ("0.5~0.7", 0.5, 0.7), ("0.7~1", 0.7, 1.0), ("1~2", 1.0, 2.0),
+               ("2~5", 2.0, 5.0), ("5~10", 5.0, 10.0), ("10~Inf", 10.0, np.inf)]
+
+RESULT_KERNEL = "DFT (native) kernel"
+RESULT_RESIDUAL = "DFT (native) fit residual [%]"
+RESULT_VOLUME = "DFT (native) cumulative pore volume [cc/g]"
+
+
+@dataclass
+class Kernel:
+    name: str
+    pressures: np.ndarray     # (m,) P/P0, ascending
+    widths: np.ndarray        # (w,) nm, ascending
+    matrix: np.ndarray        # (m, w)
+
+    def bin_widths(self) -> np.ndarray:
+        """dw of each width class (midpoint rule on the width grid)."""
+        w = self.widths
+        if len(w) < 2:
+            return np.ones_like(w)
+        edges = np.concatenate(([w[0] - (w[1] - w[0]) / 2], (w[:-1] + w[1:]) / 2,
+                                [w[-1] + (w[-1] - w[-2]) / 2]))
+        return np.diff(edges)
+
+
+@dataclass
+class PsdResult:
+    ids: np.ndarray           # (n,)
+    names: list[str]
+    widths: np.ndarray        # (w,)
+    volumes: np.ndarray       # (n, w) pore volume per width class g [cc/g]
+    psd: np.ndarray           # (n, w) dV/dw [cc/g/nm]
+    residual: np.ndarray      # (n,) relative fit residual [%], NaN = no data in range
+    iterations: int
+
+    def percentages(self, ranges=PORE_RANGES) -> np.ndarray:
+        """(n, len(ranges)) share of the pore volume per range [%]."""
+        total = self.volumes.sum(axis=1, keepdims=True)
+        cols = [self.volumes[:, (self.widths >= lo) & (self.widths < hi)].sum(axis=1) for _, lo, hi in ranges]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, np.stack(cols, axis=1) / total * 100.0, 0.0)
+
+
+def load_kernel(path: str) -> Kernel:
+    name = os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith(".npz"):
+        with np.load(path) as z:
+            p, w, k = np.asarray(z["pressures"], float), np.asarray(z["widths"], float), np.asarray(z["kernel"], float)
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as fh:
+            rows = [r for r in csv.reader(fh) if r and any(x.strip() for x in r)]
+        w = np.array([float(x) for x in rows[0][1:]])
+        body = np.array([[float(x) for x in r[:len(w) + 1]] for r in rows[1:]])
+        p, k = body[:, 0], body[:, 1:]
+    if k.shape != (len(p), len(w)):
+        raise ValueError(f"kernel {name}: matrix {k.shape} does not match {len(p)} pressures x {len(w)} widths")
+    po, wo = np.argsort(p), np.argsort(w)
+    return Kernel(name, p[po], w[wo], k[np.ix_(po, wo)])
+
+
+def synthetic_kernel(pressures=None, widths=None, sharpness: float = 0.35) -> Kernel:
+    """
+    Smooth stand-in kernel for tests and demos: pores of width w fill along a
+    logistic step in ln(p) centred at p_c(w) = exp(-2.5 / w) (narrow pores
+    fill first), saturating at 1 cc(STP) per 0.00155 cc pore (liquid N2).
+    """
+    p = np.geomspace(1e-6, 0.99, 80) if pressures is None else np.asarray(pressures, float)
+    w = np.geomspace(0.4, 30.0, 60) if widths is None else np.asarray(widths, float)
+    centre = -2.5 / w
+    k = 1.0 / (1.0 + np.exp(-(np.log(p)[:, None] - centre[None, :]) / (sharpness * (1 + np.log1p(w))[None, :])))
+    return Kernel("synthetic", p, w, k / 0.0015468)
+
+
+def load_settings(path: str = SETTINGS_PATH) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _float(value, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _second_difference(n: int) -> np.ndarray:
+    d = np.zeros((max(n - 2, 0), n))
+    idx = np.arange(n - 2)
+    d[idx, idx], d[idx, idx + 1], d[idx, idx + 2] = 1.0, -2.0, 1.0
+    return d
+
+
+def nnls_batch(K: np.ndarray, Y: np.ndarray, W: np.ndarray | None = None, lam: float = 0.0,
+               max_iter: int = 3000, tol: float = 1e-5) -> tuple[np.ndarray, int]:
+    """
+    Solve min ||W(KG - Y)||^2 + lam ||D G||^2, G >= 0 for all columns of Y
+    with FISTA. K (m, w), Y (m, n), W (m, n) 0/1 weights. Returns (G, iterations).
+    """
+    m, nw = K.shape
+    W = np.ones_like(Y) if W is None else W
+    Y = np.where(W > 0, Y, 0.0)
+    # solve for H = S G with unit-norm kernel columns: much better conditioned
+    s = np.linalg.norm(K, axis=0)
+    s[s == 0] = 1.0
+    Ks = K / s
+    D = _second_difference(nw) / s
+    R = lam * (D.T @ D)
+    lip = np.linalg.norm(Ks, 2) ** 2 + (np.linalg.norm(R, 2) if lam else 0.0)
+    step = 1.0 / lip
+    KtY = Ks.T @ (W * Y)
+    H = np.zeros((nw, Y.shape[1]))
+    Z = H
+    yy = (W * Y * Y).sum(axis=0)
+
+    def objective(X):
+        r = W * (Ks @ X) - W * Y
+        return (r * r).sum(axis=0) + (X * (R @ X)).sum(axis=0)
+
+    f_prev = objective(H) + yy
+    it = 0
+    t = np.ones(Y.shape[1])
+    for it in range(1, max_iter + 1):
+        grad = Ks.T @ (W * (Ks @ Z)) - KtY + R @ Z
+        H_new = np.maximum(Z - step * grad, 0.0)
+        # adaptive restart: drop a sample's momentum when it points uphill
+        uphill = ((Z - H_new) * (H_new - H)).sum(axis=0) > 0
+        t = np.where(uphill, 1.0, t)
+        t_new = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        Z = H_new + ((t - 1.0) / t_new) * (H_new - H)
+        H, t = H_new, t_new
+        if it % 25 == 0:
+            # stop once no sample's objective moved by more than tol (relative) in 25 steps
+            f = objective(H)
+            if (np.abs(f_prev - f) <= tol * np.maximum(f, 1e-12 * yy + 1e-30)).all():
+                break
+            f_prev = f
+    G = H / s[:, None]
+    return G, it
+
+
+def invert(batch: IsothermBatch, kernel: Kernel, settings: dict | None = None,
+           branch: str = "ads", max_iter: int = 3000) -> PsdResult:
+    """Fit every sample of the batch against the kernel in one vectorized solve."""
+    settings = load_settings() if settings is None else settings
+    p_min = _float(settings.get("min_pressure"), 0.0)
+    p_max = _float(settings.get("max_pressure"), 1.0)
+    smooth = _float(settings.get("smooth_factor"), 0.0)
+
+    rows = (kernel.pressures >= p_min) & (kernel.pressures <= p_max)
+    K = kernel.matrix[rows]
+    P, V = (batch.p_ads, batch.v_ads) if branch == "ads" else (batch.p_des, batch.v_des)
+    Y = interp_rows(kernel.pressures[rows], P, V).T           # (m, n)
+    W = np.isfinite(Y).astype(float)
+    lam = smooth * 1e-3 * np.linalg.norm(K, 2) ** 2
+    G, iterations = nnls_batch(K, np.nan_to_num(Y), W, lam, max_iter=max_iter)
+
+    fit = K @ G
+    with np.errstate(invalid="ignore", divide="ignore"):
+        res = np.sqrt((W * (fit - np.nan_to_num(Y)) ** 2).sum(axis=0)) / np.sqrt((W * np.nan_to_num(Y) ** 2).sum(axis=0))
+    res = np.where(W.sum(axis=0) > 0, res * 100.0, np.nan)
+    volumes = G.T
+    return PsdResult(batch.ids, batch.names, kernel.widths, volumes, volumes / kernel.bin_widths(),
+                     res, iterations)
+
+
+def dft_rows(result: PsdResult, i: int) -> list[dict]:
+    """dft_data rows for sample i, in the layout parse_excel produces (range rows + PSD curve)."""
+    pct = result.percentages()[i]
+    n = max(len(PORE_RANGES), len(result.widths))
+    rows = []
+    for k in range(n):
+        rows.append({
+            "pore_range": PORE_RANGES[k][0] if k < len(PORE_RANGES) else None,
+            "percentage": float(round(pct[k], 6)) if k < len(PORE_RANGES) else 0.0,
+            "Pore Diameter(nm)": float(result.widths[k]) if k < len(result.widths) else None,
+            "PSD(total)": float(result.psd[i, k]) if k < len(result.widths) else None,
+        })
+    return rows
+
+
+def write_psd(model, conn, result: PsdResult, kernel_name: str):
+    """Replace dft_data / pore_distribution of each fitted sample and record the fit quality."""
+    values = {}
+    for i, sid in enumerate(result.ids):
+        if np.isnan(result.residual[i]):
+            continue
+        rows = dft_rows(result, i)
+        model._ingest_dft_list(int(sid), rows, conn=conn)
+        model._ingest_pore_distribution_from_dft(int(sid), rows, conn=conn)
+        values[int(sid)] = {
+            RESULT_KERNEL: kernel_name,
+            RESULT_RESIDUAL: round(float(result.residual[i]), 3),
+            RESULT_VOLUME: round(float(result.volumes[i].sum()), 6),
+        }
+    write_results(conn, values)
+    conn.commit()
+    return len(values)
+
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, ROOT_DIR)
+    from model.database_model import DatabaseModel
+
+    ap = argparse.ArgumentParser(description="Invert stored isotherms into PSDs with a kernel file")
+    ap.add_argument("db")
+    ap.add_argument("kernel", help="kernel .csv/.npz, or 'synthetic'")
+    ap.add_argument("--samples", nargs="*", help="sample names (default: all)")
+    ap.add_argument("--settings", default=SETTINGS_PATH)
+    ap.add_argument("--write", action="store_true", help="store results in dft_data/pore_distribution")
+    opts = ap.parse_args()
+
+    model = DatabaseModel(opts.db)
+    kern = synthetic_kernel() if opts.kernel == "synthetic" else load_kernel(opts.kernel)
+    t0 = time.perf_counter()
+    batch = load_isotherms(model.conn, opts.samples)
+    out = invert(batch, kern, load_settings(opts.settings))
+    print(f"⏱ {len(batch)} samples inverted in {time.perf_counter() - t0:.2f}s ({out.iterations} iterations)")
+    for name, r, v in zip(out.names, out.residual, out.volumes.sum(axis=1)):
+        print(f"  {name}: residual {r:.2f}%  V = {v:.4f} cc/g")
+    if opts.write:
+        print(f"💾 {write_psd(model, model.conn, out, kern.name)} samples written")
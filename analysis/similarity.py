@@ -0,0 +1,316 @@
+# analysis/similarity.py
+"""
+Nearest-neighbour search over isotherm and PSD shapes.
+
+Each sample becomes up to two unit vectors:
+
+    isotherm  the adsorption branch on the common P/P0 grid (isotherm_grid),
+              scaled by its maximum; gaps are filled with 0 below the first
+              and with the last value above the last measured point
+    psd       PSD(total) from dft_data resampled on a log grid of pore
+              diameters (psd_grid table), zero outside the measured range
+
+psd_grid also keeps each sample's pore-range percentages (RANGE_LABELS).
+
+The index keeps both as float32 matrices with unit rows, so cosine
+similarity against every sample is one matrix-vector product (BLAS). With
+mode "both" the score is the mean of the two cosines. Above APPROX_THRESHOLD
+rows (or on request), candidates come first from a PCA-reduced copy of the
+index and only the best few hundred are re-scored exactly.
+
+    idx = build_index(conn)
+    hits = idx.query(sample_id, k=10, mode="isotherm")   # [(sample_id, score)]
+
+    python -m analysis.similarity adsorption.db SAMPLE [--k 10] [--mode both]
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import argparse
+import json
+import time
+
+import numpy as np
+
+from analysis import isotherm_grid
+from analysis.isotherm_data import interp_rows, sample_ids
+
+PSD_D_MIN, PSD_D_MAX = 0.3, 1000.0      # in the units of the dft_data "Pore Diameter(nm)" column
+PSD_GRID_SIZE = 96
+PSD_GRID = np.geomspace(PSD_D_MIN, PSD_D_MAX, PSD_GRID_SIZE)
+PSD_GRID_KEY = f"log:{PSD_D_MIN:g}:{PSD_D_MAX:g}:{PSD_GRID_SIZE}"
+# pore_range labels of the dft_data rows, as shown in the sample overview
+RANGE_LABELS = ("0~0.5", "0.5~0.7", "0.7~1", "1~2", "2~5", "5~10", "10~Inf")
+APPROX_THRESHOLD = 200_000
+APPROX_DIM = 24
+APPROX_CANDIDATES = 400
+MODES = ("isotherm", "psd", "both")
+_CHUNK = 900
+
+
+# ---------------- PSD grid store ----------------
+def ensure_psd_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS psd_grid (
+            sample_id INTEGER PRIMARY KEY,
+            grid TEXT,
+            signature TEXT,
+            psd BLOB,
+            ranges BLOB,
+            FOREIGN KEY(sample_id) REFERENCES samples(id)
+        )
+    """)
+    if "ranges" not in {r[1] for r in conn.execute("PRAGMA table_info(psd_grid)")}:
+        conn.execute("ALTER TABLE psd_grid ADD COLUMN ranges BLOB")
+
+
+def _dft_signatures(conn) -> dict[int, str]:
+    """Cheap change marker per sample: row count and highest rowid of its dft_data rows."""
+    return {sid: f"{n}:{top}" for sid, n, top in
+            conn.execute("SELECT sample_id, COUNT(*), MAX(rowid) FROM dft_data GROUP BY sample_id")}
+
+
+def _psd_curves(conn, ids) -> tuple[np.ndarray, np.ndarray]:
+    """PSD(total) on PSD_GRID and the RANGE_LABELS percentages [%] (NaN if absent) per sample."""
+    out = np.zeros((len(ids), PSD_GRID_SIZE), np.float32)
+    ranges = np.full((len(ids), len(RANGE_LABELS)), np.nan, np.float32)
+    row_of = {int(s): i for i, s in enumerate(ids)}
+    pts = {int(s): ([], []) for s in ids}
+    range_rows = {int(s): [[], False] for s in ids}
+    ids = list(row_of)
+    for s in range(0, len(ids), _CHUNK):
+        part = ids[s:s + _CHUNK]
+        q = (f"SELECT sample_id, data_json FROM dft_data WHERE sample_id IN ({','.join('?' * len(part))}) "
+             "ORDER BY sample_id, row_index")
+        for sid, data in conn.execute(q, part):
+            rec = json.loads(data)
+            span = _parse_range(rec.get("pore_range"))
+            blocks = range_rows[sid]
+            if span and not blocks[1]:
+                try:
+                    blocks[0].append((span[1], float(rec.get("percentage", 0))))
+                except (TypeError, ValueError):
+                    pass
+            elif blocks[0]:
+                blocks[1] = True        # first block of ranges (the total PSD) is complete
+            d, v = rec.get("Pore Diameter(nm)"), rec.get("PSD(total)")
+            if isinstance(d, (int, float)) and isinstance(v, (int, float)) and d > 0 and v == v:
+                pts[sid][0].append(d)
+                pts[sid][1].append(v)
+    for sid, (d, v) in pts.items():
+        if len(d) > 1:
+            d, v = np.asarray(d), np.asarray(v)
+            order = np.argsort(d)
+            curve = interp_rows(np.log10(PSD_GRID), np.log10(d[order])[None], v[order][None])[0]
+            out[row_of[sid]] = np.nan_to_num(curve)
+    for sid, (spans, _) in range_rows.items():
+        if spans:
+            ranges[row_of[sid]] = _rebin_ranges(spans)
+    return out, ranges
+
+
+def _parse_range(label):
+    """'0.7~1' -> (0.7, 1.0), '10~Inf' -> (10.0, inf); None for anything else."""
+    try:
+        lo, hi = str(label).split("~")
+        return float(lo), float(hi)
+    except (ValueError, AttributeError):
+        return None
+
+
+_STD_EDGES = np.array([_parse_range(label)[1] for label in RANGE_LABELS[:-1]])
+
+
+def _rebin_ranges(spans) -> np.ndarray:
+    """Percentages of arbitrary 'a~b' ranges [(upper edge, %)] re-binned onto RANGE_LABELS."""
+    upper = np.array([u for u, _ in spans], float)
+    cum = np.cumsum([pct for _, pct in spans])
+    finite = np.isfinite(upper)
+    edges = np.concatenate(([0.0], upper[finite]))
+    cum = np.concatenate(([0.0], cum[finite]))
+    at = np.interp(_STD_EDGES, edges, cum)
+    total = cum[-1] + sum(p for u, p in spans if not np.isfinite(u))
+    return np.diff(np.concatenate(([0.0], at, [total]))).astype(np.float32)
+
+
+def psd_backfill(conn, report=print) -> int:
+    """(Re)write psd_grid rows for samples whose dft_data changed; returns rows written."""
+    ensure_psd_table(conn)
+    sig = _dft_signatures(conn)
+    have = {sid: s for sid, s in conn.execute(
+        "SELECT sample_id, signature FROM psd_grid WHERE grid=? AND ranges IS NOT NULL", (PSD_GRID_KEY,))}
+    stale = [sid for sid, s in sig.items() if have.get(sid) != s]
+    for s in range(0, len(stale), 5000):
+        part = stale[s:s + 5000]
+        curves, ranges = _psd_curves(conn, part)
+        conn.executemany(
+            "INSERT OR REPLACE INTO psd_grid(sample_id, grid, signature, psd, ranges) VALUES(?,?,?,?,?)",
+            [(sid, PSD_GRID_KEY, sig[sid], curves[i].tobytes(), ranges[i].tobytes()) for i, sid in enumerate(part)])
+        conn.commit()
+        report(f"PSD grid: {min(s + 5000, len(stale))}/{len(stale)} written")
+    conn.execute("DELETE FROM psd_grid WHERE sample_id NOT IN (SELECT DISTINCT sample_id FROM dft_data)")
+    conn.commit()
+    return len(stale)
+
+
+def load_psd_matrix(conn, with_ranges: bool = False):
+    """(ids, psd) or, with_ranges, (ids, psd, range percentages) sorted by sample id."""
+    ensure_psd_table(conn)
+    rows = conn.execute("SELECT sample_id, psd, ranges FROM psd_grid WHERE grid=? AND ranges IS NOT NULL "
+                        "ORDER BY sample_id", (PSD_GRID_KEY,)).fetchall()
+    n = len(rows)
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    psd = np.frombuffer(b"".join(r[1] for r in rows), np.float32).reshape(n, PSD_GRID_SIZE)
+    if not with_ranges:
+        return ids, psd
+    ranges = np.frombuffer(b"".join(r[2] for r in rows), np.float32).reshape(n, len(RANGE_LABELS))
+    return ids, psd, ranges
+
+
+# ---------------- feature vectors ----------------
+def isotherm_features(ads: np.ndarray) -> np.ndarray:
+    """Grid isotherms (n, G) -> max-scaled shapes with gaps filled, not yet unit length."""
+    X = np.array(ads, dtype=np.float32)
+    valid = np.isfinite(X)
+    first = np.argmax(valid, axis=1)
+    cols = np.arange(X.shape[1])[None, :]
+    # forward fill from the last measured point, zeros below the first
+    idx = np.where(valid, cols, 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    X = np.take_along_axis(np.nan_to_num(X), idx, axis=1)
+    X[cols < first[:, None]] = 0.0
+    peak = X.max(1, keepdims=True)
+    return np.where(peak > 0, X / np.where(peak > 0, peak, 1), 0).astype(np.float32)
+
+
+def _unit_rows(X: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(X, axis=1, keepdims=True)
+    return np.where(norm > 0, X / np.where(norm > 0, norm, 1), 0).astype(np.float32)
+
+
+@dataclass
+class SimilarityIndex:
+    ids: np.ndarray           # (n,) sample ids
+    iso: np.ndarray           # (n, G) unit rows, zero row = no isotherm
+    psd: np.ndarray           # (n, H) unit rows, zero row = no PSD
+    signature: tuple = ()
+    _reduced: dict | None = None
+    _both: np.ndarray | None = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _matrix(self, mode):
+        if mode == "isotherm":
+            return self.iso
+        if mode == "psd":
+            return self.psd
+        if self._both is None:
+            # x·q over the stacked, rescaled halves is the mean of the two cosines
+            self._both = np.hstack([self.iso, self.psd]) * np.float32(np.sqrt(0.5))
+        return self._both
+
+    def _row(self, sample_id) -> int:
+        pos = np.searchsorted(self.ids, sample_id)
+        if pos >= len(self.ids) or self.ids[pos] != sample_id:
+            raise KeyError(f"Sample id {sample_id} is not in the similarity index")
+        return int(pos)
+
+    def _approx_scores(self, X, q, mode):
+        """Scores in a PCA subspace (built lazily per mode)."""
+        if self._reduced is None:
+            self._reduced = {}
+        if mode not in self._reduced:
+            sample = X[np.random.default_rng(0).choice(len(X), min(len(X), 20000), replace=False)]
+            _, _, vt = np.linalg.svd(sample - sample.mean(0), full_matrices=False)
+            basis = vt[:APPROX_DIM].T.astype(np.float32)
+            self._reduced[mode] = (basis, X @ basis)
+        basis, Z = self._reduced[mode]
+        return Z @ (q @ basis)
+
+    def query(self, sample_id: int, k: int = 10, mode: str = "isotherm", approximate=None):
+        """[(sample_id, cosine score)] of the k most similar samples, best first."""
+        X = self._matrix(mode)
+        row = self._row(int(sample_id))
+        q = X[row]
+        if not q.any():
+            raise ValueError(f"Sample has no {mode} data to compare")
+        if approximate is None:
+            approximate = len(X) > APPROX_THRESHOLD
+        if approximate:
+            rough = self._approx_scores(X, q, mode)
+            rough[row] = -np.inf
+            cand = np.argpartition(-rough, min(APPROX_CANDIDATES, len(rough) - 1))[:APPROX_CANDIDATES]
+            scores = X[cand] @ q
+        else:
+            cand = np.arange(len(X))
+            scores = X @ q                        # one BLAS sgemv
+        scores[cand == row] = -np.inf             # never return the query sample itself
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[cand[i]]), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+def index_signature(conn) -> tuple:
+    """Changes whenever samples, isotherm grid rows or PSD rows change."""
+    isotherm_grid.ensure_table(conn)
+    ensure_psd_table(conn)
+    return tuple(conn.execute(
+        "SELECT (SELECT COUNT(*) FROM samples), (SELECT MAX(id) FROM samples), "
+        "(SELECT COUNT(*) FROM adsorption_data), (SELECT MAX(rowid) FROM adsorption_data), "
+        "(SELECT COUNT(*) FROM dft_data), (SELECT MAX(rowid) FROM dft_data)").fetchone())
+
+
+def build_index(conn, report=print) -> SimilarityIndex:
+    """Bring the grid stores up to date and build the in-memory index."""
+    isotherm_grid.backfill(conn, report=report)
+    psd_backfill(conn, report=report)
+    ids, _ = sample_ids(conn)
+    ids = np.sort(ids)
+    grid = isotherm_grid.load_matrix(conn)
+    iso = np.zeros((len(ids), isotherm_grid.GRID_SIZE), np.float32)
+    r = grid.rows(ids)
+    iso[r >= 0] = isotherm_features(grid.ads[r[r >= 0]])
+    psd_ids, psd = load_psd_matrix(conn)
+    P = np.zeros((len(ids), PSD_GRID_SIZE), np.float32)
+    pos = np.searchsorted(ids, psd_ids)
+    ok = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == psd_ids)
+    P[pos[ok]] = psd[ok]
+    return SimilarityIndex(ids, _unit_rows(iso), _unit_rows(P), index_signature(conn))
+
+
+def names_for(conn, ids) -> dict[int, str]:
+    out = {}
+    ids = [int(x) for x in ids]
+    for s in range(0, len(ids), _CHUNK):
+        part = ids[s:s + _CHUNK]
+        out.update(conn.execute(f"SELECT id, name FROM samples WHERE id IN ({','.join('?' * len(part))})", part))
+    return out
+
+
+if __name__ == "__main__":
+    import sqlite3
+
+    ap = argparse.ArgumentParser(description="Find the most similar samples by isotherm / PSD shape")
+    ap.add_argument("db")
+    ap.add_argument("sample")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--mode", default="both", choices=MODES)
+    ap.add_argument("--approximate", action="store_true")
+    opts = ap.parse_args()
+
+    conn = sqlite3.connect(opts.db)
+    t0 = time.perf_counter()
+    idx = build_index(conn)
+    t1 = time.perf_counter()
+    sid = sample_ids(conn, [opts.sample])[0]
+    if not len(sid):
+        raise SystemExit(f"No sample named '{opts.sample}'")
+    hits = idx.query(int(sid[0]), opts.k, opts.mode, opts.approximate or None)
+    t2 = time.perf_counter()
+    print(f"⏱ index of {len(idx)} samples in {t1 - t0:.2f}s, query in {(t2 - t1) * 1000:.1f} ms")
+    names = names_for(conn, [h[0] for h in hits])
+    for rank, (hid, score) in enumerate(hits, 1):
+        print(f"  {rank:2d}. {names.get(hid, hid)}  {score:.4f}")
@@ -0,0 +1,87 @@
+# automation/dft_csv.py
+"""
+Typed reader for Soran 'DFT Result' CSV files.
+
+The CSV is ragged (a parameter preamble followed by one or more tables), so it
+is read once with csv.reader into a padded grid and every cell is converted in
+one vectorized pass with pandas string ops + pd.to_numeric:
+
+    '12.3%'      -> 0.123   (flagged so the writer applies a 0.00% format)
+    '(123.4)'    -> -123.4
+    '1,234.56'   -> 1234.56
+    ''           -> None    (empty cell)
+    'Pore range' -> 'Pore range' (non-numeric text is kept as-is)
+
+A leading header row (any alphabetic text in row 1) is kept verbatim.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import csv
+
+import numpy as np
+import pandas as pd
+
+PERCENT_FORMAT = "0.00%"
+
+
+@dataclass
+class DftTable:
+    rows: list[list]          # typed values, original (ragged) row lengths
+    percent: np.ndarray       # bool grid (n_rows x width): cell holds a fraction from 'x%'
+    header_rows: int          # leading rows kept verbatim
+    numeric_cells: int        # cells converted to numbers
+
+
+def _header_rows(grid: pd.DataFrame) -> int:
+    if grid.empty:
+        return 0
+    first = grid.iloc[0].dropna().astype(str)
+    return 1 if first.str.contains(r"[^\W\d_]", regex=True).any() else 0
+
+
+def parse_dft_rows(rows: list[list[str]]) -> DftTable:
+    lengths = [len(r) for r in rows]
+    grid = pd.DataFrame(rows, dtype=object)          # ragged rows are padded with None
+    n_rows, width = grid.shape
+    values = grid.to_numpy(dtype=object, copy=True)
+    percent = np.zeros((n_rows, width), dtype=bool)
+
+    start = _header_rows(grid)
+    body = grid.iloc[start:]
+    cells = body.stack()                             # drops padding, keeps (row, col) labels
+    numeric_cells = 0
+    if not cells.empty:
+        text = cells.astype(str).str.strip()
+
+        # negatives written in parentheses: (123.4) -> -123.4
+        paren = text.str.startswith("(") & text.str.endswith(")") & (text.str.len() > 2)
+        text = text.where(~paren, "-" + text.str[1:-1].str.strip())
+
+        # percentages: '12.3%' -> 12.3 (scaled below)
+        is_pct = text.str.endswith("%")
+        text = text.where(~is_pct, text.str[:-1].str.strip())
+
+        # thousands separators
+        text = text.str.replace(",", "", regex=False)
+
+        nums = pd.to_numeric(text, errors="coerce")
+        nums = nums.where(~is_pct, nums / 100.0)
+
+        r_idx = cells.index.get_level_values(0).to_numpy()
+        c_idx = cells.index.get_level_values(1).to_numpy()
+        ok = nums.notna().to_numpy()
+        blank = (cells.astype(str).str.strip() == "").to_numpy()
+
+        values[r_idx[blank], c_idx[blank]] = None
+        values[r_idx[ok], c_idx[ok]] = nums.to_numpy(dtype=float)[ok].tolist()
+        percent[r_idx[ok], c_idx[ok]] = is_pct.to_numpy()[ok]
+        numeric_cells = int(ok.sum())
+
+    typed = [values[i, :lengths[i]].tolist() for i in range(n_rows)]
+    return DftTable(rows=typed, percent=percent, header_rows=start, numeric_cells=numeric_cells)
+
+
+def read_dft_csv(path: str) -> DftTable:
+    with open(path, "rb") as fh:
+        raw = fh.read().decode("utf-8", errors="replace")
+    return parse_dft_rows(list(csv.reader(raw.splitlines())))
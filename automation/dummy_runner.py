@@ -0,0 +1,106 @@
+# automation/dummy_runner.py
+"""
+Fake StencilWizard/Soran runner for driving the automation pipeline without
+Windows or the instrument software (tests on Linux, demos, timing).
+
+    python dummy_runner.py --stage stencil --stdin settings.json
+    python dummy_runner.py --stage soran   --stdin settings.json
+    python dummy_runner.py --stage soran   filelist.txt settings.json   (batch mode)
+
+stencil: x.iPrd           -> x.txt + x.xlsx (minimal instrument workbook)
+soran  : x.txt            -> x.txt_mixed_model.csv (minimal DFT table)
+
+Options: --delay SECONDS per file, --fail-every N (every Nth file fails),
+--hang-on SUBSTRING (hang forever on matching paths, for watchdog tests).
+Job tracking (job_store.py) is only enabled when settings.json sets "job_db",
+so tests never touch the real jobs.db.
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+from runner_protocol import heartbeat, serve_stdin
+from job_store import JobStore, job_db_path, run_tracked
+
+
+def fake_stencil(iprd_path: str):
+    base = iprd_path.rsplit(".", 1)[0]
+    with open(base + ".txt", "w", encoding="utf-8") as fh:
+        fh.write("P/P0\tV\n0.1\t100\n0.5\t150\n")
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        return
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Sample", os.path.basename(base)])
+    ws.append(["P/P0", "V"])
+    ws.append([0.1, 100.0])
+    ws.append([0.5, 150.0])
+    wb.save(base + ".xlsx")
+
+
+def fake_soran(txt_path: str):
+    if not os.path.exists(txt_path):
+        raise FileNotFoundError(txt_path)
+    with open(f"{txt_path}_mixed_model.csv", "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["Pore range", "Percentage", "Pore Diameter(nm)", "PSD(total)"])
+        w.writerow(["0~1", "40%", "0.5", "0.12"])
+        w.writerow(["1~2", "60%", "1.5", "0.30"])
+
+
+STAGES = {"stencil": fake_stencil, "soran": fake_soran}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stage", choices=sorted(STAGES), required=True)
+    ap.add_argument("--stdin", action="store_true")
+    ap.add_argument("--delay", type=float, default=0.0)
+    ap.add_argument("--fail-every", type=int, default=0)
+    ap.add_argument("--hang-on", default="")
+    ap.add_argument("args", nargs="*")
+    opts = ap.parse_args()
+
+    work = STAGES[opts.stage]
+    count = 0
+    params = {}
+    settings_path = opts.args[-1] if opts.args else None
+    if settings_path and os.path.exists(settings_path):
+        with open(settings_path, "r", encoding="utf-8") as fh:
+            params = json.load(fh)
+    store = JobStore(job_db_path(params)) if params.get("job_db") else None
+
+    def run_one(path):
+        nonlocal count
+        count += 1
+        print(f"[dummy:{opts.stage}] {path}", flush=True)
+        if opts.hang_on and opts.hang_on in path:
+            while True:
+                time.sleep(60)
+        time.sleep(opts.delay)
+        heartbeat(opts.stage)
+        if opts.fail_every and count % opts.fail_every == 0:
+            raise RuntimeError("simulated failure")
+        work(path)
+
+    def process_one(path):
+        run_tracked(store, path, opts.stage, lambda: run_one(path), bool(params.get("skip_completed")))
+
+    if opts.stdin:
+        serve_stdin(process_one)
+        return
+    with open(opts.args[0], "r", encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                try:
+                    process_one(line.strip())
+                except Exception as e:
+                    print(f"[ERROR] {line.strip()}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -88,18 +88,31 @@
 #         self.finished.emit()
 
 # external/external_process_manager.py
-from PySide6.QtCore import QObject, Signal, QProcess
+from PySide6.QtCore import QObject, Signal, QProcess, QProcessEnvironment, QTimer
+import codecs
+import json
 import os
+import signal
 import sys
+import time
+from runner_protocol import APP_PID, DONE, FAILED, HEARTBEAT, READY, parse_marker
 
 class ExternalProcessManager(QObject):
     log_updated = Signal(str)
     finished = Signal()
+    file_finished = Signal(str, str)         # pool mode: path, error ("" = success), after retries
+
+    MAX_RESTARTS = 5                         # pool mode: restarts per runner slot
+    ENCODING = "gbk"                         # single mode: console encoding of the Windows runners
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.python_exec = sys.executable
         self.process = None
+        self.pool = []          # pool mode: one dict per runner slot
+        self.pending = []       # pool mode: [path, attempt, not_before] not handed out yet
+        self.failures = {}      # pool mode: path -> (attempts, error) for the final report
+        self._streams = {}      # single mode: channel -> [incremental decoder, partial line]
 
     def start_process(self, program_name: str, settings_path: str, script: str):
         script_path = os.path.abspath(os.path.join(script))
@@ -118,6 +131,8 @@ class ExternalProcessManager(QObject):
         self.process.setArguments([script_path, program_path, settings_path])
         self.process.setWorkingDirectory(os.path.dirname(script_path))
 
+        self._streams = {ch: [codecs.getincrementaldecoder(self.ENCODING)(errors="replace"), ""]
+                         for ch in ("stdout", "stderr")}
         self.process.readyReadStandardOutput.connect(self.handle_stdout)
         self.process.readyReadStandardError.connect(self.handle_stderr)
         self.process.finished.connect(self.handle_finished)
@@ -125,14 +140,238 @@ class ExternalProcessManager(QObject):
         self.log_updated.emit(f"[启动] {self.python_exec} {script_path} {program_path} {settings_path}")
         self.process.start()
 
+    def _decode_lines(self, channel: str, data: bytes, final: bool = False) -> list[str]:
+        """
+        Decode a chunk with the channel's incremental decoder, so a multibyte
+        character split across two reads is kept intact, and return the complete
+        lines; the unterminated tail waits for the next chunk (or final=True).
+        """
+        decoder, tail = self._streams[channel]
+        text = tail + decoder.decode(data, final)
+        *lines, tail = text.split("\n")
+        if final and tail:
+            lines.append(tail)
+            tail = ""
+        self._streams[channel][1] = tail
+        return [ln.rstrip("\r") for ln in lines]
+
     def handle_stdout(self):
-        output = self.process.readAllStandardOutput().data().decode("gbk", errors="replace")
-        self.log_updated.emit(output)
+        for line in self._decode_lines("stdout", self.process.readAllStandardOutput().data()):
+            self.log_updated.emit(line)
 
     def handle_stderr(self):
-        error = self.process.readAllStandardError().data().decode("gbk", errors="replace")
-        self.log_updated.emit(f"[STDERR] {error}")
+        for line in self._decode_lines("stderr", self.process.readAllStandardError().data()):
+            self.log_updated.emit(f"[STDERR] {line}")
 
     def handle_finished(self):
+        for line in self._decode_lines("stdout", self.process.readAllStandardOutput().data(), final=True):
+            self.log_updated.emit(line)
+        for line in self._decode_lines("stderr", self.process.readAllStandardError().data(), final=True):
+            self.log_updated.emit(f"[STDERR] {line}")
         self.log_updated.emit("[完成] 外部程序运行完毕")
         self.finished.emit()
+
+    # ---------------- pool mode ----------------
+    def start_pool(self, program_name: str, settings_path: str, script: str, workers: int = 2,
+                   extra_args: list | None = None):
+        """
+        Run `script` as `workers` runner processes in --stdin serve mode (see
+        runner_protocol.py). Files from the list are handed out one at a time to
+        whichever runner reports [READY]/[DONE]/[FAILED] first, so faster runners
+        take more files. Output lines are prefixed with [W1], [W2], ... and
+        `finished` is emitted once, after the last runner exits.
+
+        Watchdog (settings.json): a runner silent for heartbeat_timeout seconds
+        or busy with one file for file_timeout seconds is killed (with the GUI
+        program it announced via [APP_PID]) and restarted. Failed files are
+        retried up to max_retries times, waiting retry_backoff * 2**(n-1)
+        seconds before retry n; files still failing end up in the final report.
+        """
+        script_path = os.path.abspath(script)
+        program_path = os.path.abspath(program_name)
+        settings_path = os.path.abspath(settings_path)
+        if not os.path.exists(program_path):
+            self.log_updated.emit(f"[ERROR] 数据文件不存在: {program_path}")
+            return
+        if not os.path.exists(settings_path):
+            self.log_updated.emit(f"[ERROR] 设置文件不存在: {settings_path}")
+            return
+        with open(program_path, "r", encoding="utf-8") as f:
+            files = [ln.strip() for ln in f if ln.strip()]
+        if not files:
+            self.log_updated.emit("[完成] 文件列表为空")
+            self.finished.emit()
+            return
+        try:
+            with open(settings_path, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+        except Exception:
+            settings = {}
+        self.file_timeout = float(settings.get("file_timeout", 0) or 0)
+        self.heartbeat_timeout = float(settings.get("heartbeat_timeout", 120) or 0)
+        self.max_retries = int(settings.get("max_retries", 2) or 0)
+        self.retry_backoff = float(settings.get("retry_backoff", 5) or 0)
+
+        # pending entries: [path, attempt (1-based), not_before (monotonic)]
+        self.pending = [[path, 1, 0.0] for path in files]
+        self.failures = {}      # path -> (attempts, last error), only files that gave up
+        self.total_files = len(files)
+
+        workers = max(1, min(int(workers), len(files)))
+        env = QProcessEnvironment.systemEnvironment()
+        env.insert("PYTHONIOENCODING", "utf-8")
+        env.insert("PYTHONUNBUFFERED", "1")
+        self._pool_env = env
+        self._pool_args = [script_path] + list(extra_args or []) + ["--stdin", settings_path]
+        self._pool_cwd = os.path.dirname(script_path)
+
+        self.pool = []
+        self.log_updated.emit(f"[启动] {workers} x {self.python_exec} {' '.join(self._pool_args)} "
+                              f"({len(files)} files)")
+        for n in range(1, workers + 1):
+            shard = {"tag": f"[W{n}]", "done": 0, "failed": 0, "restarts": 0}
+            self.pool.append(shard)
+            self._pool_spawn(shard)
+
+        self.watchdog = QTimer(self)
+        self.watchdog.setInterval(1000)
+        self.watchdog.timeout.connect(self._pool_tick)
+        self.watchdog.start()
+
+    def _pool_spawn(self, shard):
+        proc = QProcess(self)
+        proc.setProgram(self.python_exec)
+        proc.setArguments(self._pool_args)
+        proc.setWorkingDirectory(self._pool_cwd)
+        proc.setProcessEnvironment(self._pool_env)
+        proc.setProcessChannelMode(QProcess.MergedChannels)
+        shard.update({"proc": proc, "buf": b"", "current": None, "attempt": 0, "alive": True,
+                      "ready": False, "closing": False, "kill_reason": "", "app_pid": None,
+                      "started": 0.0, "last_seen": time.monotonic()})
+        proc.readyReadStandardOutput.connect(lambda s=shard, p=proc: self._pool_read(s, p))
+        proc.finished.connect(lambda *_, s=shard, p=proc: self._pool_exited(s, p))
+        proc.start()
+
+    def _pool_next(self):
+        """Pop the first pending file whose backoff has expired, or None."""
+        now = time.monotonic()
+        for i, entry in enumerate(self.pending):
+            if entry[2] <= now:
+                return self.pending.pop(i)
+        return None
+
+    def _pool_feed(self, shard):
+        proc = shard["proc"]
+        shard["current"] = None
+        entry = self._pool_next()
+        if entry is not None:
+            shard["current"], shard["attempt"] = entry[0], entry[1]
+            shard["started"] = shard["last_seen"] = time.monotonic()
+            proc.write((shard["current"] + "\n").encode("utf-8"))
+        elif not self.pending and not any(s["current"] for s in self.pool):
+            # nothing left and nothing in flight that could come back for a retry
+            for s in self.pool:
+                if s["alive"] and s["ready"] and s["current"] is None and not s["closing"]:
+                    s["closing"] = True
+                    s["proc"].write(b"\n")          # empty line: runner shuts down
+                    s["proc"].closeWriteChannel()
+        # otherwise stay idle: a retry is waiting for its backoff, _pool_tick feeds it
+
+    def _pool_result(self, shard, error: str):
+        """Record the outcome of the shard's current file; schedule a retry on failure."""
+        path, attempt = shard["current"], shard["attempt"]
+        shard["current"] = None
+        if not error:
+            shard["done"] += 1
+            self.log_updated.emit(f"{shard['tag']} ✅ {path}")
+            self.file_finished.emit(path, "")
+            return
+        if attempt <= self.max_retries:
+            delay = self.retry_backoff * (2 ** (attempt - 1))
+            self.pending.append([path, attempt + 1, time.monotonic() + delay])
+            self.log_updated.emit(f"{shard['tag']} ⚠️ {path} :: {error} → 重试 {attempt}/{self.max_retries}, "
+                                  f"{delay:.0f}s 后")
+            return
+        shard["failed"] += 1
+        self.failures[path] = (attempt, error)
+        self.log_updated.emit(f"{shard['tag']} ❌ {path} :: {error}")
+        self.file_finished.emit(path, error)
+
+    def _pool_read(self, shard, proc):
+        if proc is not shard.get("proc"):
+            return
+        shard["buf"] += proc.readAllStandardOutput().data()
+        *lines, shard["buf"] = shard["buf"].split(b"\n")
+        if lines:
+            shard["last_seen"] = time.monotonic()
+        for raw in lines:
+            line = raw.decode("utf-8", errors="replace").rstrip("\r")
+            marker = parse_marker(line)
+            kind = marker[0] if marker else None
+            if kind == READY:
+                shard["ready"] = True
+                self._pool_feed(shard)
+            elif kind == HEARTBEAT:
+                continue
+            elif kind == APP_PID:
+                shard["app_pid"] = int(marker[2]) if marker[2].isdigit() else None
+            elif kind in (DONE, FAILED) and shard["current"] is not None and marker[1] == shard["current"]:
+                self._pool_result(shard, "" if kind == DONE else (marker[2] or "failed"))
+                self._pool_feed(shard)
+            elif line.strip():
+                self.log_updated.emit(f"{shard['tag']} {line}")
+
+    def _pool_kill(self, shard, reason: str):
+        shard["kill_reason"] = reason
+        self.log_updated.emit(f"{shard['tag']} ⏱ {reason}: {shard['current']} → 结束并重启进程")
+        if shard["app_pid"]:
+            try:
+                os.kill(shard["app_pid"], signal.SIGTERM)
+            except OSError:
+                pass
+        shard["proc"].kill()
+
+    def _pool_tick(self):
+        now = time.monotonic()
+        for shard in self.pool:
+            if not shard["alive"] or shard["kill_reason"]:
+                continue
+            if shard["current"] is not None:
+                if self.file_timeout and now - shard["started"] > self.file_timeout:
+                    self._pool_kill(shard, f"单文件超时 ({self.file_timeout:.0f}s)")
+                elif self.heartbeat_timeout and now - shard["last_seen"] > self.heartbeat_timeout:
+                    self._pool_kill(shard, f"无心跳 ({self.heartbeat_timeout:.0f}s)")
+            elif shard["ready"] and not shard["closing"]:
+                self._pool_feed(shard)       # idle runner: a delayed retry may be due now
+
+    def _pool_exited(self, shard, proc):
+        if proc is not shard.get("proc") or not shard["alive"]:
+            return
+        shard["alive"] = False
+        if shard["buf"]:
+            shard["buf"] += b"\n"
+            self._pool_read(shard, proc)
+        if shard["current"] is not None:
+            # killed by the watchdog or died mid-file
+            self._pool_result(shard, shard["kill_reason"] or "runner exited")
+        if self.pending and shard["restarts"] < self.MAX_RESTARTS:
+            shard["restarts"] += 1
+            self.log_updated.emit(f"{shard['tag']} 🔁 重启进程 ({shard['restarts']}/{self.MAX_RESTARTS})")
+            self._pool_spawn(shard)
+            return
+        self.log_updated.emit(f"{shard['tag']} 退出: 完成 {shard['done']}, 失败 {shard['failed']}")
+        if any(s["alive"] for s in self.pool):
+            return
+        self.watchdog.stop()
+        for path, attempt, _ in self.pending:
+            self.failures[path] = (attempt - 1, "not processed (all runners exited)")
+            self.file_finished.emit(path, "not processed")
+        self.pending = []
+        done = sum(s["done"] for s in self.pool)
+        self.log_updated.emit(f"[完成] {len(self.pool)} 个进程运行完毕: 完成 {done}/{self.total_files}, "
+                              f"失败 {len(self.failures)}")
+        if self.failures:
+            self.log_updated.emit("[报告] 最终失败的文件:")
+            for path, (attempts, error) in sorted(self.failures.items()):
+                self.log_updated.emit(f"[报告]   {path}  (尝试 {attempts} 次) :: {error}")
+        self.finished.emit()
@@ -1,10 +1,11 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QPushButton, QTextEdit,
+    QWidget, QVBoxLayout, QPushButton, QPlainTextEdit,
     QLabel, QLineEdit, QFileDialog, QDialog,QHBoxLayout, QApplication, QProgressBar
 )
 from PySide6.QtCore import Qt
 import sys
 import os
+import json
 import tempfile
 from PySide6.QtWidgets import QCheckBox
 # from automation.external_process_manager import ExternalProcessManager
@@ -18,6 +19,9 @@ from merge_dft_worker import MergeDftWorker
 from settings_dialog import SettingsDialog
 from folder_filter_dialog import FolderFilterDialog
 from file_utils import scan_iprd_files, write_filelist, convert_iprd_paths_to_txt_file
+from pipeline import StreamingPipelineWorker, build_stages
+from job_store import JobStore, job_db_path, RUN_ENV
+from log_stream import LogStream, rotating_file_logger
 
 class ExternalWindow(QWidget):
     def __init__(self):
@@ -30,6 +34,13 @@ class ExternalWindow(QWidget):
         self.auto_merge_checkbox = QCheckBox("处理完成后自动合并结果文件")
         self.auto_merge_checkbox.setChecked(True)  # 默认勾选    
 
+        # 合并后直接导入数据库（逐组流式导入）
+        self.ingest_checkbox = QCheckBox("合并后直接导入数据库")
+        self.ingest_db_input = QLineEdit()
+        self.ingest_db_input.setPlaceholderText("选择 SQLite 数据库 (.db)")
+        self.ingest_db_btn = QPushButton("选择数据库")
+        self.ingest_db_btn.clicked.connect(self.select_ingest_db)
+
         # Input fields
         # ------- 文件路径设置 -------
         self.filelist_input = QLineEdit()
@@ -62,9 +73,10 @@ class ExternalWindow(QWidget):
         settings_layout.addWidget(self.settings_input)
         settings_layout.addWidget(self.settings_btn)
         
-        # Log box
-        self.logbox = QTextEdit()
-        self.logbox.setReadOnly(True)
+        # Log box: bounded view refreshed at a fixed frame rate, full log in automation/logs/
+        self.logbox = QPlainTextEdit()
+        self.log_stream = LogStream(self.logbox, capacity=5000, fps=20,
+                                    logger=rotating_file_logger("external"))
 
         self.status_label = QLabel("")
         self.progress_bar = QProgressBar()
@@ -73,18 +85,21 @@ class ExternalWindow(QWidget):
         self.start_stencil_btn = QPushButton("Run StencilWizard")
         self.start_soran_btn = QPushButton("Run Soran DFT") 
         self.start_both_btn = QPushButton("Run StencilWizard + Soran DFT")
+        self.start_stream_btn = QPushButton("Run Streaming (per file)")
         self.settings_main_btn = QPushButton("Settings…")
 
         self.settings_main_btn.clicked.connect(self.open_settings_dialog)
         self.start_stencil_btn.clicked.connect(self.run_stencil_only)
         self.start_both_btn.clicked.connect(self.run_stencil_then_soran)
         self.start_soran_btn.clicked.connect(self.run_soran_only)  # NEW
+        self.start_stream_btn.clicked.connect(self.run_streaming_pipeline)
 
 
         btn_layout = QHBoxLayout()
         btn_layout.addWidget(self.start_stencil_btn)
         btn_layout.addWidget(self.start_soran_btn) 
         btn_layout.addWidget(self.start_both_btn) # NEW
+        btn_layout.addWidget(self.start_stream_btn)
         btn_layout.addWidget(self.settings_main_btn)
 
         layout = QVBoxLayout()
@@ -96,6 +111,11 @@ class ExternalWindow(QWidget):
         layout.addLayout(btn_layout)
         layout.addWidget(self.status_label)
         layout.addWidget(self.auto_merge_checkbox)
+        ingest_layout = QHBoxLayout()
+        ingest_layout.addWidget(self.ingest_checkbox)
+        ingest_layout.addWidget(self.ingest_db_input)
+        ingest_layout.addWidget(self.ingest_db_btn)
+        layout.addLayout(ingest_layout)
         layout.addWidget(self.progress_bar)
 
 
@@ -112,6 +132,7 @@ class ExternalWindow(QWidget):
         self.soran_manager.finished.connect(self.on_soran_finished)
 
         self.pending_soran = False
+        self.job_run_id = None
 
     def select_and_prepare_filelist(self):
         root_dir = QFileDialog.getExistingDirectory(self, "Choose Root Folder")
@@ -155,15 +176,25 @@ class ExternalWindow(QWidget):
         if path:
             self.settings_input.setText(path)
 
+    def select_ingest_db(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Choose Database", self.ingest_db_input.text().strip() or "adsorption.db",
+            "SQLite DB (*.db);;All Files (*)", options=QFileDialog.DontConfirmOverwrite)
+        if path:
+            self.ingest_db_input.setText(path)
+            self.ingest_checkbox.setChecked(True)
+
     def append_log(self, text):
-        self.logbox.append(text)
+        self.log_stream.append(text)
 
     def run_stencil_only(self):
         self.pending_soran = False
+        self._start_job_run()
         self._run_stencil()
 
     def run_stencil_then_soran(self):
         self.pending_soran = True
+        self._start_job_run()
         # 如果清单已填，尽早推断 root
         fl = self.filelist_input.text().strip()
         if fl and os.path.isfile(fl) and not self.iprd_root_folder:
@@ -185,10 +216,11 @@ class ExternalWindow(QWidget):
         self.append_log(">>> Starting StencilWizard <<<")
         self.append_log(f"{settings_path}")
 
-        self.stencil_manager.start_process(filelist_path, settings_path, script="stencilwizard_runner.py")
+        self._start_runner(self.stencil_manager, filelist_path, settings_path, "stencilwizard_runner.py")
 
     def on_stencil_finished(self):
         self.append_log(">>> StencilWizard Job Completed <<<")
+        self._log_job_report()
         if self.pending_soran:
             self.append_log(">>> Start Soran（.txt） DFT Calculation<<<")
             filelist_path = self.filelist_input.text().strip()
@@ -203,10 +235,11 @@ class ExternalWindow(QWidget):
             return
         
         self.append_log(">>> Starting Soran DFT <<<")
-        self.soran_manager.start_process(soran_filelist_path, settings_path, script="soran_runner.py")
+        self._start_runner(self.soran_manager, soran_filelist_path, settings_path, "soran_runner.py")
 
     def on_soran_finished(self):
         self.append_log(">>> Soran Job Finished <<<")
+        self._log_job_report()
         if self.auto_merge_checkbox.isChecked():
         # Ensure we have a valid root; try to infer from the file list if missing
             if not self.iprd_root_folder or not os.path.isdir(self.iprd_root_folder):
@@ -233,14 +266,118 @@ class ExternalWindow(QWidget):
         
     def run_soran_only(self):
         self.pending_soran = False
+        self._start_job_run()
         filelist_path = self.filelist_input.text().strip()
         settings_path = self.settings_input.text().strip()
         self.append_log(">>> 开始运行 Soran 程序 <<<")
-        self.soran_manager.start_process(filelist_path, settings_path, script="soran_runner.py")
+        self._start_runner(self.soran_manager, filelist_path, settings_path, "soran_runner.py")
+
 
+    def run_streaming_pipeline(self):
+        """逐文件流水线: 每个文件 Stencil 完成后立即进入 Soran, 再立即合并 (见 pipeline.py)。"""
+        filelist_path = self.filelist_input.text().strip()
+        settings_path = self.settings_input.text().strip()
+        try:
+            with open(filelist_path, "r", encoding="utf-8") as f:
+                keys = [ln.strip() for ln in f if ln.strip()]
+        except Exception as e:
+            self.append_log(f"[ERROR] 无法读取文件列表: {e}")
+            return
+        if not keys:
+            self.append_log("[ERROR] 文件列表为空")
+            return
+        if not self.iprd_root_folder or not os.path.isdir(self.iprd_root_folder):
+            root_guess = os.path.dirname(os.path.commonprefix(keys)) or os.path.dirname(keys[0])
+            if not os.path.isdir(root_guess):
+                self.append_log("[ERROR] 根目录无效，无法合并。")
+                return
+            self.iprd_root_folder = root_guess
+            self.append_log(f"[Root] 从清单推断根目录：{self.iprd_root_folder}")
+
+        settings = self._load_settings()
+        self._start_job_run()
+        stages = build_stages(settings_path, self.iprd_root_folder,
+                              merge_mode=settings.get("merge_mode", "transplant"))
+        self.append_log(f">>> Streaming {len(keys)} files: StencilWizard → Soran → Merge <<<")
+        self.stream_worker = StreamingPipelineWorker(keys, stages)
+        self.stream_worker.log_message.connect(self.append_log)
+        self.stream_worker.progress_updated.connect(self.on_merge_progress)
+        self.stream_worker.finished.connect(self.on_stream_finished)
+        self.stream_worker.start()
+
+    def on_stream_finished(self, ok_keys, errors):
+        self.append_log(f"[流水线完成] 成功 {len(ok_keys)} 个, 失败 {len(errors)} 个")
+        for key, msg in errors:
+            self.append_log(f"[ERROR] {key}: {msg}")
+        # 已合并的组由清单跳过, 这里只做归档 (及可选的数据库导入)
+        if self.auto_merge_checkbox.isChecked():
+            self.run_merge_dft(self.iprd_root_folder)
+
+    def _start_runner(self, manager, filelist_path, settings_path, script):
+        """
+        runner_workers > 1 或设置了单文件超时 (file_timeout > 0, 默认 0 不启用): 常驻进程池
+        (逐个分发文件, 带超时看门狗与重试); 否则单进程批处理。
+        """
+        settings = self._load_settings()
+        workers = int(settings.get("runner_workers", 1) or 1)
+        if workers > 1 or float(settings.get("file_timeout", 0) or 0) > 0:
+            manager.start_pool(filelist_path, settings_path, script=script, workers=workers)
+        else:
+            manager.start_process(filelist_path, settings_path, script=script)
+
+    def _start_job_run(self):
+        """新批次 = 任务表中的新运行; runner 子进程通过环境变量 JOB_RUN_ID 继承运行编号。"""
+        os.environ.pop(RUN_ENV, None)
+        self.job_run_id = None
+        try:
+            store = JobStore(job_db_path(self._load_settings()))
+        except Exception as e:
+            self.append_log(f"[WARN] 无法打开任务表: {e}")
+            return
+        try:
+            self.job_run_id = store.start_run()
+        finally:
+            store.close()
+        os.environ[RUN_ENV] = str(self.job_run_id)
+        self.append_log(f"[任务] 运行 #{self.job_run_id}")
+
+    def _log_job_report(self):
+        """本次运行各阶段吞吐量与失败文件 (来自 job_store 任务表)。"""
+        try:
+            store = JobStore(job_db_path(self._load_settings()))
+        except Exception as e:
+            self.append_log(f"[WARN] 无法读取任务表: {e}")
+            return
+        try:
+            for line in store.format_report(self.job_run_id):
+                self.append_log(f"[任务] {line}")
+            failures = store.failures(run_id=self.job_run_id)
+            for file, stage, error in failures[:50]:
+                self.append_log(f"[任务失败] [{stage}] {file}: {error}")
+            if len(failures) > 50:
+                self.append_log(f"[任务失败] … 另有 {len(failures) - 50} 个 (python job_store.py 查看全部)")
+        finally:
+            store.close()
+
+    def _load_settings(self) -> dict:
+        path = self.settings_input.text().strip()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
 
     def run_merge_dft(self, top_folder):
-        self.merge_worker = MergeDftWorker(top_folder)
+        settings = self._load_settings()
+        workers = int(settings.get("merge_workers", 0) or 0) or None  # 0 = one per core
+        ingest_db = None
+        if self.ingest_checkbox.isChecked():
+            ingest_db = self.ingest_db_input.text().strip() or None
+            if not ingest_db:
+                self.append_log("[WARN] 未选择数据库，跳过导入。")
+        self.merge_worker = MergeDftWorker(top_folder, max_workers=workers,
+                                           merge_mode=settings.get("merge_mode", "transplant"),
+                                           ingest_db_path=ingest_db)
         self.merge_worker.progress_updated.connect(self.on_merge_progress)
         self.merge_worker.status_updated.connect(self.append_log)
         self.merge_worker.log_message.connect(self.append_log)
@@ -0,0 +1,198 @@
+# automation/file_discovery.py
+"""
+Shared scandir-based file discovery.
+
+One traversal engine for every place that needs to list data files:
+  - LeftPanel "Load Folder"        (Excel files to import)
+  - automation.file_utils           (.iPrd files for StencilWizard/Soran)
+  - MergeDftWorker                  (Excel/CSV/iPrd groups to merge)
+
+Directories are listed in parallel with os.scandir (no per-file stat/resolve),
+and every listing is remembered in a TreeSnapshot keyed by the directory's
+mtime. A rescan only re-lists directories whose mtime changed, which turns a
+second scan of a large network share into one stat() per directory.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+
+
+@dataclass
+class DiscoveryRules:
+    """
+    Pluggable filters applied while walking.
+
+    extensions       : keep files whose lower-cased suffix is in this set (None = any)
+    prefixes         : keep files whose name starts with one of these (None = any)
+    ignore_prefixes  : drop files AND directories whose name starts with one of these
+    exclude_dirs     : directory paths relative to root (e.g. "backup" or "a/b") to prune
+    skip_hidden_dirs : prune directories starting with "."
+    """
+    extensions: set[str] | None = None
+    prefixes: tuple[str, ...] | None = None
+    ignore_prefixes: tuple[str, ...] = ()
+    exclude_dirs: set[str] = field(default_factory=set)
+    skip_hidden_dirs: bool = False
+
+    def __post_init__(self):
+        if self.extensions is not None:
+            self.extensions = {e.lower() if e.startswith(".") else "." + e.lower() for e in self.extensions}
+        self.exclude_dirs = {os.path.normcase(os.path.normpath(d)) for d in self.exclude_dirs}
+
+    def accept_file(self, name: str) -> bool:
+        if self.ignore_prefixes and name.startswith(self.ignore_prefixes):
+            return False
+        if self.prefixes is not None and not name.startswith(self.prefixes):
+            return False
+        if self.extensions is not None:
+            return os.path.splitext(name)[1].lower() in self.extensions
+        return True
+
+    def accept_dir(self, name: str, rel_path: str) -> bool:
+        if self.skip_hidden_dirs and name.startswith("."):
+            return False
+        if self.ignore_prefixes and name.startswith(self.ignore_prefixes):
+            return False
+        if self.exclude_dirs and os.path.normcase(rel_path) in self.exclude_dirs:
+            return False
+        return True
+
+
+@dataclass
+class DiscoveryResult:
+    root: str
+    files: list[str]                 # absolute paths, sorted
+    dirs: list[str]                  # absolute paths of every visited directory (root first)
+    listed: int = 0                  # directories actually re-listed with scandir
+    reused: int = 0                  # directories served from the snapshot
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (f"{len(self.files)} files in {len(self.dirs)} folders "
+                f"(listed {self.listed}, cached {self.reused}) in {self.elapsed:.2f}s")
+
+
+class TreeSnapshot:
+    """
+    Raw directory listings keyed by absolute directory path:
+        path -> (mtime_ns, [file names], [subdir names])
+
+    Listings are stored unfiltered so the same snapshot can serve scans with
+    different DiscoveryRules.
+    """
+    def __init__(self):
+        self._entries: dict[str, tuple[int, list[str], list[str]]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, path: str, mtime_ns: int):
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and entry[0] == mtime_ns:
+            return entry[1], entry[2]
+        return None
+
+    def store(self, path: str, mtime_ns: int, files: list[str], subdirs: list[str]):
+        with self._lock:
+            self._entries[path] = (mtime_ns, files, subdirs)
+
+    def prune(self, keep: set[str]):
+        """Forget directories not visited by the last scan (deleted/moved trees)."""
+        with self._lock:
+            self._entries = {p: e for p, e in self._entries.items() if p in keep}
+
+
+# one in-memory snapshot per root, so repeated scans in one session are incremental
+_SNAPSHOTS: dict[str, TreeSnapshot] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def get_snapshot(root: str) -> TreeSnapshot:
+    key = os.path.normcase(os.path.abspath(root))
+    with _SNAPSHOTS_LOCK:
+        snap = _SNAPSHOTS.get(key)
+        if snap is None:
+            snap = _SNAPSHOTS[key] = TreeSnapshot()
+        return snap
+
+
+def _list_dir(path: str, snapshot: TreeSnapshot | None):
+    """Return (file_names, subdir_names, was_cached) for one directory."""
+    mtime_ns = os.stat(path).st_mtime_ns
+    if snapshot is not None:
+        hit = snapshot.lookup(path, mtime_ns)
+        if hit is not None:
+            return hit[0], hit[1], True
+
+    files, subdirs = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    if snapshot is not None:
+        snapshot.store(path, mtime_ns, files, subdirs)
+    return files, subdirs, False
+
+
+def discover_files(root: str, rules: DiscoveryRules | None = None, workers: int = 8,
+                   snapshot: TreeSnapshot | None = None, use_cache: bool = True) -> DiscoveryResult:
+    """
+    Walk `root` in parallel and return the files accepted by `rules`.
+
+    :param workers: directory-listing threads (network shares benefit most)
+    :param snapshot: explicit snapshot; defaults to the per-root session snapshot
+    :param use_cache: False forces a full re-listing (the snapshot is still refreshed)
+    """
+    t0 = time.perf_counter()
+    rules = rules or DiscoveryRules()
+    root = os.path.abspath(root)
+    if snapshot is None:
+        snapshot = get_snapshot(root)
+    lookup_snapshot = snapshot if use_cache else None
+
+    files: list[str] = []
+    dirs: list[str] = []
+    listed = reused = 0
+
+    def job(path):
+        try:
+            return _list_dir(path, lookup_snapshot)
+        except OSError:
+            return [], [], False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {pool.submit(job, root): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path = pending.pop(fut)
+                names, subdirs, cached = fut.result()
+                if not use_cache:
+                    # refresh the snapshot with what we just listed
+                    try:
+                        snapshot.store(path, os.stat(path).st_mtime_ns, names, subdirs)
+                    except OSError:
+                        pass
+                dirs.append(path)
+                if cached:
+                    reused += 1
+                else:
+                    listed += 1
+                files.extend(os.path.join(path, n) for n in names if rules.accept_file(n))
+                for d in subdirs:
+                    sub = os.path.join(path, d)
+                    if rules.accept_dir(d, os.path.relpath(sub, root)):
+                        pending[pool.submit(job, sub)] = sub
+
+    snapshot.prune(set(dirs))
+    files.sort()
+    dirs.sort(key=lambda p: (p != root, p))
+    return DiscoveryResult(root=root, files=files, dirs=dirs, listed=listed, reused=reused,
+                           elapsed=time.perf_counter() - t0)
@@ -1,17 +1,13 @@
 import os
 import tempfile
+from file_discovery import DiscoveryRules, discover_files
 
 def scan_iprd_files(root_dir, excluded_folders):
-    result = []
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        # 判断当前路径是否属于被排除的子文件夹
-        rel_path = os.path.relpath(dirpath, root_dir)
-        if any(rel_path.startswith(f) for f in excluded_folders):
-            continue
-        for f in filenames:
-            if f.endswith(".iPrd"):
-                result.append(os.path.normpath(os.path.join(dirpath, f)))
-    return result
+    # 被排除的子文件夹在遍历时直接剪枝
+    rules = DiscoveryRules(extensions={".iprd"}, exclude_dirs=set(excluded_folders))
+    found = discover_files(root_dir, rules)
+    # 保持原有行为：扩展名区分大小写（只认 .iPrd）
+    return [os.path.normpath(p) for p in found.files if p.endswith(".iPrd")]
 
 def convert_iprd_paths_to_txt_file(iprd_paths):
     txt_paths = [p.replace(".iPrd", ".txt") for p in iprd_paths]
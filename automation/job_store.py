@@ -0,0 +1,210 @@
+# automation/job_store.py
+"""
+Per-file job state for the automation runners (SQLite, one row per file+stage):
+
+    jobs(file, stage, status, attempts, duration, error, updated_at, run_id)
+    runs(id, started_at)
+    status: running | done | failed | skipped
+
+Each batch is one run: the GUI calls start_run() and passes the id to the
+runner processes in $JOB_RUN_ID; a runner started on its own opens a run of
+its own (open_store). Starting a run marks rows still 'running' from an
+earlier, interrupted run as failed. Reports and failure lists are per run.
+
+Runners wrap each file in JobStore.track(); with skip_completed a rerun skips
+files whose stage is already done and records them as 'skipped' in the new
+run (keeping the duration of the run that did the work). Several runner processes (pool mode) can
+share the database: WAL journal + busy timeout.
+
+    python job_store.py [jobs.db] [run_id]     # per-stage throughput report (default: latest run)
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import sqlite3
+import sys
+import time
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db")
+RUN_ENV = "JOB_RUN_ID"
+
+
+def job_db_path(settings: dict | None = None) -> str:
+    return (settings or {}).get("job_db") or DEFAULT_DB
+
+
+def open_store(settings: dict | None = None) -> JobStore:
+    """JobStore for a runner: joins the run named by $JOB_RUN_ID, else starts its own."""
+    store = JobStore(job_db_path(settings))
+    if store.run_id is None:
+        store.start_run()
+    return store
+
+
+class JobStore:
+    def __init__(self, path: str = DEFAULT_DB, run_id: int | None = None):
+        self.path = os.path.abspath(path)
+        if run_id is None and os.environ.get(RUN_ENV, "").isdigit():
+            run_id = int(os.environ[RUN_ENV])
+        self.run_id = run_id
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs(
+                file       TEXT NOT NULL,
+                stage      TEXT NOT NULL,
+                status     TEXT NOT NULL,
+                attempts   INTEGER NOT NULL DEFAULT 0,
+                duration   REAL,
+                error      TEXT,
+                updated_at TEXT,
+                run_id     INTEGER,
+                PRIMARY KEY(file, stage)
+            )""")
+        if "run_id" not in {r[1] for r in self.conn.execute("PRAGMA table_info(jobs)")}:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN run_id INTEGER")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs(
+                id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT
+            )""")
+        self.conn.commit()
+
+    @staticmethod
+    def _key(file: str) -> str:
+        return os.path.normcase(os.path.abspath(file))
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def start_run(self) -> int:
+        """Open a new run (self.run_id); rows left 'running' by an earlier run become failed."""
+        cur = self.conn.execute("INSERT INTO runs(started_at) VALUES(?)", (self._now(),))
+        self.run_id = cur.lastrowid
+        self.conn.execute("""
+            UPDATE jobs SET status='failed', error=?, updated_at=?
+            WHERE status='running' AND run_id IS NOT ?
+            """, (f"interrupted (run {self.run_id} started)", self._now(), self.run_id))
+        self.conn.commit()
+        return self.run_id
+
+    def latest_run(self) -> int | None:
+        return self.conn.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+
+    def begin(self, file: str, stage: str):
+        # attempts count within the run; a new run starts again at 1
+        self.conn.execute("""
+            INSERT INTO jobs(file, stage, status, attempts, updated_at, run_id) VALUES(?, ?, 'running', 1, ?, ?)
+            ON CONFLICT(file, stage) DO UPDATE SET
+                status='running', error=NULL, updated_at=excluded.updated_at, run_id=excluded.run_id,
+                attempts=CASE WHEN run_id IS excluded.run_id THEN attempts+1 ELSE 1 END
+            """, (self._key(file), stage, self._now(), self.run_id))
+        self.conn.commit()
+
+    def finish(self, file: str, stage: str, status: str, duration: float | None = None, error: str = ""):
+        self.conn.execute("""
+            INSERT INTO jobs(file, stage, status, attempts, duration, error, updated_at, run_id)
+            VALUES(?, ?, ?, 0, ?, ?, ?, ?)
+            ON CONFLICT(file, stage) DO UPDATE SET
+                status=excluded.status, duration=excluded.duration, error=excluded.error,
+                updated_at=excluded.updated_at, run_id=excluded.run_id
+            """, (self._key(file), stage, status, duration, error or None, self._now(), self.run_id))
+        self.conn.commit()
+
+    def skip(self, file: str, stage: str):
+        """Record a completed file skipped by this run; duration and error stay from the run that did it."""
+        self.conn.execute("UPDATE jobs SET status='skipped', attempts=0, updated_at=?, run_id=? WHERE file=? AND stage=?",
+                          (self._now(), self.run_id, self._key(file), stage))
+        self.conn.commit()
+
+    @contextmanager
+    def track(self, file: str, stage: str):
+        """Mark running, then done (or failed with the exception text, re-raised)."""
+        self.begin(file, stage)
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.finish(file, stage, "failed", time.perf_counter() - t0, str(e))
+            raise
+        self.finish(file, stage, "done", time.perf_counter() - t0)
+
+    def status(self, file: str, stage: str) -> str | None:
+        row = self.conn.execute("SELECT status FROM jobs WHERE file=? AND stage=?",
+                                (self._key(file), stage)).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, file: str, stage: str) -> bool:
+        return self.status(file, stage) in ("done", "skipped")
+
+    def report(self, run_id: int | None = None) -> list[dict]:
+        """
+        Per-stage counts, mean duration and throughput (files/hour of processing
+        time) for one run, or over all rows if run_id is None.
+        """
+        where, args = ("WHERE run_id=?", (run_id,)) if run_id is not None else ("", ())
+        rows = self.conn.execute(f"""
+            SELECT stage,
+                   COUNT(*),
+                   SUM(status='done'), SUM(status='failed'), SUM(status='running'), SUM(status='skipped'),
+                   SUM(attempts),
+                   AVG(CASE WHEN status='done' THEN duration END),
+                   SUM(CASE WHEN status='done' THEN duration ELSE 0 END)
+            FROM jobs {where} GROUP BY stage ORDER BY stage""", args).fetchall()
+        out = []
+        for stage, total, done, failed, running, skipped, attempts, avg, busy in rows:
+            out.append({
+                "stage": stage, "total": total, "done": done or 0, "failed": failed or 0,
+                "running": running or 0, "skipped": skipped or 0, "attempts": attempts or 0, "avg_duration": avg or 0.0,
+                "files_per_hour": (done or 0) * 3600.0 / busy if busy else 0.0,
+            })
+        return out
+
+    def format_report(self, run_id: int | None = None) -> list[str]:
+        return [f"[{r['stage']}] done {r['done']}/{r['total']}, failed {r['failed']}, "
+                f"running {r['running']}, skipped {r['skipped']}, attempts {r['attempts']}, "
+                f"avg {r['avg_duration']:.1f}s/file, {r['files_per_hour']:.0f} files/h"
+                for r in self.report(run_id)]
+
+    def failures(self, stage: str | None = None, run_id: int | None = None) -> list[tuple[str, str, str]]:
+        sql = "SELECT file, stage, error FROM jobs WHERE status='failed'"
+        args = ()
+        if stage:
+            sql += " AND stage=?"
+            args += (stage,)
+        if run_id is not None:
+            sql += " AND run_id=?"
+            args += (run_id,)
+        return self.conn.execute(sql + " ORDER BY file", args).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def run_tracked(store: JobStore | None, file: str, stage: str, work, skip_completed: bool = False) -> bool:
+    """
+    Run work() for one file with job tracking. Returns False if skipped as
+    already completed; exceptions from work() propagate after being recorded.
+    """
+    if store is None:
+        work()
+        return True
+    if skip_completed and store.is_done(file, stage):
+        print(f"[SKIP] 已完成: {file}")
+        store.skip(file, stage)
+        return False
+    with store.track(file, stage):
+        work()
+    return True
+
+
+if __name__ == "__main__":
+    store = JobStore(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB)
+    run = int(sys.argv[2]) if len(sys.argv) > 2 else store.latest_run()
+    print(f"run {run}" if run is not None else "all runs")
+    for line in store.format_report(run):
+        print(line)
+    for file, stage, error in store.failures(run_id=run):
+        print(f"  FAILED [{stage}] {file}: {error}")
@@ -0,0 +1,86 @@
+# automation/log_stream.py
+"""
+Bounded, rate-limited log view for ExternalWindow.
+
+Runner output can arrive as thousands of lines per second; appending each one
+to a QTextEdit re-lays out the whole document and freezes the window. Instead:
+
+    LogStream.append(text)   -> lines go into a ring buffer (deque, maxlen)
+                                and straight into a rotating log file
+    QTimer (fps per second)  -> one appendPlainText() with everything buffered
+    QPlainTextEdit           -> setMaximumBlockCount keeps only the last lines
+
+Lines that overflow the buffer between two frames are counted and reported as
+one "... N lines skipped" line; the log file always has the complete output.
+"""
+from __future__ import annotations
+from collections import deque
+from datetime import datetime
+import logging
+import logging.handlers
+import os
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtWidgets import QPlainTextEdit
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+
+def rotating_file_logger(name: str = "external", log_dir: str = LOG_DIR,
+                         max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5) -> logging.Logger:
+    """Logger writing to <log_dir>/<name>.log, rotated at max_bytes (name.log.1 ... .N)."""
+    logger = logging.getLogger(f"automation.{name}")
+    if not logger.handlers:
+        os.makedirs(log_dir, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, f"{name}.log"), maxBytes=max_bytes,
+            backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class LogStream(QObject):
+    def __init__(self, view: QPlainTextEdit, capacity: int = 5000, fps: int = 20,
+                 logger: logging.Logger | None = None, parent=None):
+        super().__init__(parent or view)
+        self.view = view
+        self.view.setReadOnly(True)
+        self.view.setMaximumBlockCount(capacity)
+        self.buffer = deque(maxlen=capacity)
+        self.dropped = 0
+        self.logger = logger
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, int(1000 / fps)))
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def append(self, text: str):
+        lines = str(text).rstrip("\n").split("\n")
+        overflow = len(self.buffer) + len(lines) - self.buffer.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.buffer.extend(line.rstrip("\r") for line in lines)
+        if self.logger is not None:
+            for line in lines:
+                self.logger.info(line.rstrip("\r"))
+
+    def flush(self):
+        if not self.buffer:
+            return
+        lines = list(self.buffer)
+        self.buffer.clear()
+        if self.dropped:
+            skipped = self.dropped + len(lines) - (self.buffer.maxlen - 1)
+            lines = [f"... {skipped} lines skipped ({datetime.now():%H:%M:%S}, see log file)"] \
+                + lines[-(self.buffer.maxlen - 1):]
+            self.dropped = 0
+        # one append per frame; QPlainTextEdit keeps following the end if it was there
+        self.view.appendPlainText("\n".join(lines))
+
+    def clear(self):
+        self.buffer.clear()
+        self.dropped = 0
+        self.view.clear()
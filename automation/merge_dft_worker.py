@@ -1,9 +1,187 @@
 # automation/merge_dft_worker.py
 from PySide6.QtCore import QThread, Signal
-import os, time, shutil, csv
+import os, sys, time, csv, tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 from openpyxl import load_workbook
+from openpyxl.cell.cell import Cell
 import re
+from file_discovery import DiscoveryRules, discover_files
+from merge_manifest import MergeManifest, fingerprint
+from dft_csv import PERCENT_FORMAT, read_dft_csv
+from xlsx_transplant import TransplantError, transplant_sheet
+from relocation import execute_plan, plan_relocation
+
+DFT_SHEET = "DFT result"
+MERGE_MODES = ("transplant", "rewrite")
+
+
+def _coerce_excel_number(val):
+    """Legacy per-cell coercion (used only by merge_pair_legacy). Turn common numeric-looking strings into numbers. Return (new_value, number_format or None)."""
+    if val is None or isinstance(val, (int, float)):
+        return val, None
+    if not isinstance(val, str):
+        return val, None
+
+    s = val.strip()
+    if s == "":
+        return "", None
+
+    # negative in parentheses: (123.4) -> -123.4
+    m = re.match(r"^\((.+)\)$", s)
+    if m:
+        s = "-" + m.group(1).strip()
+
+    # percent handling: '12.3%' -> 0.123 and set percent format
+    is_percent = s.endswith("%")
+    if is_percent:
+        s = s[:-1].strip()
+
+    # remove thousands separators (1,234.56 -> 1234.56)
+    s = s.replace(",", "")
+
+    # try float
+    try:
+        num = float(s)
+        if is_percent:
+            return num / 100.0, "0.00%"
+        # optional: choose a general numeric format
+        return num, "General"
+    except ValueError:
+        return val, None
+
+
+def _looks_like_header(values) -> bool:  # legacy path only
+    """Heuristic: a row containing alphabetic text is a header row and is kept as-is."""
+    return any(isinstance(v, str) and any(ch.isalpha() for ch in v) for v in values)
+
+
+def merge_pair(xfile: str, cfile: str, merged_fp: str, mode: str = "transplant") -> dict:
+    """
+    Single-pass merge: every instrument sheet and a typed DFT sheet are written
+    exactly once, with one save. The CSV is parsed straight to typed values by
+    dft_csv.read_dft_csv, so no per-cell coercion runs here.
+
+    mode="transplant" copies the .xlsx package parts unchanged and only adds the
+    DFT worksheet (see xlsx_transplant); other inputs (.xls/.xlsm/.xlsb) or an
+    unexpected package layout fall back to mode="rewrite" (pandas round trip).
+    Returns per-phase timings, the numeric cell count and the mode actually used.
+    """
+    t0 = time.perf_counter()
+    table = read_dft_csv(cfile)
+    if mode == "transplant" and xfile.lower().endswith(".xlsx"):
+        try:
+            t_read = time.perf_counter()
+            transplant_sheet(xfile, merged_fp, DFT_SHEET, table)
+            t_write = time.perf_counter()
+            return {"read": t_read - t0, "write": t_write - t_read, "total": t_write - t0,
+                    "coerced": table.numeric_cells, "mode": "transplant"}
+        except TransplantError as e:
+            fallback = str(e)
+    else:
+        fallback = None
+
+    all_sheets = pd.read_excel(xfile, sheet_name=None)
+    t_read = time.perf_counter()
+
+    with pd.ExcelWriter(merged_fp, engine='openpyxl') as writer:
+        for sheet_name, df_sheet in all_sheets.items():
+            df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        ws = writer.book.create_sheet(DFT_SHEET)
+        pct_rows = table.percent.any(axis=1)
+        for r_idx, row in enumerate(table.rows):
+            if not pct_rows[r_idx]:
+                ws.append(row)
+                continue
+            # only percent cells need a Cell object to carry the number format
+            cells = []
+            for c_idx, val in enumerate(row):
+                if table.percent[r_idx, c_idx]:
+                    val = Cell(ws, value=val)
+                    val.number_format = PERCENT_FORMAT
+                cells.append(val)
+            ws.append(cells)
+    t_write = time.perf_counter()
+
+    stats = {"read": t_read - t0, "write": t_write - t_read, "total": t_write - t0,
+             "coerced": table.numeric_cells, "mode": "rewrite"}
+    if fallback:
+        stats["fallback"] = fallback
+    return stats
+
+
+def _fix_dft_sheet_numbers(merged_fp, sheet_name=DFT_SHEET) -> int:
+    """Legacy second pass: reopen the merged workbook and convert DFT cells to numbers."""
+    wb = load_workbook(merged_fp)
+    if sheet_name not in wb.sheetnames:
+        return 0
+    ws = wb[sheet_name]
+
+    # Heuristic: if first row looks like header (contains alphabetic chars), skip it
+    first_row = next(ws.iter_rows(min_row=1, max_row=1))
+    start_row = 2 if _looks_like_header([c.value for c in first_row]) else 1
+
+    changed = 0
+    for row in ws.iter_rows(min_row=start_row):
+        for cell in row:
+            new_val, num_fmt = _coerce_excel_number(cell.value)
+            if new_val is not cell.value:
+                cell.value = new_val
+                changed += 1
+            if num_fmt:
+                cell.number_format = num_fmt
+
+    wb.save(merged_fp)
+    return changed
+
+
+def merge_pair_legacy(xfile: str, cfile: str, merged_fp: str):
+    """The original three-save merge, kept for timing comparisons."""
+    # 1) Copy all sheets from Excel into merged workbook
+    all_sheets = pd.read_excel(xfile, sheet_name=None)
+    with pd.ExcelWriter(merged_fp, engine='openpyxl') as writer:
+        for sheet_name, df_sheet in all_sheets.items():
+            df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    # 2) Append raw CSV content as "DFT result" *as strings*
+    raw = open(cfile, 'rb').read().decode('utf-8', errors='replace')
+    wb = load_workbook(merged_fp)
+    ws = wb.create_sheet(DFT_SHEET)
+    for row in csv.reader(raw.splitlines()):
+        ws.append(row)
+    wb.save(merged_fp)
+
+    _fix_dft_sheet_numbers(merged_fp, sheet_name=DFT_SHEET)
+
+
+def _time_legacy_merge(xfile: str, cfile: str) -> float:
+    """Run the old three-save merge into a scratch file, return its wall time."""
+    fd, tmp_fp = tempfile.mkstemp(suffix=".xlsx", prefix="legacy_merge_")
+    os.close(fd)
+    try:
+        t0 = time.perf_counter()
+        merge_pair_legacy(xfile, cfile, tmp_fp)
+        return time.perf_counter() - t0
+    finally:
+        try:
+            os.remove(tmp_fp)
+        except OSError:
+            pass
+
+
+def _merge_job(xfile: str, cfile: str, merged_fp: str, compare_legacy: bool = False,
+               top_folder: str | None = None, mode: str = "transplant") -> dict:
+    """Unit of work for the merge process pool (module level so it pickles)."""
+    # fingerprint (incl. SHA-1) the inputs here so hashing runs in the pool too
+    inputs = [fingerprint(p, top_folder) for p in (xfile, cfile)]
+    stats = merge_pair(xfile, cfile, merged_fp, mode)
+    stats["inputs"] = inputs
+    if compare_legacy:
+        stats["legacy"] = _time_legacy_merge(xfile, cfile)
+    return stats
+
 
 class MergeDftWorker(QThread):
     """
@@ -11,8 +189,29 @@ class MergeDftWorker(QThread):
     then move *everything else* (all originals including .iPrd/.csv/Excel and all subfolders)
     into backup/, preserving relative structure. Only merged files remain in the top folder.
 
-    NOTE: This version appends CSV rows using openpyxl/csv.reader,
-    so values in the 'DFT result' sheet are written as strings (pre-numeric-coercion behavior).
+    Each pair is merged in a single pass (see merge_pair): the copied sheets and a
+    typed 'DFT result' sheet are written once. Set compare_legacy=True to also time
+    the old write/reload/coerce round trip per pair and log the comparison.
+
+    Pass 1 merges run in a process pool of max_workers processes. Results are
+    consumed in group order on this thread, so progress, log lines and all moves
+    into backup/ stay ordered and single-threaded.
+
+    backup/merge_manifest.json records the inputs behind every merged file; groups
+    whose output is still current are skipped, and merged files from earlier runs
+    stay in the top folder instead of being swept into backup/.
+
+    After pass 1 every other file found by the initial scan is moved into backup/
+    by one relocation plan (see relocation.py); the moves are journaled to
+    backup/relocation_<timestamp>.jsonl and can be reverted with undo_journal().
+
+    With ingest_db_path set, each merged (or already up-to-date but not yet
+    imported) output is ingested into that SQLite database right after its group
+    is processed, one commit per group, so samples are queryable while the run
+    is still going.
+
+    merge_mode selects how the instrument workbook is carried over: "transplant"
+    (default, zip-level copy of the .xlsx parts) or "rewrite" (pandas round trip).
     """
     # Signals
     progress_updated = Signal(int, int, str)      # percent, current_index(1-based), base_name
@@ -20,9 +219,17 @@ class MergeDftWorker(QThread):
     log_message      = Signal(str)                # freeform text (append to log window)
     finished         = Signal(list, list)         # success_list [(merged, xfile, cfile)], error_list [(base, err)]
 
-    def __init__(self, top_folder: str):
+    MOVE_LOG_LIMIT = 500
+
+    def __init__(self, top_folder: str, compare_legacy: bool = False, max_workers: int | None = None,
+                 merge_mode: str = "transplant", ingest_db_path: str | None = None):
         super().__init__()
         self.top_folder = os.path.abspath(top_folder)
+        self.compare_legacy = compare_legacy
+        # pass-1 merge concurrency; 1 merges inline without a process pool
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        self.merge_mode = merge_mode if merge_mode in MERGE_MODES else "transplant"
+        self.ingest_db_path = os.path.abspath(ingest_db_path) if ingest_db_path else None
         self._is_cancelled = False
 
     def cancel(self):
@@ -35,38 +242,57 @@ class MergeDftWorker(QThread):
         except Exception:
             return path
 
-    def _ensure_parent_dir(self, dst_path: str):
-        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    def _merge_pair(self, xfile: str, cfile: str, merged_fp: str) -> dict:
+        return _merge_job(xfile, cfile, merged_fp, self.compare_legacy, self.top_folder, self.merge_mode)
+
+    def _open_ingest_db(self):
+        """DatabaseModel for ingest_db_path, opened on this thread (None if disabled/failed)."""
+        if not self.ingest_db_path:
+            return None
+        try:
+            from model.database_model import DatabaseModel
+        except ImportError:
+            # started from automation/: make the project root importable
+            sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            from model.database_model import DatabaseModel
+        try:
+            db = DatabaseModel(self.ingest_db_path)
+            self.log_message.emit(f"🗄  ingesting into: {self.ingest_db_path}")
+            return db
+        except Exception as e:
+            self.log_message.emit(f"⚠️ cannot open database, ingest disabled: {e}")
+            return None
+
+    def _ingest(self, db, manifest: MergeManifest, merged_fp: str) -> bool:
+        if manifest.ingested_as(merged_fp, self.ingest_db_path):
+            return False
+        try:
+            name = db.ingest_excel(merged_fp)
+        except Exception as e:
+            self.log_message.emit(f"  ⚠️ ingest failed: {e}")
+            return False
+        manifest.mark_ingested(merged_fp, self.ingest_db_path, name)
+        self.log_message.emit(f"  🗄  ingested as {name}")
+        return True
+
+    def _start_pool(self, n_jobs: int):
+        """Process pool for pass 1, or None to merge inline on this thread."""
+        workers = min(self.max_workers, n_jobs)
+        if workers <= 1:
+            return None
+        self.log_message.emit(f"⚙️  merging with {workers} worker processes")
+        return ProcessPoolExecutor(max_workers=workers)
+
+    def _fmt_timing(self, stats: dict) -> str:
+        msg = (f"  ⏱  {stats.get('mode', 'rewrite')}: read {stats['read']:.2f}s, write {stats['write']:.2f}s, "
+               f"total {stats['total']:.2f}s ({stats['coerced']} numeric cells)")
+        if stats.get("fallback"):
+            msg += f" [transplant skipped: {stats['fallback']}]"
+        legacy = stats.get("legacy")
+        if legacy:
+            msg += f" | legacy {legacy:.2f}s → {legacy / max(stats['total'], 1e-9):.1f}x faster"
+        return msg
 
-    def _safe_move(self, src: str, dst: str):
-        self._ensure_parent_dir(dst)
-        if os.path.abspath(src) == os.path.abspath(dst):
-            return
-        base, ext = os.path.splitext(dst)
-        candidate = dst
-        n = 1
-        while os.path.exists(candidate):
-            candidate = f"{base} ({n}){ext}"
-            n += 1
-        shutil.move(src, candidate)
-        self.log_message.emit(f"↪️  moved: {self._fmt_rel(src)}  →  {self._fmt_rel(candidate)}")
-
-    def _merge_pair(self, xfile: str, cfile: str, merged_fp: str):
-        # 1) Copy all sheets from Excel into merged workbook
-        all_sheets = pd.read_excel(xfile, sheet_name=None)
-        with pd.ExcelWriter(merged_fp, engine='openpyxl') as writer:
-            for sheet_name, df_sheet in all_sheets.items():
-                df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
-
-        # 2) Append raw CSV content as "DFT result" *as strings*
-        raw = open(cfile, 'rb').read().decode('utf-8', errors='replace')
-        wb = load_workbook(merged_fp)
-        ws = wb.create_sheet("DFT result")
-        for row in csv.reader(raw.splitlines()):
-            ws.append(row)
-        wb.save(merged_fp)
-
-        self._fix_dft_sheet_numbers(merged_fp, sheet_name="DFT result")
     # ---------------- main work ----------------
     def run(self):
         t0 = time.time()
@@ -84,16 +310,14 @@ class MergeDftWorker(QThread):
         excel_exts = ('.xls', '.xlsx', '.xlsm', '.xlsb')
 
         # --- gather candidates (include .iprd too) ---
-        all_paths = []
-        for dirpath, _, filenames in os.walk(self.top_folder):
-            abs_dir = os.path.abspath(dirpath)
-            # skip backup subtree entirely
-            if abs_dir.startswith(os.path.abspath(backup_dir)):
-                continue
-            for fn in filenames:
-                lower = fn.lower()
-                if lower.endswith(excel_exts) or lower.endswith('.csv') or lower.endswith('.iprd'):
-                    all_paths.append(os.path.join(dirpath, fn))
+        # one parallel scandir walk; backup/ is pruned, not walked and filtered
+        scan_rules = DiscoveryRules(exclude_dirs={"backup"})
+        scan = discover_files(self.top_folder, scan_rules)
+        self.log_message.emit(f"🔎 scanned {scan.summary()}")
+        manifest = MergeManifest(backup_dir)
+        known_outputs = {os.path.join(self.top_folder, name) for name in manifest.outputs()}
+        all_paths = [p for p in scan.files
+                     if p.lower().endswith(excel_exts + ('.csv', '.iprd')) and p not in known_outputs]
 
         # --- group by base name (before first dot) ---
         groups = {}
@@ -105,159 +329,101 @@ class MergeDftWorker(QThread):
         self.log_message.emit(f"Groups: {total_groups}")
         success, failed = [], []
         produced_merged = []  # abs paths of final merged files
+        db = self._open_ingest_db()
+        ingested = 0
 
         # --- Pass 1: merge exactly 1 Excel + 1 CSV ---
-        for idx, (base, paths) in enumerate(groups.items(), start=1):
-            if self._is_cancelled:
-                self.status_updated.emit("Cancelled.")
-                break
-
-            percent = int((idx / max(total_groups, 1)) * 100)
-            self.progress_updated.emit(percent, idx, base)
-            self.status_updated.emit(f"Processing: {base}")
-            self.log_message.emit(f"[{idx}/{total_groups}] {base}")
-
+        plan = []  # (base, xfile, cfile, iprds, merged_fp) in group order; xfile None = skip
+        for base, paths in groups.items():
             excels = [p for p in paths if p.lower().endswith(excel_exts)]
             csvs   = [p for p in paths if p.lower().endswith('.csv')]
             iprds  = [p for p in paths if p.lower().endswith('.iprd')]
-
             if len(excels) != 1 or len(csvs) != 1:
-                self.log_message.emit("  ⚠️  skip (need exactly 1 Excel + 1 CSV).")
+                plan.append((base, None, None, iprds, None))
                 continue
-
-            xfile, cfile = excels[0], csvs[0]
             merged_fp = os.path.join(self.top_folder, f"{base}_merged.xlsx")
-            try:
-                self._merge_pair(xfile, cfile, merged_fp)
-                produced_merged.append(os.path.abspath(merged_fp))
-                success.append((merged_fp, xfile, cfile))
-                self.log_message.emit(f"  ✅ merged → {self._fmt_rel(merged_fp)}")
-
-                # move originals (excel/csv/iprd) into backup right away
-                try:
-                    for src in [xfile, cfile] + iprds:
-                        rel_src = os.path.relpath(os.path.abspath(src), os.path.abspath(self.top_folder))
-                        # only move things inside top folder
-                        if os.path.commonpath([os.path.abspath(src), os.path.abspath(self.top_folder)]) != os.path.abspath(self.top_folder):
-                            self.log_message.emit(f"  ⚠️ skip move (outside top): {src}")
-                            continue
-                        dst = os.path.join(backup_dir, rel_src)
-                        self._safe_move(src, dst)
-                except Exception as move_err:
-                    self.log_message.emit(f"  ⚠️ move originals failed: {move_err}")
-
-            except Exception as e:
-                failed.append((base, str(e)))
-                self.log_message.emit(f"  ❌ merge failed: {base} → {e}")
+            plan.append((base, excels[0], csvs[0], iprds, merged_fp))
+
+        up_to_date = {item[0] for item in plan
+                      if item[1] is not None and manifest.is_current(item[4], [item[1], item[2]])}
+        jobs = [item for item in plan if item[1] is not None and item[0] not in up_to_date]
+        pool = self._start_pool(len(jobs))
+        futures = {}
+        if pool is not None:
+            for base, xfile, cfile, _, merged_fp in jobs:
+                futures[base] = pool.submit(_merge_job, xfile, cfile, merged_fp,
+                                            self.compare_legacy, self.top_folder, self.merge_mode)
 
-        # --- Pass 2: sweep everything else (ALL files) into backup, except final merged in top ---
-        self.status_updated.emit("Moving remaining files to backup…")
-        self.log_message.emit("— Sweeping remaining files into backup (keep only *_merged.xlsx in root) —")
-        merged_set = set(os.path.abspath(p) for p in produced_merged)
-
-        for dirpath, _, filenames in os.walk(self.top_folder):
-            abs_dir = os.path.abspath(dirpath)
-            if abs_dir.startswith(os.path.abspath(backup_dir)):
-                continue
-            for fn in filenames:
-                p = os.path.join(dirpath, fn)
-                ap = os.path.abspath(p)
-
-                # keep final merged files only if they sit in the exact top folder
-                if ap in merged_set and abs_dir == os.path.abspath(self.top_folder):
-                    continue
-
-                # only move files inside top folder
-                if os.path.commonpath([ap, os.path.abspath(self.top_folder)]) != os.path.abspath(self.top_folder):
-                    self.log_message.emit(f"⚠️ skip (outside top): {self._fmt_rel(ap)}")
+        try:
+            for idx, (base, xfile, cfile, iprds, merged_fp) in enumerate(plan, start=1):
+                if self._is_cancelled:
+                    self.status_updated.emit("Cancelled.")
+                    break
+
+                percent = int((idx / max(total_groups, 1)) * 100)
+                self.progress_updated.emit(percent, idx, base)
+                self.status_updated.emit(f"Processing: {base}")
+                self.log_message.emit(f"[{idx}/{total_groups}] {base}")
+
+                if xfile is None:
+                    self.log_message.emit("  ⚠️  skip (need exactly 1 Excel + 1 CSV).")
                     continue
 
-                rel = os.path.relpath(ap, self.top_folder)
-                dst = os.path.join(backup_dir, rel)
                 try:
-                    self._safe_move(ap, dst)
-                except Exception as e:
-                    self.log_message.emit(f"⚠️ move failed: {self._fmt_rel(ap)} → {e}")
+                    if base in up_to_date:
+                        produced_merged.append(os.path.abspath(merged_fp))
+                        self.log_message.emit(f"  ⏭  up to date → {self._fmt_rel(merged_fp)}")
+                    else:
+                        fut = futures.get(base)
+                        stats = fut.result() if fut is not None else self._merge_pair(xfile, cfile, merged_fp)
+                        manifest.record(merged_fp, stats["inputs"])
+                        produced_merged.append(os.path.abspath(merged_fp))
+                        success.append((merged_fp, xfile, cfile))
+                        self.log_message.emit(f"  ✅ merged → {self._fmt_rel(merged_fp)}")
+                        self.log_message.emit(self._fmt_timing(stats))
+
+                    if db is not None and self._ingest(db, manifest, merged_fp):
+                        ingested += 1
 
-        # --- Pass 3: remove now-empty subfolders in top (not touching backup/) ---
-        for dirpath, dirnames, _ in os.walk(self.top_folder, topdown=False):
-            abs_dir = os.path.abspath(dirpath)
-            if abs_dir.startswith(os.path.abspath(backup_dir)):
-                continue
-            if abs_dir == os.path.abspath(self.top_folder):
-                continue
+                except Exception as e:
+                    failed.append((base, str(e)))
+                    self.log_message.emit(f"  ❌ merge failed: {base} → {e}")
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
             try:
-                if not os.listdir(dirpath):
-                    os.rmdir(dirpath)
-                    self.log_message.emit(f"🧹 removed empty folder: {self._fmt_rel(dirpath)}")
+                manifest.save()
             except Exception as e:
-                self.log_message.emit(f"⚠️ remove dir failed: {self._fmt_rel(dirpath)} → {e}")
+                self.log_message.emit(f"⚠️ cannot write merge manifest: {e}")
+            if db is not None and db.conn is not None:
+                db.conn.close()
+
+        # --- Pass 2: move everything else into backup in one planned, journaled sweep ---
+        # planned from the initial scan; keep final merged files (this run and earlier runs)
+        self.status_updated.emit("Moving remaining files to backup…")
+        self.log_message.emit("— Sweeping remaining files into backup (keep only *_merged.xlsx in root) —")
+        keep = set(os.path.abspath(p) for p in produced_merged) | known_outputs
+        reloc_plan = plan_relocation(self.top_folder, backup_dir, scan.files, scan.dirs, keep)
+        journal_path = os.path.join(backup_dir, f"relocation_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+        # per-file log lines only for small sweeps; large trees get the summary
+        on_move = None
+        if len(reloc_plan.moves) <= self.MOVE_LOG_LIMIT:
+            on_move = lambda src, dst: self.log_message.emit(
+                f"↪️  moved: {self._fmt_rel(src)}  →  {self._fmt_rel(dst)}")
+        reloc = execute_plan(reloc_plan, journal_path, on_move=on_move,
+                             is_cancelled=lambda: self._is_cancelled)
+        if self._is_cancelled:
+            self.log_message.emit("⏹ Sweep cancelled; files not yet moved stay in place")
+        for path, err in reloc.errors[:self.MOVE_LOG_LIMIT]:
+            self.log_message.emit(f"⚠️ move failed: {self._fmt_rel(path)} → {err}")
+        self.log_message.emit(f"🧹 {reloc.summary()}")
+        if reloc.moved or reloc.removed_dirs:
+            self.log_message.emit(f"↩️  undo journal: {self._fmt_rel(journal_path)} "
+                                  f"(python relocation.py --undo <journal>)")
 
         elapsed = time.time() - t0
         self.status_updated.emit(f"Done. Elapsed: {int(elapsed)}s")
-        self.log_message.emit(f"✔ Done. Merged: {len(success)}, Failed: {len(failed)}. Elapsed: {int(elapsed)}s")
+        ingest_note = f", Ingested: {ingested}" if db is not None else ""
+        self.log_message.emit(f"✔ Done. Merged: {len(success)}, Up to date: {len(up_to_date)}, "
+                              f"Failed: {len(failed)}{ingest_note}. Elapsed: {int(elapsed)}s")
         self.finished.emit(success, failed)
-
-    def _coerce_excel_number(self, val):
-        """Turn common numeric-looking strings into numbers. Return (new_value, number_format or None)."""
-        if val is None or isinstance(val, (int, float)):
-            return val, None
-        if not isinstance(val, str):
-            return val, None
-
-        s = val.strip()
-        if s == "":
-            return "", None
-
-        # negative in parentheses: (123.4) -> -123.4
-        m = re.match(r"^\((.+)\)$", s)
-        if m:
-            s = "-" + m.group(1).strip()
-
-        # percent handling: '12.3%' -> 0.123 and set percent format
-        is_percent = s.endswith("%")
-        if is_percent:
-            s = s[:-1].strip()
-
-        # remove thousands separators (1,234.56 -> 1234.56)
-        s = s.replace(",", "")
-
-        # try float
-        try:
-            num = float(s)
-            if is_percent:
-                return num / 100.0, "0.00%"
-            # optional: choose a general numeric format
-            return num, "General"
-        except ValueError:
-            return val, None
-
-    def _fix_dft_sheet_numbers(self, merged_fp, sheet_name="DFT result"):
-        """Open the merged workbook and convert DFT sheet cells to numbers when possible."""
-        wb = load_workbook(merged_fp)
-        if sheet_name not in wb.sheetnames:
-            return
-        ws = wb[sheet_name]
-
-        # Heuristic: if first row looks like header (contains alphabetic chars), skip it
-        def _looks_like_header(row):
-            for c in row:
-                v = c.value
-                if isinstance(v, str) and any(ch.isalpha() for ch in v):
-                    return True
-            return False
-
-        start_row = 2 if _looks_like_header(next(ws.iter_rows(min_row=1, max_row=1))) else 1
-
-        changed = 0
-        for row in ws.iter_rows(min_row=start_row):
-            for cell in row:
-                new_val, num_fmt = self._coerce_excel_number(cell.value)
-                if new_val is not cell.value:
-                    cell.value = new_val
-                    changed += 1
-                if num_fmt:
-                    cell.number_format = num_fmt
-
-        wb.save(merged_fp)
-        self.log_message.emit(f"  🔢 coerced numbers in '{sheet_name}' (changed ~{changed} cells)")
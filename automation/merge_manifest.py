@@ -0,0 +1,128 @@
+# automation/merge_manifest.py
+"""
+Manifest of merged outputs, stored as backup/merge_manifest.json:
+
+    {
+      "S1_merged.xlsx": {
+        "output": {"size": ..., "mtime_ns": ...},
+        "inputs": [{"name": "S1.xlsx", "rel": "sub/S1.xlsx", "size": ..., "mtime_ns": ..., "sha1": "..."}],
+        "merged_at": "2025-01-01 12:00:00",
+        "ingested": {"/abs/path/adsorption.db": "S1_merged"}
+      }
+    }
+
+A group is up to date when its merged output is unchanged since it was recorded
+and every input matches by name and size, and by mtime or (if the mtime moved,
+e.g. a fresh copy of the same file) by SHA-1. Inputs are matched by file name
+because MergeDftWorker moves them into backup/ after merging.
+
+"ingested" remembers which databases already hold the current merged output
+(and under which sample name), so re-runs do not import it twice. Re-merging a
+group resets it.
+"""
+from __future__ import annotations
+from datetime import datetime
+import hashlib
+import json
+import os
+
+
+def file_sha1(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(path: str, top_folder: str | None = None, with_hash: bool = True) -> dict:
+    st = os.stat(path)
+    fp = {
+        "name": os.path.basename(path),
+        "rel": os.path.relpath(path, top_folder) if top_folder else path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    if with_hash:
+        fp["sha1"] = file_sha1(path)
+    return fp
+
+
+class MergeManifest:
+    FILENAME = "merge_manifest.json"
+
+    def __init__(self, backup_dir: str):
+        self.path = os.path.join(backup_dir, self.FILENAME)
+        self.entries: dict[str, dict] = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if isinstance(data, dict):
+                self.entries = data
+        except (OSError, ValueError):
+            pass
+
+    def outputs(self) -> set[str]:
+        """File names of every merged output the manifest knows about."""
+        return set(self.entries)
+
+    def is_current(self, merged_fp: str, input_paths: list[str]) -> bool:
+        entry = self.entries.get(os.path.basename(merged_fp))
+        if not entry:
+            return False
+        try:
+            st = os.stat(merged_fp)
+        except OSError:
+            return False
+        out = entry.get("output", {})
+        if st.st_size != out.get("size") or st.st_mtime_ns != out.get("mtime_ns"):
+            return False
+
+        recorded = {i.get("name"): i for i in entry.get("inputs", [])}
+        if len(recorded) != len(input_paths):
+            return False
+        for p in input_paths:
+            rec = recorded.get(os.path.basename(p))
+            if rec is None:
+                return False
+            try:
+                st = os.stat(p)
+            except OSError:
+                return False
+            if st.st_size != rec.get("size"):
+                return False
+            if st.st_mtime_ns != rec.get("mtime_ns") and file_sha1(p) != rec.get("sha1"):
+                return False
+        return True
+
+    def record(self, merged_fp: str, inputs: list[dict]):
+        st = os.stat(merged_fp)
+        self.entries[os.path.basename(merged_fp)] = {
+            "output": {"size": st.st_size, "mtime_ns": st.st_mtime_ns},
+            "inputs": inputs,
+            "merged_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._dirty = True
+
+    def ingested_as(self, merged_fp: str, db_path: str) -> str | None:
+        """Sample name the current output was ingested under in db_path, if any."""
+        entry = self.entries.get(os.path.basename(merged_fp), {})
+        return entry.get("ingested", {}).get(os.path.abspath(db_path))
+
+    def mark_ingested(self, merged_fp: str, db_path: str, sample_name: str):
+        entry = self.entries.get(os.path.basename(merged_fp))
+        if entry is None:
+            return
+        entry.setdefault("ingested", {})[os.path.abspath(db_path)] = sample_name
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.entries, fh, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self._dirty = False
@@ -0,0 +1,327 @@
+# automation/pipeline.py
+"""
+Per-file streaming orchestration: StencilWizard -> Soran -> Merge.
+
+Each stage owns one long-running runner and one thread; stages are connected
+by queues, so a file moves on to the next stage as soon as its current stage
+finishes instead of waiting for the whole list:
+
+    keys ─▶ [stencil] ─q─▶ [soran] ─q─▶ [merge] ─▶ results
+
+A key is the original .iPrd path; each Stage maps it to the path its runner
+expects (x.iPrd for StencilWizard, x.txt for Soran). A file that fails a stage
+skips the remaining stages and is reported once at the end.
+
+Runners are pluggable (StageRunner): ProcessStageRunner drives a script in
+--stdin serve mode (see runner_protocol.py), MergeStageRunner merges in-process
+and records the group in the merge manifest, so a later MergeDftWorker run only
+sweeps files into backup/. dummy_runner.py stands in for the Windows tools:
+
+    python pipeline.py filelist.txt settings.json --top ROOT --fake --delay 0.2
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable
+import argparse
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+from runner_protocol import APP_PID, DONE, FAILED, HEARTBEAT, READY, parse_marker
+
+AUTOMATION_DIR = os.path.dirname(os.path.abspath(__file__))
+EXCEL_EXTS = ('.xls', '.xlsx', '.xlsm', '.xlsb')
+
+
+@dataclass
+class PipelineItem:
+    key: str                                             # original .iPrd path
+    started: float = field(default_factory=time.perf_counter)
+    finished: float = 0.0
+    stage_times: dict[str, float] = field(default_factory=dict)
+    failed_stage: str | None = None
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_stage is None
+
+
+# ---------------- runners ----------------
+class StageRunner(ABC):
+    """One runner per stage. process() is called from the stage thread only."""
+    name = "stage"
+
+    def start(self, log):
+        self.log = log
+
+    @abstractmethod
+    def process(self, path: str) -> tuple[bool, str]:
+        """(ok, message) for one file."""
+
+    def stop(self):
+        pass
+
+
+class ProcessStageRunner(StageRunner):
+    """A runner script in --stdin serve mode, fed one path at a time."""
+
+    def __init__(self, name: str, argv: list[str], cwd: str | None = None):
+        self.name = name
+        self.argv = argv
+        self.cwd = cwd or AUTOMATION_DIR
+        self.proc = None
+
+    def start(self, log):
+        super().start(log)
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+        self.proc = subprocess.Popen(
+            self.argv, cwd=self.cwd, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, encoding="utf-8", errors="replace", bufsize=1)
+        kind, _, _ = self._read_until_marker()
+        if kind != READY:
+            raise RuntimeError(f"{self.name} runner did not start")
+
+    def _read_until_marker(self, expect: str | None = None):
+        """Log output until [READY] (expect=None) or the [DONE]/[FAILED] marker for `expect`."""
+        for line in self.proc.stdout:
+            marker = parse_marker(line)
+            # runners also print free-form "[DONE] ..." lines; only the marker for the sent path counts
+            if marker and (marker[0] == READY if expect is None else marker[1] == expect):
+                return marker
+            if marker and marker[0] in (HEARTBEAT, APP_PID):
+                continue
+            if line.strip():
+                self.log(f"[{self.name}] {line.rstrip()}")
+        return None, "", "runner exited"
+
+    def process(self, path: str) -> tuple[bool, str]:
+        if self.proc is None or self.proc.poll() is not None:
+            return False, "runner not running"
+        try:
+            self.proc.stdin.write(path + "\n")
+            self.proc.stdin.flush()
+        except OSError as e:
+            return False, f"runner stdin closed: {e}"
+        kind, _, detail = self._read_until_marker(expect=path)
+        if kind == DONE:
+            return True, ""
+        return False, detail if kind == FAILED else "runner exited"
+
+    def stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.write("\n")
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        for line in self.proc.stdout:   # drain shutdown output
+            if line.strip():
+                self.log(f"[{self.name}] {line.rstrip()}")
+
+
+class MergeStageRunner(StageRunner):
+    """Merge a file's Excel + CSV into {top}/{base}_merged.xlsx as soon as Soran is done."""
+    name = "merge"
+
+    def __init__(self, top_folder: str, merge_mode: str = "transplant"):
+        self.top_folder = os.path.abspath(top_folder)
+        self.merge_mode = merge_mode
+
+    def start(self, log):
+        super().start(log)
+        from merge_manifest import MergeManifest
+        self.manifest = MergeManifest(os.path.join(self.top_folder, "backup"))
+
+    def process(self, path: str) -> tuple[bool, str]:
+        from merge_dft_worker import _merge_job
+        folder = os.path.dirname(path)
+        base = os.path.basename(path).split('.', 1)[0]
+        with os.scandir(folder) as it:
+            names = [e.name for e in it if e.is_file() and e.name.split('.', 1)[0] == base]
+        excels = [n for n in names if n.lower().endswith(EXCEL_EXTS)]
+        csvs = [n for n in names if n.lower().endswith('.csv')]
+        if len(excels) != 1 or len(csvs) != 1:
+            return False, f"need exactly 1 Excel + 1 CSV, found {len(excels)} + {len(csvs)}"
+        merged_fp = os.path.join(self.top_folder, f"{base}_merged.xlsx")
+        xfile, cfile = os.path.join(folder, excels[0]), os.path.join(folder, csvs[0])
+        if self.manifest.is_current(merged_fp, [xfile, cfile]):
+            return True, "up to date"
+        stats = _merge_job(xfile, cfile, merged_fp, False, self.top_folder, self.merge_mode)
+        self.manifest.record(merged_fp, stats["inputs"])
+        self.manifest.save()
+        self.log(f"[merge] ✅ {os.path.basename(merged_fp)} ({stats['total']:.2f}s)")
+        return True, ""
+
+
+@dataclass
+class Stage:
+    runner: StageRunner
+    input_for: Callable[[str], str] = lambda key: key     # key -> path handed to the runner
+
+    @property
+    def name(self) -> str:
+        return self.runner.name
+
+
+# ---------------- orchestrator ----------------
+class StreamingPipeline:
+    def __init__(self, stages: list[Stage], log=print, on_item=None):
+        self.stages = stages
+        self.log = log
+        self.on_item = on_item            # called with each finished PipelineItem, in completion order
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _stage_loop(self, stage: Stage, q_in: queue.Queue, q_out: queue.Queue):
+        while True:
+            item = q_in.get()
+            if item is None:
+                q_out.put(None)
+                return
+            if item.ok and self._cancelled.is_set():
+                item.failed_stage, item.error = stage.name, "cancelled"
+            elif item.ok:
+                t0 = time.perf_counter()
+                try:
+                    ok, detail = stage.runner.process(stage.input_for(item.key))
+                except Exception as e:
+                    ok, detail = False, str(e)
+                item.stage_times[stage.name] = time.perf_counter() - t0
+                if not ok:
+                    item.failed_stage, item.error = stage.name, detail
+            q_out.put(item)
+
+    def run(self, keys: list[str]) -> list[PipelineItem]:
+        t0 = time.perf_counter()
+        keys = [os.path.abspath(k) for k in keys]   # runners work in their own cwd
+        queues = [queue.Queue() for _ in range(len(self.stages) + 1)]
+        started = []
+        try:
+            for stage in self.stages:
+                stage.runner.start(self.log)
+                started.append(stage)
+        except Exception as e:
+            self.log(f"❌ cannot start {stage.name}: {e}")
+            for s in started:
+                s.runner.stop()
+            return [PipelineItem(key=k, failed_stage=stage.name, error=str(e)) for k in keys]
+
+        threads = [threading.Thread(target=self._stage_loop, args=(s, queues[i], queues[i + 1]),
+                                    name=f"pipeline-{s.name}", daemon=True)
+                   for i, s in enumerate(self.stages)]
+        for t in threads:
+            t.start()
+        for k in keys:
+            queues[0].put(PipelineItem(key=k))
+        queues[0].put(None)
+
+        results = []
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is None:
+                    break
+                item.finished = time.perf_counter()
+                if not results:
+                    self.log(f"⏱ first result after {item.finished - t0:.1f}s")
+                results.append(item)
+                if self.on_item:
+                    self.on_item(item)
+        finally:
+            for t in threads:
+                t.join()
+            for s in self.stages:
+                s.runner.stop()
+        ok = sum(1 for r in results if r.ok)
+        self.log(f"⏱ pipeline: {ok}/{len(results)} files through all stages "
+                 f"in {time.perf_counter() - t0:.1f}s")
+        return results
+
+
+def txt_for(key: str) -> str:
+    """StencilWizard writes x.txt next to x.iPrd (see file_utils.convert_iprd_paths_to_txt_file)."""
+    return key.replace(".iPrd", ".txt")
+
+
+def build_stages(settings_path: str, top_folder: str, fake: bool = False, delay: float = 0.0,
+                 merge_mode: str = "transplant") -> list[Stage]:
+    settings_path = os.path.abspath(settings_path)
+    py = sys.executable
+
+    def argv(script, stage):
+        if fake:
+            return [py, os.path.join(AUTOMATION_DIR, "dummy_runner.py"), "--stage", stage,
+                    "--delay", str(delay), "--stdin", settings_path]
+        return [py, os.path.join(AUTOMATION_DIR, script), "--stdin", settings_path]
+
+    return [
+        Stage(ProcessStageRunner("stencil", argv("stencilwizard_runner.py", "stencil"))),
+        Stage(ProcessStageRunner("soran", argv("soran_runner.py", "soran")), input_for=txt_for),
+        Stage(MergeStageRunner(top_folder, merge_mode)),
+    ]
+
+
+class StreamingPipelineWorker(QThread):
+    """Runs a StreamingPipeline off the GUI thread."""
+    progress_updated = Signal(int, int, str)      # percent, finished count, file name
+    log_message      = Signal(str)
+    finished         = Signal(list, list)         # ok keys, [(key, "stage: error")]
+
+    def __init__(self, keys: list[str], stages: list[Stage]):
+        super().__init__()
+        self.keys = keys
+        self.pipeline = StreamingPipeline(stages, log=self.log_message.emit, on_item=self._on_item)
+        self._count = 0
+
+    def cancel(self):
+        self.pipeline.cancel()
+
+    def _on_item(self, item: PipelineItem):
+        self._count += 1
+        name = os.path.basename(item.key)
+        self.progress_updated.emit(int(self._count * 100 / max(len(self.keys), 1)), self._count, name)
+        times = ", ".join(f"{k} {v:.1f}s" for k, v in item.stage_times.items())
+        if item.ok:
+            self.log_message.emit(f"✅ {name} ({times})")
+        else:
+            self.log_message.emit(f"❌ {name} failed at {item.failed_stage}: {item.error}")
+
+    def run(self):
+        results = self.pipeline.run(self.keys)
+        ok = [r.key for r in results if r.ok]
+        errors = [(r.key, f"{r.failed_stage}: {r.error}") for r in results if not r.ok]
+        self.finished.emit(ok, errors)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Stream .iPrd files through StencilWizard -> Soran -> Merge")
+    ap.add_argument("filelist")
+    ap.add_argument("settings")
+    ap.add_argument("--top", required=True, help="folder receiving *_merged.xlsx")
+    ap.add_argument("--fake", action="store_true", help="use dummy_runner.py instead of the Windows tools")
+    ap.add_argument("--delay", type=float, default=0.0, help="per-file delay of the fake runners")
+    opts = ap.parse_args()
+
+    with open(opts.filelist, "r", encoding="utf-8") as fh:
+        keys = [ln.strip() for ln in fh if ln.strip()]
+    with open(opts.settings, "r", encoding="utf-8") as fh:
+        mode = json.load(fh).get("merge_mode", "transplant")
+    results = StreamingPipeline(build_stages(opts.settings, opts.top, opts.fake, opts.delay, mode)).run(keys)
+    for r in results:
+        print(("OK    " if r.ok else f"FAILED[{r.failed_stage}] ") + r.key + (f"  {r.error}" if r.error else ""))
+    sys.exit(0 if all(r.ok for r in results) else 1)
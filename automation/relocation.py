@@ -0,0 +1,205 @@
+# automation/relocation.py
+"""
+Planned, journaled file relocation (used by MergeDftWorker to sweep originals
+into backup/).
+
+    plan = plan_relocation(top, backup_dir, scan.files, scan.dirs, keep)
+    stats = execute_plan(plan, journal_path)
+    undo_journal(journal_path)            # put everything back
+
+    python relocation.py --undo backup/relocation_<timestamp>.jsonl
+
+The plan is built from one directory walk. Name collisions in the destination
+("a.csv" -> "a (1).csv") are resolved in memory: each destination folder is
+listed once with os.scandir instead of probing os.path.exists() in a loop.
+Moves use os.replace (a rename on the same filesystem), falling back to
+shutil.move only across devices. Every completed operation is appended to a
+JSONL journal, so a run can be undone even if it was interrupted.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+import errno
+import json
+import os
+import shutil
+import sys
+import time
+
+
+@dataclass
+class RelocationPlan:
+    moves: list[tuple[str, str]] = field(default_factory=list)   # (src, dst) absolute paths
+    dirs: list[str] = field(default_factory=list)                # folders to remove if empty, deepest first
+    elapsed: float = 0.0
+
+
+@dataclass
+class RelocationStats:
+    moved: int = 0
+    removed_dirs: int = 0
+    errors: list[tuple[str, str]] = field(default_factory=list)  # (path, message)
+    plan_time: float = 0.0
+    move_time: float = 0.0
+    rmdir_time: float = 0.0
+
+    def summary(self) -> str:
+        total = self.plan_time + self.move_time + self.rmdir_time
+        return (f"moved {self.moved} files, removed {self.removed_dirs} folders, "
+                f"{len(self.errors)} errors in {total:.2f}s "
+                f"(plan {self.plan_time:.2f}s, move {self.move_time:.2f}s, rmdir {self.rmdir_time:.2f}s)")
+
+
+class _NameTable:
+    """Names already present (or planned) per destination folder."""
+    def __init__(self):
+        self._taken: dict[str, set[str]] = {}
+
+    def _names(self, folder: str) -> set[str]:
+        names = self._taken.get(folder)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(folder) as it:
+                    names.update(os.path.normcase(e.name) for e in it)
+            except OSError:
+                pass
+            self._taken[folder] = names
+        return names
+
+    def claim(self, dst: str) -> str:
+        folder, name = os.path.split(dst)
+        names = self._names(folder)
+        stem, ext = os.path.splitext(name)
+        candidate, n = name, 1
+        while os.path.normcase(candidate) in names:
+            candidate = f"{stem} ({n}){ext}"
+            n += 1
+        names.add(os.path.normcase(candidate))
+        return os.path.join(folder, candidate)
+
+
+def plan_relocation(top_folder: str, backup_dir: str, files: list[str], dirs: list[str],
+                    keep: set[str] | None = None) -> RelocationPlan:
+    """
+    Move every file under top_folder (except `keep`) to the same relative path
+    under backup_dir, then remove the folders that end up empty.
+
+    :param files: absolute file paths from one walk of top_folder (backup/ excluded)
+    :param dirs:  absolute folder paths from the same walk
+    """
+    t0 = time.perf_counter()
+    top = os.path.abspath(top_folder)
+    keep = keep or set()
+    table = _NameTable()
+    plan = RelocationPlan()
+    for src in files:
+        if src in keep:
+            continue
+        rel = os.path.relpath(src, top)
+        if rel.startswith(os.pardir):
+            continue   # only things inside the top folder
+        plan.moves.append((src, table.claim(os.path.join(backup_dir, rel))))
+    plan.dirs = sorted((d for d in dirs if os.path.abspath(d) != top),
+                       key=lambda d: d.count(os.sep), reverse=True)
+    plan.elapsed = time.perf_counter() - t0
+    return plan
+
+
+def _move(src: str, dst: str):
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+def execute_plan(plan: RelocationPlan, journal_path: str | None = None,
+                 on_move=None, is_cancelled=None) -> RelocationStats:
+    """
+    Run the plan. on_move(src, dst) is called after each move; is_cancelled()
+    is checked between moves. Folders are only removed when not cancelled.
+    """
+    stats = RelocationStats(plan_time=plan.elapsed)
+    journal = open(journal_path, "a", encoding="utf-8") if journal_path else None
+
+    def record(entry: dict):
+        # flushed and synced per entry, so a killed run still has every completed move
+        journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    try:
+        t0 = time.perf_counter()
+        made_dirs: set[str] = set()
+        for src, dst in plan.moves:
+            if is_cancelled and is_cancelled():
+                break
+            parent = os.path.dirname(dst)
+            try:
+                if parent not in made_dirs:
+                    os.makedirs(parent, exist_ok=True)
+                    made_dirs.add(parent)
+                _move(src, dst)
+            except OSError as e:
+                stats.errors.append((src, str(e)))
+                continue
+            stats.moved += 1
+            if journal:
+                record({"op": "move", "src": src, "dst": dst})
+            if on_move:
+                on_move(src, dst)
+        stats.move_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if not (is_cancelled and is_cancelled()):
+            for d in plan.dirs:
+                try:
+                    os.rmdir(d)
+                except OSError as e:
+                    if e.errno not in (errno.ENOTEMPTY, errno.EEXIST, errno.ENOENT):
+                        stats.errors.append((d, str(e)))
+                    continue
+                stats.removed_dirs += 1
+                if journal:
+                    record({"op": "rmdir", "path": d})
+        stats.rmdir_time = time.perf_counter() - t0
+    finally:
+        if journal:
+            journal.close()
+    return stats
+
+
+def undo_journal(journal_path: str) -> RelocationStats:
+    """Replay a journal backwards: recreate removed folders and move files back."""
+    stats = RelocationStats()
+    t0 = time.perf_counter()
+    with open(journal_path, "r", encoding="utf-8") as fh:
+        entries = [json.loads(line) for line in fh if line.strip()]
+    for entry in reversed(entries):
+        try:
+            if entry["op"] == "rmdir":
+                os.makedirs(entry["path"], exist_ok=True)
+                stats.removed_dirs += 1
+            elif entry["op"] == "move":
+                src, dst = entry["src"], entry["dst"]
+                if os.path.exists(src):
+                    raise OSError(errno.EEXIST, "original path is occupied", src)
+                os.makedirs(os.path.dirname(src), exist_ok=True)
+                _move(dst, src)
+                stats.moved += 1
+        except (OSError, KeyError) as e:
+            stats.errors.append((str(entry), str(e)))
+    stats.move_time = time.perf_counter() - t0
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "--undo":
+        print("用法: python relocation.py --undo <relocation_*.jsonl>")
+        sys.exit(1)
+    result = undo_journal(sys.argv[2])
+    print(f"restored {result.moved} files, {result.removed_dirs} folders")
+    for path, err in result.errors:
+        print(f"  FAILED {path}: {err}")
+    sys.exit(1 if result.errors else 0)
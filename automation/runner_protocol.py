@@ -0,0 +1,88 @@
+# automation/runner_protocol.py
+"""
+Line protocol for long-running ("serve") runners.
+
+A runner started with --stdin keeps its GUI application open and reads one
+file path per line from stdin; an empty line or EOF ends the session. Every
+line it prints is a log line, except the markers:
+
+    [READY]                      runner started, waiting for paths
+    [DONE] <path>                <path> finished
+    [FAILED] <path> :: <error>   <path> failed (runner keeps serving)
+    [HEARTBEAT] <note>           still making progress on the current file
+    [APP_PID] <pid>              pid of the GUI program the runner drives
+
+Parents send a path, then read lines until the [DONE]/[FAILED] marker that
+carries exactly that path (runners may print other "[DONE] ..." log lines).
+A watchdog treats every output line as activity; runners call heartbeat() at
+steps that print nothing. [APP_PID] lets the watchdog kill a hung GUI program
+together with its runner.
+"""
+from __future__ import annotations
+import sys
+import traceback
+
+READY = "[READY]"
+DONE = "[DONE]"
+FAILED = "[FAILED]"
+HEARTBEAT = "[HEARTBEAT]"
+APP_PID = "[APP_PID]"
+SEP = " :: "
+
+
+def emit(line: str):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def heartbeat(note: str = ""):
+    emit(f"{HEARTBEAT} {note}".rstrip())
+
+
+def announce_app_pid(pid):
+    if pid:
+        emit(f"{APP_PID} {pid}")
+
+
+def serve_stdin(process_one, stream=None):
+    """
+    Call process_one(path) for every path read from stdin and report a marker
+    for each. Exceptions are reported as [FAILED] and do not stop the loop.
+    Returns (done, failed) counts.
+    """
+    stream = stream or sys.stdin
+    done = failed = 0
+    emit(READY)
+    for raw in stream:
+        path = raw.strip()
+        if not path:
+            break
+        try:
+            process_one(path)
+        except Exception as e:
+            traceback.print_exc(file=sys.stdout)
+            emit(f"{FAILED} {path}{SEP}{e}".replace("\n", " "))
+            failed += 1
+        else:
+            emit(f"{DONE} {path}")
+            done += 1
+    return done, failed
+
+
+def parse_marker(line: str):
+    """
+    Return (kind, path, detail) for a marker line, else None. kind is one of
+    READY/DONE/FAILED/HEARTBEAT/APP_PID; for HEARTBEAT/APP_PID the note/pid is in detail.
+    """
+    line = line.strip()
+    if line == READY:
+        return READY, "", ""
+    for kind in (HEARTBEAT, APP_PID):
+        if line == kind or line.startswith(kind + " "):
+            return kind, "", line[len(kind):].strip()
+    if line.startswith(DONE + " "):
+        return DONE, line[len(DONE) + 1:], ""
+    if line.startswith(FAILED + " "):
+        path, _, detail = line[len(FAILED) + 1:].partition(SEP)
+        return FAILED, path, detail
+    return None
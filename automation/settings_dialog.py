@@ -95,6 +95,16 @@ DEFAULTS = {
     # New keys for Mixing Model
     "mixing_model_indices": [],       # indices into MODEL_OPTIONS (excluding index 0)
     "mixing_model_names": [],         # the saved names
+    # Batch / merge
+    "merge_workers": 0,               # merge process-pool size, 0 = one per CPU core
+    "merge_mode": "transplant",       # "transplant" (copy xlsx parts) | "rewrite" (pandas round trip)
+    "runner_workers": 1,              # StencilWizard/Soran runner processes, >1 = pool mode
+    "skip_completed": False,          # runners skip files already done in the job table
+    "job_db": "",                     # job table SQLite path, "" = automation/jobs.db
+    "file_timeout": 0,                # pool mode watchdog: seconds per file, 0 = off; >0 also enables pool mode
+    "heartbeat_timeout": 120,         # pool mode watchdog: seconds without runner output, 0 = off
+    "max_retries": 2,                 # pool mode: retries per failed/timed-out file
+    "retry_backoff": 5,               # pool mode: seconds before retry 1, doubled per retry
 }
 
 # ---------- Mixing Model Dialog ----------
@@ -143,7 +153,9 @@ class SettingsDialog(QDialog):
       stencil_exe, soran_exe,
       model, model_index (0-based), model_options (list of strings),
       desorption (bool), pp0, unit, min_pressure, max_pressure, smooth_factor,
-      mixing_model_indices, mixing_model_names (for index 0)
+      mixing_model_indices, mixing_model_names (for index 0),
+      merge_workers, merge_mode, runner_workers, skip_completed, job_db,
+      file_timeout, heartbeat_timeout, max_retries, retry_backoff
     """
 
     def __init__(self, parent: QWidget | None = None, settings_path: str | None = None):
@@ -263,6 +275,61 @@ class SettingsDialog(QDialog):
         dft_form.addRow(self.desorption_chk)
         dft_group.setLayout(dft_form)
 
+        # ===== Batch params =====
+        batch_group = QGroupBox("批处理")
+        batch_form = QFormLayout()
+
+        self.merge_workers_spin = QSpinBox()
+        self.merge_workers_spin.setRange(0, 64)
+        self.merge_workers_spin.setSpecialValueText("自动 (CPU 核数)")
+        self.merge_workers_spin.setValue(self._to_int(self.data.get("merge_workers", 0), 0))
+        batch_form.addRow(QLabel("合并并行进程数:"), self.merge_workers_spin)
+
+        self.merge_mode_combo = QComboBox()
+        self.merge_mode_combo.addItem("移植工作表 (保留原格式, 快)", "transplant")
+        self.merge_mode_combo.addItem("重写工作簿 (pandas)", "rewrite")
+        mode_idx = self.merge_mode_combo.findData(self.data.get("merge_mode", "transplant"))
+        self.merge_mode_combo.setCurrentIndex(max(mode_idx, 0))
+        batch_form.addRow(QLabel("合并方式:"), self.merge_mode_combo)
+
+        self.runner_workers_spin = QSpinBox()
+        self.runner_workers_spin.setRange(1, 16)
+        self.runner_workers_spin.setValue(self._to_int(self.data.get("runner_workers", 1), 1))
+        self.runner_workers_spin.setToolTip("大于 1 时以多个常驻进程分发文件 (需各进程使用独立的桌面会话/程序实例)")
+        batch_form.addRow(QLabel("外部程序进程数:"), self.runner_workers_spin)
+
+        self.skip_completed_chk = QCheckBox("重新运行时跳过已完成的文件")
+        self.skip_completed_chk.setChecked(bool(self.data.get("skip_completed", False)))
+        batch_form.addRow(self.skip_completed_chk)
+
+        self.file_timeout_spin = QSpinBox()
+        self.file_timeout_spin.setRange(0, 24 * 3600)
+        self.file_timeout_spin.setSuffix(" s")
+        self.file_timeout_spin.setValue(self._to_int(self.data.get("file_timeout", 0), 0))
+        self.file_timeout_spin.setToolTip("单个文件处理超过此时间则结束并重启外部程序进程, 0 = 不限制。\n"
+                                          "大于 0 时即使进程数为 1 也使用常驻进程池 (带重试)")
+        batch_form.addRow(QLabel("单文件超时:"), self.file_timeout_spin)
+
+        self.heartbeat_timeout_spin = QSpinBox()
+        self.heartbeat_timeout_spin.setRange(0, 24 * 3600)
+        self.heartbeat_timeout_spin.setSuffix(" s")
+        self.heartbeat_timeout_spin.setValue(self._to_int(self.data.get("heartbeat_timeout", 120), 120))
+        self.heartbeat_timeout_spin.setToolTip("进程无任何输出超过此时间视为卡死, 0 = 不检测")
+        batch_form.addRow(QLabel("心跳超时:"), self.heartbeat_timeout_spin)
+
+        self.max_retries_spin = QSpinBox()
+        self.max_retries_spin.setRange(0, 10)
+        self.max_retries_spin.setValue(self._to_int(self.data.get("max_retries", 2), 2))
+        batch_form.addRow(QLabel("失败重试次数:"), self.max_retries_spin)
+
+        self.retry_backoff_spin = QSpinBox()
+        self.retry_backoff_spin.setRange(0, 3600)
+        self.retry_backoff_spin.setSuffix(" s")
+        self.retry_backoff_spin.setValue(self._to_int(self.data.get("retry_backoff", 5), 5))
+        self.retry_backoff_spin.setToolTip("第 n 次重试前等待 间隔 × 2^(n-1) 秒")
+        batch_form.addRow(QLabel("重试间隔:"), self.retry_backoff_spin)
+        batch_group.setLayout(batch_form)
+
         # ===== Buttons =====
         buttons = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self._on_save)
@@ -273,6 +340,7 @@ class SettingsDialog(QDialog):
         main.addLayout(top_row)
         main.addWidget(exe_group)
         main.addWidget(dft_group, 1)
+        main.addWidget(batch_group)
         main.addWidget(buttons)
 
     # ---------- helpers ----------
@@ -481,6 +549,15 @@ class SettingsDialog(QDialog):
             # mixing selections (already updated when user closed the mixing dialog)
             "mixing_model_indices": self.data.get("mixing_model_indices", []),
             "mixing_model_names": self.data.get("mixing_model_names", []),
+            "merge_workers": self.merge_workers_spin.value(),
+            "merge_mode": self.merge_mode_combo.currentData(),
+            "runner_workers": self.runner_workers_spin.value(),
+            "skip_completed": self.skip_completed_chk.isChecked(),
+            "job_db": self.data.get("job_db", ""),
+            "file_timeout": self.file_timeout_spin.value(),
+            "heartbeat_timeout": self.heartbeat_timeout_spin.value(),
+            "max_retries": self.max_retries_spin.value(),
+            "retry_backoff": self.retry_backoff_spin.value(),
         })
 
         # Ensure directory exists
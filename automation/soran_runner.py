@@ -5,14 +5,18 @@ import pyperclip
 import time
 import sys, os, json
 import datetime
+from runner_protocol import announce_app_pid, heartbeat, serve_stdin
+from job_store import open_store, run_tracked
+from waits import wait_for_file, wait_until
 
 LOG_FILE = "soran_log.txt"
+POOL_LOG_FILE = "soran_log_{pid}.txt"   # --stdin: 每个常驻进程一个日志, 追加写入
 
 # ------------------ Logging Setup ------------------
 class TeeLogger:
-    def __init__(self, filepath):
+    def __init__(self, filepath, mode="w"):
         self.terminal = sys.__stdout__
-        self.log = open(filepath, "w", encoding="utf-8")
+        self.log = open(filepath, mode, encoding="utf-8")
 
     def write(self, message):
         self.terminal.write(message)
@@ -22,31 +26,24 @@ class TeeLogger:
         self.terminal.flush()
         self.log.flush()
 
-# Redirect stdout to both console and file
-sys.stdout = TeeLogger(LOG_FILE)
-
 # ------------------ Main Logic ------------------
 def find_mixed_model_win(timeout=10):
     """Find the top-level 'Mixed Model' dialog (class #32770) from the desktop."""
-    end = time.time() + timeout
-    last_err = None
-    while time.time() < end:
-        try:
-            # Fast path: exact title + class (Win32 dialog)
-            hwnds = findwindows.find_windows(title_re='Mixed Model')
-            if hwnds:
-                return Desktop(backend="win32").window(handle=hwnds[0])
-        except Exception as e:
-            last_err = e
+    def lookup():
+        # Fast path: exact title + class (Win32 dialog)
+        hwnds = findwindows.find_windows(title_re='Mixed Model')
+        if hwnds:
+            return Desktop(backend="win32").window(handle=hwnds[0])
         # Fallback: fuzzy title search across all top-level windows
-        try:
-            win = Desktop(backend="win32").window(title_re=r".*Mixed\s*Model.*")
-            if win.exists() and win.is_visible():
-                return win
-        except Exception as e:
-            last_err = e
-        time.sleep(0.2)
-    raise RuntimeError(f"Could not find top-level 'Mixed Model' dialog. Last error: {last_err}")
+        win = Desktop(backend="win32").window(title_re=r".*Mixed\s*Model.*")
+        if win.exists() and win.is_visible():
+            return win
+        return None
+
+    found = wait_until(lookup, timeout=timeout, label="Mixed Model dialog")
+    if not found:
+        raise RuntimeError("Could not find top-level 'Mixed Model' dialog.")
+    return found.value
 
 def fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params):
     """
@@ -74,7 +71,6 @@ def fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params):
     model_index = int(params.get("model_index", 0))
     print(f"[DEBUG] 选择模型索引: {model_index}")
     analyze_dlg.child_window(title="N2 in Carbon Slit pore at 77K", class_name="ComboBox").select(model_index)
-    time.sleep(1)
 
     if model_index == 0:
         print("[DEBUG] Waiting for top-level 'Mixed Model' dialog…")
@@ -152,11 +148,13 @@ def fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params):
                 break
     except Exception as e:
         print("[WARN] Smooth Factor未找到或无法填写：", e)
-    print("Wait 3s for data importing")
     send_keys("{ENTER}")
-    time.sleep(1)
+    # 分析完成: Analyze Pore Size 窗口关闭, 主窗口恢复可用
+    wait_until(lambda: not analyze_dlg.exists(timeout=0) and main_win.is_enabled(),
+               timeout=60, label="Soran analysis")
 
     # 8. Export CSV File
+    heartbeat("export csv")
     csv_offset_x = 1357 - 1098
     csv_offset_y = 177 - 109
     csv_width_analysis = 1385 - 1357
@@ -165,10 +163,15 @@ def fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params):
     win_left, win_top = win_rect.left, win_rect.top
     csv_center_x = win_left + csv_offset_x + csv_width_analysis // 2
     csv_center_y = win_top + csv_offset_y + csv_height_analysis // 2
+    # 只接受此刻之后写入的结果 (文件夹里可能有上次/上一轮重试留下的同名 csv)
+    export_started = time.time()
     click(coords=(csv_center_x, csv_center_y))
-    print("窗口隐藏后文件存储")
-    time.sleep(1)
-    
+    save_dlg = Desktop(backend="win32").window(class_name="#32770", process=main_win.process_id())
+    if not wait_until(lambda: save_dlg.exists(timeout=0) and save_dlg.is_visible(),
+                      timeout=15, label="Save dialog"):
+        raise RuntimeError("导出 CSV 的保存对话框未出现")
+    save_dlg.set_focus()
+
     if model_index == 0:
         forced_name = f"{txt_path}_mixed_model.csv"
         print(forced_name)
@@ -185,9 +188,10 @@ def fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params):
         pyperclip.copy(forced_name)
         send_keys("^v")
         print(f"[DEBUG] Mixed model save name forced to: {forced_name}")
-        time.sleep(3)
+        wait_until(lambda: any(e.window_text() == forced_name for e in save_dlg.descendants(class_name="Edit")),
+                   timeout=5, label="file name typed")
         send_keys("%S")
-        time.sleep(0.5)
+        wait_until(lambda: not save_dlg.exists(timeout=0), timeout=10, label="Save dialog closed")
     else:
         send_keys("%D")
         folder = os.path.normpath(txt_path)
@@ -195,16 +199,16 @@ def fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params):
         send_keys("^v")
         send_keys("{ENTER}")
 
-    # 9. Check output CSV exists
+    # 9. Check output CSV exists (and has finished writing)
     expected_dir = os.path.dirname(txt_path)
-    expected_file = os.path.join(expected_dir, "DFT Result.csv")
-    for _ in range(10):
-        if os.path.exists(expected_file):
-            print(f"[OK] 结果文件已生成: {expected_file}")
-            break
-        time.sleep(0.5)
+    if model_index == 0:
+        expected_file = f"{txt_path}_mixed_model.csv"
     else:
-        print(f"[WARN] 未检测到输出文件: {expected_file}")
+        expected_file = os.path.join(expected_dir, "DFT Result.csv")
+    # 抛出异常, run_tracked 记为 failed, 常驻池会重试该文件
+    if not wait_for_file(expected_file, timeout=15, stable_for=0.3, label="DFT csv", newer_than=export_started):
+        raise FileNotFoundError(f"未检测到输出文件: {expected_file}")
+    print(f"[OK] 结果文件已生成: {expected_file}")
 
     print(f"[DONE] 文件处理完成: {txt_path}")
 
@@ -243,7 +247,7 @@ def process_one_file_dft(txt_path, app, params):
 
     print("Find Window:", analyze_dlg.window_text())
     fill_analyze_dlg_params(main_win, analyze_dlg, txt_path, params)
-    time.sleep(1)
+    wait_until(lambda: main_win.is_enabled(), timeout=10, label="Soran ready")
 
 
 def batch_process(filelist_txt, params):
@@ -258,24 +262,62 @@ def batch_process(filelist_txt, params):
         file_paths = [line.strip() for line in f if line.strip()]
 
     print(f"[DFT] 共收到 {len(file_paths)} 个文件待处理。")
+    store = open_store(params)
+    skip_completed = bool(params.get("skip_completed", False))
     for txt_path in file_paths:
         txt_path = os.path.normpath(txt_path)
         print(f"\n==== 处理文件: {txt_path} ====")
         try:
-            process_one_file_dft(txt_path, app, params)
+            run_tracked(store, txt_path, "soran",
+                        lambda: process_one_file_dft(txt_path, app, params), skip_completed)
         except Exception as e:
             print(f"[DFT ERROR] {txt_path}: {e}")
         time.sleep(0.1)
 
     print("[DFT] 全部文件处理完毕。")
+    for line in store.format_report(store.run_id):
+        print(line)
+    store.close()
     app.kill()
 
 
+def serve_stdin_mode(params):
+    """--stdin 模式: Soran 常驻, 从 stdin 逐行读取 .txt 路径 (见 runner_protocol.py)。"""
+    soran_exe = params["soran_exe"]
+    print(f"[启动 Soran 应用]: {soran_exe}")
+    app = Application(backend="win32").start(soran_exe)
+    announce_app_pid(getattr(app, "process", None))
+    store = open_store(params)
+    skip_completed = bool(params.get("skip_completed", False))
+
+    def process_one(txt_path):
+        txt_path = os.path.normpath(txt_path)
+        run_tracked(store, txt_path, "soran",
+                    lambda: process_one_file_dft(txt_path, app, params), skip_completed)
+
+    try:
+        serve_stdin(process_one)
+    finally:
+        store.close()
+        app.kill()
+
+
 if __name__ == "__main__":
+    # 常驻模式: python soran_runner.py --stdin <设置.json>
+    if len(sys.argv) == 3 and sys.argv[1] == "--stdin":
+        # 并行的 worker 不能共用 (并截断) 同一个日志文件
+        sys.stdout = TeeLogger(POOL_LOG_FILE.format(pid=os.getpid()), "a")
+        with open(sys.argv[2], "r", encoding="utf-8") as f:
+            serve_stdin_mode(json.load(f))
+        sys.exit(0)
+
     if len(sys.argv) != 3:
         print("用法: python main_soran_runner.py <文件清单.txt> <设置.json>")
         sys.exit(1)
 
+    # Redirect stdout to both console and file
+    sys.stdout = TeeLogger(LOG_FILE)
+
     filelist_txt = sys.argv[1]
     params_json = sys.argv[2]
 
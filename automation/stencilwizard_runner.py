@@ -8,6 +8,9 @@ from pywinauto.keyboard import send_keys
 import pyperclip
 import os
 import sys
+from runner_protocol import announce_app_pid, heartbeat, serve_stdin
+from job_store import open_store, run_tracked
+from waits import dialog_shows_folder, wait_for_file, wait_until
 
 def load_settings(settings_path="settings.json"):
     if os.path.exists(settings_path):
@@ -21,8 +24,7 @@ def process_one_file(folder, fname):
     main_win = app.window(title_re=".*StencilWizard.*")
 
     main_win.wait("visible")
-
-    time.sleep(1) 
+    wait_until(lambda: main_win.is_enabled(), timeout=10, label="StencilWizard ready")
     # time.sleep(5)
     send_keys("%F")
     send_keys("{ENTER}")
@@ -41,7 +43,7 @@ def process_one_file(folder, fname):
     pyperclip.copy(path)
     send_keys('^v'  )
     send_keys("{ENTER}")
-    time.sleep(0.1)
+    wait_until(lambda: dialog_shows_folder(file_dlg, folder), timeout=10, label="open folder")
 
     for edit in file_dlg.children(class_name="Edit"):
         if edit.is_visible() and edit.is_enabled():
@@ -69,6 +71,7 @@ def process_one_file(folder, fname):
     list_box = dlg.child_window(control_type="List")
     list_items = list_box.children(control_type="ListItem")
 
+    heartbeat("设置报告")
     for item in list_items:
         item.select()  # 或 item.click_input()
         print("已选中：", item.window_text())
@@ -87,7 +90,7 @@ def process_one_file(folder, fname):
 # 点击确定
     ok_btn = dlg.child_window(title="确定", control_type="Button")
     ok_btn.click()
-    time.sleep(1)
+    wait_until(lambda: not shezhi_dlg.exists(), timeout=10, label="设置报告 closed")
 
     send_keys("%F")
     send_keys('^s')
@@ -119,6 +122,8 @@ def process_one_file(folder, fname):
     else:
         print("未找到可输入的文本框！")
 
+    # 只接受此刻之后写入的 .txt (可能有上次运行留下的同名文件)
+    export_started = time.time()
     main_win.child_window(title="保存当前文件", class_name="ExGraphControls").click()
     time.sleep(0.1)
     save_dlg = app.window(title_re="输入一个文件名")
@@ -133,7 +138,7 @@ def process_one_file(folder, fname):
     pyperclip.copy(folder)
     send_keys('^v')   # 你的文件夹路径   # 你的文件夹路径
     send_keys('{ENTER}')           # 回车，跳转到目标文件夹
-    time.sleep(1)
+    wait_until(lambda: dialog_shows_folder(save_dlg, folder), timeout=10, label="save folder")
 
     for edit in save_dlg.children(class_name="Edit"):
         if edit.is_visible() and edit.is_enabled():
@@ -155,33 +160,72 @@ def process_one_file(folder, fname):
     time.sleep(0.1)
     close_btn = main_win.child_window(title_re="关闭.*", class_name="ExGraphControls")
     time.sleep(0.1)
+    # Soran 读取的 .txt 写完后再关闭当前文件
+    txt_out = os.path.join(folder, fname_out + ".txt")
+    written = wait_for_file(txt_out, timeout=20, stable_for=0.3, label="stencil txt", newer_than=export_started)
     close_btn.click_input()
     print("已点击当前文件的关闭按钮。")
     time.sleep(0.1)
     send_keys('N')
-    time.sleep(1)
-
-def batch_process(filelist_path, app):
+    wait_until(lambda: not main_win.child_window(title_re="关闭.*", class_name="ExGraphControls").exists(),
+               timeout=5, label="file closed")
+    # 抛出异常, run_tracked 记为 failed, 常驻池会重试该文件
+    if not written:
+        raise FileNotFoundError(f"未检测到输出文件: {txt_out}")
+
+def batch_process(filelist_path, app, params=None):
+    params = params or {}
     with open(filelist_path, "r", encoding="utf-8") as f:
         file_paths = [line.strip() for line in f if line.strip()]
     print(file_paths)
+    store = open_store(params)
+    skip_completed = bool(params.get("skip_completed", False))
     for _, path in enumerate(file_paths):
         folder = os.path.dirname(path)
         fname = os.path.basename(path)
         print(f"Processing {fname} in {folder}")
         try:
-            process_one_file(folder, fname)
+            run_tracked(store, path, "stencil", lambda: process_one_file(folder, fname), skip_completed)
         except Exception as e:
             print(f"[ERROR] {fname}: {e}")
         time.sleep(0.2)
-    time.sleep(1)
     print(f"全部文件处理完毕，共 {len(file_paths)} 个文件。")
+    for line in store.format_report(store.run_id):
+        print(line)
+    store.close()
     print("准备关闭 StencilWizard ...")
     app.kill()
     print("已调用 app.kill()，请观察任务管理器是否已无进程")
 
 
+def serve_stdin_mode(params_json):
+    """--stdin 模式: StencilWizard 常驻, 从 stdin 逐行读取 .iPrd 路径 (见 runner_protocol.py)。"""
+    global app
+    params = load_settings(params_json)
+    stencil_exe = os.path.normpath(params.get("stencil_exe", ""))
+    if not stencil_exe or not os.path.exists(stencil_exe):
+        raise FileNotFoundError(f"指定的 StencilWizard 路径不存在: {stencil_exe}")
+    print(f"启动 StencilWizard: {stencil_exe}")
+    app = Application(backend="win32").start(stencil_exe)
+    announce_app_pid(getattr(app, "process", None))
+    wait_until(lambda: app.window(title_re=".*StencilWizard.*").is_visible(), timeout=30, label="StencilWizard started")
+    store = open_store(params)
+    skip_completed = bool(params.get("skip_completed", False))
+    try:
+        serve_stdin(lambda path: run_tracked(
+            store, path, "stencil",
+            lambda: process_one_file(os.path.dirname(path), os.path.basename(path)), skip_completed))
+    finally:
+        store.close()
+        app.kill()
+        print("已调用 app.kill()")
+
+
 if __name__ == "__main__":
+    # 常驻模式: python stencilwizard_runner.py --stdin <params.json>
+    if len(sys.argv) == 3 and sys.argv[1] == "--stdin":
+        serve_stdin_mode(sys.argv[2])
+        sys.exit(0)
     # 参数1: 文件清单txt，参数2: 参数json
     if len(sys.argv) < 3:
         print("用法: python batch_stencilwizard_app.py <filelist.txt> <params.json>")
@@ -194,8 +238,8 @@ if __name__ == "__main__":
         raise FileNotFoundError(f"指定的 StencilWizard 路径不存在: {stencil_exe}")
     print(f"启动 StencilWizard: {stencil_exe}")
     app = Application(backend="win32").start(stencil_exe)
-    time.sleep(1)
-    batch_process(filelist_txt, app)  # 你的自动化主循环
+    wait_until(lambda: app.window(title_re=".*StencilWizard.*").is_visible(), timeout=30, label="StencilWizard started")
+    batch_process(filelist_txt, app, params)  # 你的自动化主循环
 
 
 
@@ -0,0 +1,148 @@
+# automation/test_runners.py
+"""
+Tests for the runner plumbing that does not need Windows: waits.py (inotify
+and polling paths) and ExternalProcessManager.start_pool driving
+dummy_runner.py.
+
+    python -m pytest automation/test_runners.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# the automation modules import each other flat (from waits import ...)
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import waits
+from waits import wait_for_file, wait_until
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def watch_mode(request, monkeypatch, tmp_path):
+    if request.param == "polling":
+        monkeypatch.setattr(waits, "_open_watch", lambda folder: None)
+    else:
+        watch = waits._open_watch(str(tmp_path))
+        if watch is None:
+            pytest.skip("inotify not available")
+        watch.close()
+    return request.param
+
+
+def _write_slowly(path, chunks: int, interval: float):
+    for _ in range(chunks):
+        with open(path, "ab") as fh:
+            fh.write(b"x" * 100)
+        time.sleep(interval)
+
+
+def test_wait_for_file_waits_until_stable(tmp_path, watch_mode):
+    path = str(tmp_path / "out.txt")
+    writer = threading.Thread(target=_write_slowly, args=(path, 5, 0.1))
+    t0 = time.perf_counter()
+    writer.start()
+    res = wait_for_file(path, timeout=5, stable_for=0.3)
+    writer.join()
+    assert res.ok
+    assert res.value == 500                      # not returned while still growing
+    assert time.perf_counter() - t0 >= 0.4 + 0.3
+
+
+def test_wait_for_file_existing_file_without_stability(tmp_path, watch_mode):
+    path = tmp_path / "out.txt"
+    path.write_text("done")
+    res = wait_for_file(str(path), timeout=1, stable_for=0)
+    assert res.ok and res.value == 4 and res.elapsed < 0.5
+
+
+def test_wait_for_file_times_out(tmp_path, watch_mode):
+    res = wait_for_file(str(tmp_path / "missing.txt"), timeout=0.3)
+    assert not res.ok
+    assert 0.3 <= res.elapsed < 1.0
+
+
+def test_wait_for_file_ignores_stale_output(tmp_path, watch_mode):
+    path = tmp_path / "out.txt"
+    path.write_text("old run")
+    old = time.time() - 60
+    os.utime(path, (old, old))
+    t0 = time.time()
+    assert not wait_for_file(str(path), timeout=0.3, stable_for=0, newer_than=t0)
+
+    threading.Timer(0.1, path.write_text, args=("new run",)).start()
+    res = wait_for_file(str(path), timeout=3, stable_for=0.1, newer_than=t0)
+    assert res.ok and res.value == len("new run")
+
+
+def test_wait_until_returns_value():
+    calls = []
+
+    def predicate():
+        calls.append(1)
+        return len(calls) if len(calls) >= 3 else 0
+
+    res = wait_until(predicate, timeout=2, initial=0.01)
+    assert res.ok and res.value == 3
+
+
+def test_wait_until_treats_exceptions_as_false_and_times_out():
+    def predicate():
+        raise RuntimeError("window not there yet")
+
+    res = wait_until(predicate, timeout=0.2, initial=0.01)
+    assert not res.ok
+    assert 0.2 <= res.elapsed < 0.7
+
+
+# ---------------- pool mode ----------------
+def _run_pool(tmp_path, names, settings: dict, workers: int, extra_args: list, timeout_ms: int = 30000):
+    QtCore = pytest.importorskip("PySide6.QtCore")
+    from external_process_manager import ExternalProcessManager
+
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])   # noqa: F841 (kept alive)
+    files = [str(tmp_path / name) for name in names]
+    for path in files:
+        open(path, "w").close()
+    filelist = tmp_path / "filelist.txt"
+    filelist.write_text("\n".join(files) + "\n", encoding="utf-8")
+    settings_path = tmp_path / "settings.json"
+    settings_path.write_text(json.dumps(settings), encoding="utf-8")
+
+    mgr = ExternalProcessManager()
+    results, log = {}, []
+    mgr.file_finished.connect(lambda path, error: results.__setitem__(path, error))
+    mgr.log_updated.connect(log.append)
+    loop = QtCore.QEventLoop()
+    mgr.finished.connect(loop.quit)
+    QtCore.QTimer.singleShot(timeout_ms, loop.quit)
+    mgr.start_pool(str(filelist), str(settings_path), os.path.join(HERE, "dummy_runner.py"),
+                   workers=workers, extra_args=extra_args)
+    loop.exec()
+    return files, results, mgr, log
+
+
+def test_start_pool_processes_every_file(tmp_path):
+    names = [f"s{k}.iPrd" for k in range(5)]
+    files, results, mgr, log = _run_pool(tmp_path, names, {"heartbeat_timeout": 30, "max_retries": 0},
+                                         workers=2, extra_args=["--stage", "stencil"])
+    assert results == {path: "" for path in files}, log
+    assert not mgr.failures
+    assert all(os.path.exists(path[:-len(".iPrd")] + ".txt") for path in files)
+    assert sum(s["done"] for s in mgr.pool) == len(files)
+
+
+def test_start_pool_retries_then_reports_failure(tmp_path):
+    # one runner, every 2nd file fails: a ok, b fails, c ok, b (retry) fails again
+    files, results, mgr, log = _run_pool(tmp_path, ["a.iPrd", "b.iPrd", "c.iPrd"],
+                                         {"heartbeat_timeout": 30, "max_retries": 1, "retry_backoff": 0},
+                                         workers=1, extra_args=["--stage", "stencil", "--fail-every", "2"])
+    a, b, c = files
+    assert results[a] == "" and results[c] == ""
+    assert results[b], log
+    assert mgr.failures[b][0] == 2                # first attempt + one retry
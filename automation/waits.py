@@ -0,0 +1,198 @@
+# automation/waits.py
+"""
+Event-driven waits for the GUI runners, replacing fixed time.sleep() calls.
+
+    wait_until(predicate, timeout, label=...)        generic condition
+    wait_for_file(path, timeout, stable_for=0.5)     file exists and stopped growing
+    wait_for_file(path, ..., newer_than=t0)          ... and was written at/after t0 (time.time())
+    dialog_shows_folder(dlg, folder)                 predicate: a file dialog navigated to folder
+
+Both return a WaitResult (ok, elapsed, value) and print one "[WAIT]" line with
+the time actually waited, so the runner logs show where a batch spends time.
+
+File waits use inotify (Linux, via ctypes) on the parent folder and fall back
+to polling with an adaptive backoff (fast at first, then up to max_interval)
+everywhere else, e.g. on Windows where the runners are used.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+
+@dataclass
+class WaitResult:
+    ok: bool
+    elapsed: float
+    value: object = None
+
+    def __bool__(self):
+        return self.ok
+
+
+def _report(label: str | None, result: WaitResult, timeout: float):
+    if label:
+        state = "ok" if result.ok else f"TIMEOUT ({timeout:g}s)"
+        print(f"[WAIT] {label}: {result.elapsed:.2f}s {state}", flush=True)
+
+
+def _backoff(initial: float, max_interval: float, factor: float = 1.5):
+    interval = initial
+    while True:
+        yield interval
+        interval = min(interval * factor, max_interval)
+
+
+def wait_until(predicate, timeout: float = 10.0, initial: float = 0.02, max_interval: float = 0.5,
+               label: str | None = None) -> WaitResult:
+    """Poll predicate() with adaptive backoff until it returns truthy or timeout expires."""
+    t0 = time.perf_counter()
+    deadline = t0 + timeout
+    delays = _backoff(initial, max_interval)
+    result = WaitResult(False, 0.0)
+    while True:
+        try:
+            value = predicate()
+        except Exception:
+            value = None
+        if value:
+            result = WaitResult(True, time.perf_counter() - t0, value)
+            break
+        now = time.perf_counter()
+        if now >= deadline:
+            result = WaitResult(False, now - t0)
+            break
+        time.sleep(min(next(delays), deadline - now))
+    _report(label, result, timeout)
+    return result
+
+
+def dialog_shows_folder(dlg, folder: str) -> bool:
+    """
+    True once a Windows file dialog's address bar (a ToolbarWindow32 whose text
+    is "Address: <path>" / "地址: <path>") shows `folder`; use with wait_until
+    after typing a path into the address bar.
+    """
+    want = os.path.normcase(os.path.normpath(folder))
+    for bar in dlg.descendants(class_name="ToolbarWindow32"):
+        _, sep, shown = bar.window_text().partition(": ")
+        if sep and os.path.normcase(os.path.normpath(shown.strip())) == want:
+            return True
+    return False
+
+
+# ---------------- inotify (Linux) ----------------
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+# file mtimes come from a coarser clock than time.time(); allow this much (s) for newer_than
+MTIME_SLACK = 0.02
+
+
+class _Inotify:
+    """Minimal inotify watch on one folder; events() yields changed file names."""
+
+    def __init__(self, folder: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MOVED_TO | IN_MODIFY | IN_CLOSE_WRITE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def events(self, timeout: float) -> list[str]:
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0.0))
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names, i = [], 0
+        while i + _EVENT.size <= len(buf):
+            _, _, _, length = _EVENT.unpack_from(buf, i)
+            raw = buf[i + _EVENT.size:i + _EVENT.size + length]
+            names.append(os.fsdecode(raw.rstrip(b"\0")))
+            i += _EVENT.size + length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _open_watch(folder: str):
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify(folder)
+    except (OSError, AttributeError):
+        return None
+
+
+def _stat_sig(path: str, min_mtime_ns: int = 0):
+    """(size, mtime_ns), or None if the file is missing or older than min_mtime_ns."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if st.st_mtime_ns < min_mtime_ns:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def wait_for_file(path: str, timeout: float = 10.0, stable_for: float = 0.5,
+                  initial: float = 0.02, max_interval: float = 0.5,
+                  label: str | None = None, newer_than: float | None = None) -> WaitResult:
+    """
+    Wait until `path` exists and its size/mtime have not changed for
+    `stable_for` seconds (0 = existence is enough). value is the final size.
+    With newer_than (a time.time() stamp taken before triggering the write), a
+    file whose mtime is older counts as missing, so leftovers from an earlier
+    attempt or run are not mistaken for the new output.
+    """
+    min_mtime_ns = int((newer_than - MTIME_SLACK) * 1e9) if newer_than is not None else 0
+    t0 = time.perf_counter()
+    deadline = t0 + timeout
+    folder = os.path.dirname(os.path.abspath(path))
+    watch = _open_watch(folder) if os.path.isdir(folder) else None
+    delays = _backoff(initial, max_interval)
+    result = None
+    try:
+        last_sig = _stat_sig(path, min_mtime_ns)
+        stable_since = time.perf_counter() if last_sig else None
+        while result is None:
+            now = time.perf_counter()
+            if last_sig and now - stable_since >= stable_for:
+                result = WaitResult(True, now - t0, last_sig[0])
+                break
+            if now >= deadline:
+                result = WaitResult(False, now - t0)
+                break
+            # sleep until the next event / poll tick, never past the stability point
+            step = deadline - now
+            if last_sig:
+                step = min(step, stable_for - (now - stable_since))
+            if watch is not None:
+                watch.events(step)
+            else:
+                time.sleep(min(next(delays), step))
+            sig = _stat_sig(path, min_mtime_ns)
+            if sig != last_sig:
+                last_sig = sig
+                stable_since = time.perf_counter() if sig else None
+    finally:
+        if watch is not None:
+            watch.close()
+    _report(label, result, timeout)
+    return result
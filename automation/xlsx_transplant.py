@@ -0,0 +1,205 @@
+# automation/xlsx_transplant.py
+"""
+Zip-level sheet transplant for .xlsx packages.
+
+Instead of round-tripping the instrument workbook through pandas/openpyxl, the
+merged file is built by copying every part of the source package unchanged
+(no XML parsing, original formatting kept) and adding one new worksheet part:
+
+    xl/worksheets/sheetN.xml          new part, cells written as inline strings / numbers
+    xl/workbook.xml                   + <sheet name=... sheetId=... r:id=...>
+    xl/_rels/workbook.xml.rels        + <Relationship Id=... Target="worksheets/sheetN.xml">
+    [Content_Types].xml               + <Override PartName="/xl/worksheets/sheetN.xml" ...>
+    xl/styles.xml                     + one percent <xf> (only if a percent cell exists)
+
+Only these four small XML parts are edited, with plain string insertion. All
+other parts are copied as their compressed bytes (local header + data, no
+inflate/deflate), so merge cost is dominated by the CSV, not by the workbook
+size. Parts using a data descriptor or zip64 sizes are re-compressed instead.
+Raises TransplantError when the package layout is not understood; callers
+fall back to the pandas rewrite.
+"""
+from __future__ import annotations
+from xml.sax.saxutils import escape, quoteattr
+import copy
+import os
+import posixpath
+import re
+import struct
+import zipfile
+
+from openpyxl.utils import get_column_letter
+
+from dft_csv import DftTable
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WORKSHEET_TYPE = NS_REL + "/worksheet"
+WORKSHEET_CT = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+PERCENT_NUMFMT_ID = 10   # built-in "0.00%"
+
+# characters not allowed in XML 1.0
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class TransplantError(Exception):
+    pass
+
+
+def _read_text(zin: zipfile.ZipFile, name: str) -> str:
+    try:
+        return zin.read(name).decode("utf-8")
+    except KeyError:
+        raise TransplantError(f"missing part: {name}")
+
+
+def _office_document_part(zin: zipfile.ZipFile) -> str:
+    rels = _read_text(zin, "_rels/.rels")
+    for m in re.finditer(r"<Relationship\b[^>]*>", rels):
+        tag = m.group(0)
+        if re.search(r'Type="[^"]*/officeDocument"', tag):
+            target = re.search(r'Target="([^"]+)"', tag)
+            if target:
+                return target.group(1).lstrip("/")
+    raise TransplantError("no officeDocument relationship")
+
+
+def _copy_raw(src, info: zipfile.ZipInfo, zout: zipfile.ZipFile) -> bool:
+    """
+    Append info's local header and compressed data from the source file object to
+    zout unchanged. Returns False (nothing written) when the entry has a data
+    descriptor or zip64 sizes; the caller then re-compresses it.
+    """
+    if info.flag_bits & 0x08 or max(info.compress_size, info.file_size, info.header_offset) >= 0xFFFFFFFF:
+        return False
+    src.seek(info.header_offset)
+    header = src.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise TransplantError(f"bad local header: {info.filename}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    blob = header + src.read(name_len + extra_len + info.compress_size)
+    out = copy.copy(info)
+    out.header_offset = zout.fp.tell()
+    zout.fp.write(blob)
+    zout.start_dir = zout.fp.tell()
+    zout.filelist.append(out)
+    zout.NameToInfo[out.filename] = out
+    return True
+
+
+def _rels_path(part: str) -> str:
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def _insert_before(xml: str, closing_tag: str, fragment: str) -> str:
+    idx = xml.rfind(closing_tag)
+    if idx < 0:
+        raise TransplantError(f"{closing_tag} not found")
+    return xml[:idx] + fragment + xml[idx:]
+
+
+def _add_percent_style(styles: str) -> tuple[str, int]:
+    """Append a 0.00% cell format to <cellXfs>; return (new xml, style index)."""
+    m = re.search(r"<cellXfs\b[^>]*>(.*?)</cellXfs>", styles, re.S)
+    if not m:
+        raise TransplantError("styles.xml has no cellXfs")
+    count = len(re.findall(r"<xf\b", m.group(1)))
+    xf = f'<xf numFmtId="{PERCENT_NUMFMT_ID}" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    body = m.group(0).replace("</cellXfs>", xf + "</cellXfs>")
+    body = re.sub(r'(<cellXfs\b[^>]*?)\s+count="\d+"', r"\1", body, count=1)
+    body = body.replace("<cellXfs", f'<cellXfs count="{count + 1}"', 1)
+    return styles[:m.start()] + body + styles[m.end():], count
+
+
+def _cell_xml(ref: str, value, style: int | None) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value != value or value in (float("inf"), float("-inf")):
+            return ""
+        s = f' s="{style}"' if style is not None else ""
+        return f'<c r="{ref}"{s}><v>{value!r}</v></c>'
+    text = _ILLEGAL_XML.sub("", str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def sheet_xml(table: DftTable, percent_style: int | None) -> str:
+    width = max((len(r) for r in table.rows), default=0)
+    letters = [get_column_letter(i + 1) for i in range(width)]
+    out = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{NS_MAIN}"><sheetData>']
+    for r_idx, row in enumerate(table.rows):
+        n = r_idx + 1
+        cells = "".join(
+            _cell_xml(f"{letters[c_idx]}{n}", val,
+                      percent_style if table.percent[r_idx, c_idx] else None)
+            for c_idx, val in enumerate(row))
+        if cells:
+            out.append(f'<row r="{n}">{cells}</row>')
+    out.append("</sheetData></worksheet>")
+    return "".join(out)
+
+
+def transplant_sheet(src_xlsx: str, dst_xlsx: str, sheet_name: str, table: DftTable):
+    """Write dst_xlsx = src_xlsx + one new worksheet named sheet_name holding `table`."""
+    tmp = dst_xlsx + ".tmp"
+    try:
+        with zipfile.ZipFile(src_xlsx) as zin:
+            names = set(zin.namelist())
+            wb_part = _office_document_part(zin)
+            wb_dir = posixpath.dirname(wb_part)
+            wb_rels_part = _rels_path(wb_part)
+
+            workbook = _read_text(zin, wb_part)
+            wb_rels = _read_text(zin, wb_rels_part)
+            content_types = _read_text(zin, "[Content_Types].xml")
+
+            # the r: prefix the workbook binds to the relationships namespace
+            pm = re.search(r'xmlns:(\w+)="' + re.escape(NS_REL) + '"', workbook)
+            if not pm:
+                raise TransplantError("workbook.xml has no relationships namespace")
+            r_prefix = pm.group(1)
+            existing = re.findall(r'<sheet\b[^>]*\bname="([^"]*)"', workbook)
+            if sheet_name.lower() in (n.lower() for n in existing):
+                raise TransplantError(f"sheet {sheet_name!r} already exists")
+
+            sheet_ids = [int(x) for x in re.findall(r'<sheet\b[^>]*\bsheetId="(\d+)"', workbook)]
+            rel_ids = [int(x) for x in re.findall(r'\bId="rId(\d+)"', wb_rels)]
+            sheet_id = max(sheet_ids, default=0) + 1
+            rel_id = f"rId{max(rel_ids, default=0) + 1}"
+            n = 1
+            while posixpath.join(wb_dir, f"worksheets/sheet{n}.xml") in names:
+                n += 1
+            new_part = posixpath.join(wb_dir, f"worksheets/sheet{n}.xml")
+
+            edited = {
+                wb_part: _insert_before(
+                    workbook, "</sheets>",
+                    f'<sheet name={quoteattr(sheet_name)} sheetId="{sheet_id}" {r_prefix}:id="{rel_id}"/>'),
+                wb_rels_part: _insert_before(
+                    wb_rels, "</Relationships>",
+                    f'<Relationship Id="{rel_id}" Type="{WORKSHEET_TYPE}" Target="worksheets/sheet{n}.xml"/>'),
+                "[Content_Types].xml": _insert_before(
+                    content_types, "</Types>",
+                    f'<Override PartName="/{new_part}" ContentType="{WORKSHEET_CT}"/>'),
+            }
+
+            percent_style = None
+            if table.percent.any():
+                styles_part = posixpath.join(wb_dir, "styles.xml")
+                edited[styles_part], percent_style = _add_percent_style(_read_text(zin, styles_part))
+
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zout, open(src_xlsx, "rb") as raw:
+                for info in zin.infolist():
+                    if info.filename in edited:
+                        zout.writestr(info, edited[info.filename].encode("utf-8"))
+                    elif not _copy_raw(raw, info, zout):
+                        zout.writestr(info, zin.read(info.filename))
+                zout.writestr(new_part, sheet_xml(table, percent_style).encode("utf-8"))
+        os.replace(tmp, dst_xlsx)
+    except (zipfile.BadZipFile, UnicodeDecodeError) as e:
+        raise TransplantError(str(e))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,305 @@
+# controller/analysis_tools.py
+# Native analysis engines (analysis/*) run from the LeftPanel context menu.
+# Each job runs in a QThread with its own DB connection, like ImportWorker.
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from PySide6.QtWidgets import QFileDialog, QMessageBox
+import time
+import traceback
+
+from analysis import bet, bjh, iast, isosteric, isotherm_grid, iupac, micropore, model_fit, psd_cluster, psd_inversion, similarity
+from analysis.isotherm_data import load_isotherms, sample_ids
+from view.iast_dialog import IastResultDialog
+from view.isosteric_heat_dialog import IsostericHeatDialog
+from view.similar_samples_dialog import SimilarSamplesDialog
+
+
+class AnalysisWorker(QObject):
+    progress = Signal(str)
+    finished = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, model, job):
+        """job(conn, report) -> result; report(str) posts a status line."""
+        super().__init__()
+        self.model = model
+        self.job = job
+
+    def run(self):
+        conn = self.model.get_thread_connection()
+        try:
+            result = self.job(conn, self.progress.emit)
+            conn.commit()
+        except Exception as e:
+            print(traceback.format_exc())
+            self.error.emit(str(e))
+            result = None
+        finally:
+            conn.close()
+        self.finished.emit(result)
+
+
+class AnalysisToolsManager(QObject):
+    analysis_finished = Signal(str)    # job title
+
+    def __init__(self, model, view):
+        super().__init__()
+        self.model = model
+        self.view = view
+        self.worker = None
+        self.thread = None
+        self._job = None
+        self._similarity = None      # (db_path, SimilarityIndex), rebuilt when the DB changes
+
+    # ---------------- job plumbing ----------------
+    def _start(self, title, job, on_done=None):
+        if self.thread and self.thread.isRunning():
+            QMessageBox.information(self.view, title, "Another analysis is still running.")
+            return
+        self.view.left_panel.set_status(f"{title} …")
+        self._job = (title, on_done, time.perf_counter())
+
+        self.worker = AnalysisWorker(self.model, job)
+        self.thread = QThread(self.view)
+        self.worker.moveToThread(self.thread)
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.view.left_panel.set_status)
+        # bound slots (not lambdas) so they run in the GUI thread
+        self.worker.error.connect(self._on_error)
+        self.worker.finished.connect(self._on_finished)
+        self.worker.finished.connect(self.thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.thread.finished.connect(self.thread.deleteLater)
+        self.thread.start()
+
+    @Slot(str)
+    def _on_error(self, msg):
+        QMessageBox.critical(self.view, self._job[0], msg)
+
+    @Slot(object)
+    def _on_finished(self, result):
+        title, on_done, t0 = self._job
+        self.worker = None
+        self.thread = None
+        if result is None:
+            self.view.left_panel.set_status(f"{title} failed")
+            return
+        self.view.left_panel.set_status(f"{title} done in {time.perf_counter() - t0:.1f}s")
+        if on_done:
+            on_done(result)
+        self.analysis_finished.emit(title)
+
+    # ---------------- PSD inversion ----------------
+    def run_psd_inversion(self, sample_names):
+        kernel_path, _ = QFileDialog.getOpenFileName(
+            self.view, "Select DFT kernel", "", "Kernel files (*.csv *.npz);;All Files (*)")
+        if not kernel_path:
+            return
+        try:
+            kernel = psd_inversion.load_kernel(kernel_path)
+        except Exception as e:
+            QMessageBox.critical(self.view, "PSD Inversion", f"Cannot read kernel:\n{e}")
+            return
+        settings = psd_inversion.load_settings()
+
+        def job(conn, report):
+            batch = load_isotherms(conn, sample_names)
+            report(f"Inverting {len(batch)} isotherms with {kernel.name} …")
+            result = psd_inversion.invert(batch, kernel, settings)
+            written = psd_inversion.write_psd(self.model, conn, result, kernel.name)
+            skipped = [n for n, r in zip(result.names, result.residual) if r != r]
+            return written, skipped
+
+        def done(result):
+            written, skipped = result
+            msg = f"PSD written for {written} sample(s) with kernel '{kernel.name}'."
+            if skipped:
+                msg += (f"\n\nNo isotherm points in {settings.get('min_pressure')}–"
+                        f"{settings.get('max_pressure')} P/P0 for:\n" + "\n".join(skipped[:20]))
+            QMessageBox.information(self.view, "PSD Inversion", msg)
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("PSD inversion", job, done)
+
+    # ---------------- BET ----------------
+    def run_bet(self, sample_names):
+        def job(conn, report):
+            report(f"BET for {len(sample_names)} samples …")
+            result = bet.run(conn, sample_names)
+            bet.write_bet(conn, result)
+            return result
+
+        def done(result):
+            ok = result.ok()
+            lines = [f"{name}: {area:.1f} m²/g (C = {c:.0f}, {lo:.3g}–{hi:.3g} P/P0)"
+                     for name, area, c, lo, hi in zip(result.names, result.area, result.c, result.p_lo, result.p_hi)
+                     if area == area]
+            msg = f"BET written for {int(ok.sum())} of {len(ok)} sample(s).\n\n" + "\n".join(lines[:20])
+            failed = [n for n, good in zip(result.names, ok) if not good]
+            if failed:
+                msg += "\n\nNo range met the Rouquerol criteria for:\n" + "\n".join(failed[:20])
+            QMessageBox.information(self.view, "BET", msg)
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("BET", job, done)
+
+    # ---------------- t-plot / αs ----------------
+    def run_micropore(self, sample_names, settings):
+        """sample_names=None runs over the whole database."""
+        def job(conn, report):
+            result = micropore.run(conn, sample_names, settings, report)
+            micropore.write_micropore(conn, result, settings)
+            return result
+
+        def done(result):
+            rows = [f"{name}: Vmicro {r[micropore.RESULT_T_VMICRO]:.4f} cc/g, "
+                    f"Sext {r[micropore.RESULT_T_EXT]:.1f} m²/g (t); "
+                    f"Vmicro {r[micropore.RESULT_A_VMICRO]:.4f} cc/g, Sext {r[micropore.RESULT_A_EXT]:.1f} m²/g (αs)"
+                    for name, r in zip(result.names, result.values)]
+            QMessageBox.information(self.view, "t-Plot / αs",
+                                    f"{len(rows)} sample(s), {settings.describe()}\n\n" + "\n".join(rows[:20]))
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("t-Plot / αs", job, done)
+
+    # ---------------- BJH ----------------
+    def run_bjh(self, sample_names):
+        def job(conn, report):
+            result = bjh.run(conn, sample_names, report=report)
+            bjh.write_bjh(conn, result)
+            return result
+
+        def done(result):
+            rows = []
+            for name, r in zip(result.names, result.values):
+                parts = [f"{b}: {r[b]['area']:.1f} m²/g, {r[b]['volume']:.4f} cc/g, mode {r[b]['mode']:.2f} nm"
+                         for b in bjh.BRANCHES if r[b]["area"] == r[b]["area"]]
+                rows.append(f"{name}: " + ("; ".join(parts) or "no data above 1.7 nm"))
+            QMessageBox.information(self.view, "BJH",
+                                    f"{len(rows)} sample(s), {result.cached} from cache\n\n" + "\n".join(rows[:20]))
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("BJH", job, done)
+
+    # ---------------- isotherm model fits ----------------
+    def run_model_fit(self, sample_names, settings=None):
+        settings = settings or model_fit.FitSettings()
+
+        def job(conn, report):
+            result = model_fit.run(conn, sample_names, settings, report)
+            model_fit.write_fits(conn, result)
+            return result
+
+        def done(result):
+            QMessageBox.information(self.view, "Isotherm Model Fits",
+                                    f"{len(result.ids)} sample(s), {result.cached} from cache\n\n"
+                                    + "\n".join(model_fit.summary(result)))
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("Isotherm model fits", job, done)
+
+    # ---------------- common P/P0 grid ----------------
+    def backfill_isotherm_grid(self, force=False):
+        def job(conn, report):
+            return isotherm_grid.backfill(conn, force, report)
+
+        def done(written):
+            QMessageBox.information(self.view, "Isotherm Grid",
+                                    f"{written} sample(s) resampled onto the {isotherm_grid.GRID_SIZE}-point "
+                                    f"P/P0 grid ({isotherm_grid.P_MIN:g}–{isotherm_grid.P_MAX:g}).")
+
+        self._start("Isotherm grid backfill", job, done)
+
+    # ---------------- similarity search ----------------
+    def find_similar(self, sample_name, mode="isotherm", k=10):
+        cached = self._similarity if self._similarity and self._similarity[0] == self.model.db_path else None
+
+        def job(conn, report):
+            index = cached[1] if cached else None
+            if index is None or index.signature != similarity.index_signature(conn):
+                report("Building similarity index …")
+                index = similarity.build_index(conn, report)
+            ids, _ = sample_ids(conn, [sample_name])
+            if not len(ids):
+                raise KeyError(f"No sample named '{sample_name}'")
+            return index, int(ids[0])
+
+        def done(result):
+            index, sid = result
+            self._similarity = (self.model.db_path, index)
+            SimilarSamplesDialog(self.model, index, sid, sample_name, {sid: sample_name},
+                                 mode, k, parent=self.view).exec()
+
+        self._start("Similarity search", job, done)
+
+    # ---------------- PSD clustering ----------------
+    def run_psd_cluster(self, k=8, method="kmeans", weight=0.5):
+        def job(conn, report):
+            result = psd_cluster.run(conn, k, method, weight, report)
+            psd_cluster.write_clusters(conn, result)
+            return result
+
+        def done(result):
+            sizes = "\n".join(f"C{c}: {n} sample(s)" for c, n in enumerate(result.sizes, 1))
+            QMessageBox.information(self.view, "Cluster by PSD",
+                                    f"{len(result.ids)} sample(s) labelled with '{psd_cluster.RESULT_CLUSTER}' "
+                                    f"({result.method}, C1 = smallest pores).\n\n{sizes}")
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("PSD clustering", job, done)
+
+    # ---------------- IUPAC classification ----------------
+    def run_iupac(self, sample_names=None):
+        """sample_names=None classifies the whole database."""
+        def job(conn, report):
+            result = iupac.run(conn, sample_names, report)
+            iupac.write_iupac(conn, result)
+            return result
+
+        def done(result):
+            types, loops = result.counts()
+            unclassified = len(result.ids) - sum(types.values())
+            msg = (f"{sum(types.values())} sample(s) classified"
+                   + (f", {unclassified} without a usable adsorption branch" if unclassified else "") + ".\n\n"
+                   + "Type: " + ", ".join(f"{k} {v}" for k, v in sorted(types.items())) + "\n"
+                   + "Hysteresis: " + ", ".join(f"{k} {v}" for k, v in sorted(loops.items())))
+            QMessageBox.information(self.view, "IUPAC Classification", msg)
+            self.view.left_panel.refresh_sample_table()
+
+        self._start("IUPAC classification", job, done)
+
+    # ---------------- isosteric heat ----------------
+    def run_isosteric(self, sample_names=None):
+        """Materials of the given samples (whole database if None), each with all its samples."""
+        def job(conn, report):
+            result = isosteric.run(conn, sample_names, report=report)
+            isosteric.write_isosteric(conn, result)
+            return result
+
+        def done(result):
+            if not result.groups:
+                reasons = "\n".join(f"{m}: {why}" for m, why in list(result.skipped.items())[:20])
+                QMessageBox.information(self.view, "Isosteric Heat",
+                                        "No material has isotherms at two or more analysis temperatures "
+                                        "(sample_info field such as 分析温度[K]).\n\n" + reasons)
+                return
+            self.view.left_panel.refresh_sample_table()
+            IsostericHeatDialog(result, parent=self.view).exec()
+
+        self._start("Isosteric heat", job, done)
+
+    # ---------------- IAST ----------------
+    def run_iast(self, sample_names, settings):
+        """Materials of the given samples (whole database if None)."""
+        def job(conn, report):
+            return iast.run(conn, settings, sample_names, report)
+
+        def done(result):
+            if not len(result):
+                reasons = "\n".join(f"{m}: {why}" for m, why in list(result.skipped.items())[:20])
+                QMessageBox.information(self.view, "IAST",
+                                        f"No material has usable {settings.gas1} and {settings.gas2} isotherms "
+                                        f"at the same temperature.\n\n" + reasons)
+                return
+            IastResultDialog(self.model, result, parent=self.view).exec()
+
+        self._start("IAST", job, done)
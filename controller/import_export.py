@@ -167,10 +167,10 @@
 # import_export.py
 from PySide6.QtCore import QObject, QThread, Signal
 from PySide6.QtWidgets import QFileDialog, QMessageBox
-from pathlib import Path
-import os, time
+import os, re, time
 
 from view.process_dialog import ProcessDialog
+from analysis import bet, bjh, micropore
 
 import pandas as pd   # used by SampleExporter
 import numpy as np    # used by SampleExporter
@@ -282,8 +282,9 @@ class ImportExportManager(QObject):
         else:
             filepaths = files
 
-        # normalize, de-dup, stable order
-        filepaths = sorted({str(Path(p).resolve()) for p in filepaths})
+        # normalize, de-dup (case-insensitive on Windows), stable order; abspath/normcase need no
+        # per-file filesystem round-trip, unlike Path.resolve(), but do not resolve symlinks
+        filepaths = sorted({os.path.normcase(p): p for p in map(os.path.abspath, filepaths)}.values())
         if not filepaths:
             return
 
@@ -424,6 +425,12 @@ class SampleExporter:
         "BJH解吸最可几孔径[nm]": "D48",
         "HK最可几孔径[nm]": "D49",
     }
+    # vendor field -> result stored by the analysis engines, exported when the vendor value is absent
+    CALC_FALLBACKS = {
+        "多点BET比表面积[m^2/g]": bet.RESULT_AREA,
+        **{field: bjh.result_name(b, q) for (b, q), field in bjh.VENDOR_FIELDS.items()},
+        **{field: name for name, field in micropore.VENDOR_FIELDS.items()},
+    }
 
     def __init__(self, model, parent_widget=None):
         """
@@ -433,13 +440,14 @@ class SampleExporter:
         self.model = model
         self.parent_widget = parent_widget
 
-    def export(self, path, sample_names, summary_fields=None, excel_cell_map=None):
+    def export(self, path, sample_names, summary_fields=None, excel_cell_map=None, extra_sheets=None):
         """
         导出样品到Excel文件
         :param path: 保存路径
         :param sample_names: 样品内部唯一标识列表
         :param summary_fields: 统计汇总字段列表，默认取 EXCEL_CELL_MAP 所有字段
         :param excel_cell_map: 字段到单元格映射，默认 EXCEL_CELL_MAP
+        :param extra_sheets: 附加表格 {sheet名: (表头, 行列表)}，例如 IAST 结果
         """
         if summary_fields is None:
             summary_fields = list(self.EXCEL_CELL_MAP.keys())
@@ -456,6 +464,8 @@ class SampleExporter:
                 self._write_sample_sheet(wb, name, sheets)
 
             self._write_summary_sheet(wb, sheets, summary_fields, excel_cell_map)
+            for title, (headers, rows) in (extra_sheets or {}).items():
+                self._write_table_sheet(wb, title, headers, rows)
             wb.save(path)
 
             QMessageBox.information(self.parent_widget, "导出完成", f"成功导出 {len(sample_names)} 个样品到：\n{path}")
@@ -531,10 +541,11 @@ class SampleExporter:
         imgP.anchor = "F1"
         ws.add_image(imgP)
 
+        header_row = 30
         sample_info = info
         result_summary = self.model.get_sample_results(sample_name)
         info_items = list(sample_info.items())
-        res_items = list(result_summary.items())
+        res_items = self._result_items(result_summary, header_row + 1)
 
         n_ads = len(ads)
         n_des = len(des)
@@ -557,7 +568,6 @@ class SampleExporter:
         n_res = len(res_items)
         total_rows = max(n_info, n_res, n_iso, n_psd)
 
-        header_row = 30
         headers = [
             "Field", "Value",
             "Field", "Value",
@@ -598,6 +608,37 @@ class SampleExporter:
         for col_idx, width in col_widths.items():
             ws.column_dimensions[get_column_letter(col_idx)].width = width
 
+    def _result_items(self, results, first_row):
+        """
+        Field/value rows for columns C/D. The summary reads EXCEL_CELL_MAP cells by position, so a vendor
+        result block keeps its order and only its empty fields take the computed (calc) value; a sample
+        without vendor results gets the calc values laid out on the mapped rows instead.
+        """
+        def blank(v):
+            return v is None or str(v).strip() == ""
+
+        slots = {int(addr[1:]) - first_row: field for field, addr in self.EXCEL_CELL_MAP.items()
+                 if addr.startswith("D")}
+        fallback = {field: results.get(calc) for field, calc in self.CALC_FALLBACKS.items()
+                    if not blank(results.get(calc))}
+        if any(field in results for field in slots.values()):
+            return [(k, fallback.get(k, v) if blank(v) else v) for k, v in results.items()]
+        if not fallback:
+            return list(results.items())
+        items = [(slots.get(i, ""), fallback.get(slots.get(i))) for i in range(max(slots) + 1)]
+        return items + list(results.items())
+
+    def _write_table_sheet(self, wb, title, headers, rows):
+        ws = wb.create_sheet(title=re.sub(r"[\\/*?:\[\]]", "_", title)[:31])
+        ws.append(list(headers))
+        for cell in ws[1]:
+            cell.font = Font(bold=True)
+        for row in rows:
+            ws.append(list(row))
+        for col_idx in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = 16
+        ws.freeze_panes = "A2"
+
     def _write_summary_sheet(self, wb, sheets, summary_fields, excel_cell_map):
         all_data = []
         for sheetname in sheets:
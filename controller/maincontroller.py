@@ -1,12 +1,17 @@
 # controller/main_controller.py
-from PySide6.QtWidgets import QMessageBox, QFileDialog
+from PySide6.QtWidgets import QMessageBox, QFileDialog, QDialog
 from controller.sample_manager import SampleManager
 from controller.db_manager import DBManager
 from controller.import_export import ImportExportManager, SampleExporter
 from controller.trace_sample import TraceController
+from controller.analysis_tools import AnalysisToolsManager
 from view.export_excel_dialog import FieldSelectDialog
 from view.comparison_plot_dialog import ComparisonPlotDialog
 from view.skip_subfolders_dialog import SkipSubfoldersDialog
+from view.micropore_dialog import MicroporeDialog
+from view.cluster_dialog import ClusterDialog
+from view.iast_dialog import IastDialog
+from analysis import iast
 import sqlite3
 
 
@@ -28,6 +33,7 @@ class MainController:
         self.import_manager = ImportExportManager(model)
         self.import_manager.import_error.connect(self.on_import_error)
         self.import_manager.import_finished.connect(self.on_import_finished)
+        self.analysis_manager = AnalysisToolsManager(self.model, self.view)
     
     def select_database(self, db_path=None):
         print(f"MainController.select_database called, db_path={db_path}")
@@ -245,3 +251,72 @@ class MainController:
         # open the dual-panel comparison plot dialog
         dlg = ComparisonPlotDialog(self.model, names, parent=self.view)
         dlg.exec()
+
+    # Analysis (native engines)
+    def _selected_or_warn(self, title):
+        names = self.left_panel.get_selected_sample_names()
+        if not names:
+            QMessageBox.information(self.view, title, "No samples selected.")
+        return names
+
+    def run_psd_inversion(self):
+        names = self._selected_or_warn("PSD Inversion")
+        if names:
+            self.analysis_manager.run_psd_inversion(names)
+
+    def run_bet(self):
+        names = self._selected_or_warn("BET")
+        if names:
+            self.analysis_manager.run_bet(names)
+
+    def run_micropore(self):
+        names = self.left_panel.get_selected_sample_names()
+        all_names = [r[0] for r in self.model.conn.execute("SELECT name FROM samples ORDER BY name")]
+        dlg = MicroporeDialog(all_names, len(names), parent=self.view)
+        if dlg.exec() != QDialog.Accepted:
+            return
+        if dlg.whole_db.isChecked():
+            names = None
+        elif not names:
+            QMessageBox.information(self.view, "t-Plot / αs", "No samples selected.")
+            return
+        self.analysis_manager.run_micropore(names, dlg.settings())
+
+    def run_bjh(self):
+        names = self._selected_or_warn("BJH")
+        if names:
+            self.analysis_manager.run_bjh(names)
+
+    def run_model_fit(self):
+        names = self._selected_or_warn("Isotherm Model Fits")
+        if names:
+            self.analysis_manager.run_model_fit(names)
+
+    def backfill_isotherm_grid(self):
+        self.analysis_manager.backfill_isotherm_grid()
+
+    def find_similar_samples(self):
+        names = self._selected_or_warn("Find Similar Samples")
+        if names:
+            self.analysis_manager.find_similar(names[0])
+
+    def run_isosteric(self):
+        names = self._selected_or_warn("Isosteric Heat")
+        if names:
+            self.analysis_manager.run_isosteric(names)
+
+    def run_iast(self):
+        names = self._selected_or_warn("IAST")
+        if not names:
+            return
+        dlg = IastDialog(iast.adsorbates(self.model.conn, names), parent=self.view)
+        if dlg.exec() == QDialog.Accepted:
+            self.analysis_manager.run_iast(names, dlg.settings())
+
+    def run_iupac(self):
+        self.analysis_manager.run_iupac()
+
+    def run_psd_cluster(self):
+        dlg = ClusterDialog(parent=self.view)
+        if dlg.exec() == QDialog.Accepted:
+            self.analysis_manager.run_psd_cluster(*dlg.values())
@@ -15,7 +15,8 @@ import math
 class TraceModel:
     def __init__(self, rows):
         self.rows = rows
-        self._categorical_fields = ["样品名称", "吸附质", "检测员", "Probe molecule"]
+        self._categorical_fields = ["样品名称", "吸附质", "检测员", "Probe molecule", "PSD Cluster",
+                                   "IUPAC Type", "Hysteresis Type"]
 
     def get_rows(self):
         return self.rows
@@ -5,6 +5,8 @@ import json
 from datetime import datetime
 import pandas as pd
 
+from analysis import cache, isotherm_grid, iupac, similarity
+
 class DatabaseModel:
     def __init__(self, db_path="adsorption.db"):
         self.db_path = db_path
@@ -107,6 +109,12 @@ class DatabaseModel:
                 FOREIGN KEY(sample_id) REFERENCES samples(id)
             )
         """)
+        cache.ensure_table(self.conn)
+        # label lookups / filters (IUPAC Type, PSD Cluster, …) by name and value
+        c.execute("CREATE INDEX IF NOT EXISTS idx_sample_results_name_value "
+                  "ON sample_results(result_name, result_value)")
+        isotherm_grid.ensure_table(self.conn)
+        similarity.ensure_psd_table(self.conn)
         self.conn.commit()
 
     def get_sample_overview(self):
@@ -365,7 +373,7 @@ class DatabaseModel:
         # 删除相关表数据
         for table in [
             "sample_info", "sample_results", "adsorption_data",
-            "pore_distribution", "dft_data"
+            "pore_distribution", "dft_data", "analysis_cache", "isotherm_grid", "psd_grid"
         ]:
             print(f"Deleting from {table} sample_id={sample_id}")
             c.execute(f"DELETE FROM {table} WHERE sample_id = ?", (sample_id,))
@@ -633,7 +641,13 @@ class DatabaseModel:
         self._ingest_dft_list(sid, dft_list, conn=conn)
         self._ingest_pore_distribution_from_dft(sid, dft_list, conn=conn)
 
-        # 8) Commit all changes
+        # 8) Resample both branches onto the common P/P0 grid
+        isotherm_grid.ingest_samples(conn, [name])
+
+        # 9) IUPAC isotherm / hysteresis labels
+        iupac.ingest_samples(conn, [name])
+
+        # 10) Commit all changes
         conn.commit()
 
         return name
@@ -0,0 +1,38 @@
+# view/cluster_dialog.py
+from PySide6.QtWidgets import QDialog, QFormLayout, QComboBox, QSpinBox, QDoubleSpinBox, QDialogButtonBox
+
+from analysis.psd_cluster import METHODS
+
+
+class ClusterDialog(QDialog):
+    """Settings for PSD clustering over the whole database."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Cluster by PSD")
+        form = QFormLayout(self)
+
+        self.method = QComboBox()
+        self.method.addItems(METHODS)
+        form.addRow("Method", self.method)
+
+        self.k = QSpinBox()
+        self.k.setRange(2, 100)
+        self.k.setValue(8)
+        form.addRow("Clusters (k)", self.k)
+
+        self.weight = QDoubleSpinBox()
+        self.weight.setRange(0.0, 1.0)
+        self.weight.setSingleStep(0.1)
+        self.weight.setValue(0.5)
+        self.weight.setToolTip("Share of the PSD curve vs the pore-range percentages")
+        form.addRow("PSD curve weight", self.weight)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    def values(self):
+        """(k, method, weight)"""
+        return self.k.value(), self.method.currentText(), self.weight.value()
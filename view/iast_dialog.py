@@ -0,0 +1,157 @@
+# view/iast_dialog.py
+import numpy as np
+from PySide6.QtWidgets import (
+    QDialog, QFormLayout, QComboBox, QDoubleSpinBox, QSpinBox, QDialogButtonBox, QHBoxLayout, QVBoxLayout,
+    QTableWidget, QTableWidgetItem, QHeaderView, QLabel, QPushButton, QFileDialog
+)
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+
+from analysis.iast import MODELS, IastSettings
+from controller.import_export import SampleExporter
+
+
+class IastDialog(QDialog):
+    """Gas pair, pure-component model and grid for an IAST screening run."""
+
+    def __init__(self, gases: list[str], parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("IAST Binary Mixture")
+        form = QFormLayout(self)
+
+        self.gas1, self.gas2 = QComboBox(), QComboBox()
+        for cb in (self.gas1, self.gas2):
+            cb.setEditable(True)
+            cb.addItems(gases)
+        if len(gases) > 1:
+            self.gas2.setCurrentIndex(1)
+        form.addRow("Gas 1", self.gas1)
+        form.addRow("Gas 2", self.gas2)
+
+        self.model = QComboBox()
+        self.model.addItems(MODELS)
+        form.addRow("Pure-component model", self.model)
+
+        defaults = IastSettings("", "")
+        self.p_min = self._spin(defaults.p_min)
+        self.p_max = self._spin(defaults.p_max)
+        form.addRow("P min", self.p_min)
+        form.addRow("P max", self.p_max)
+        self.n_p = QSpinBox()
+        self.n_p.setRange(2, 200)
+        self.n_p.setValue(defaults.n_pressure)
+        form.addRow("Pressure points", self.n_p)
+        self.n_y = QSpinBox()
+        self.n_y.setRange(3, 101)
+        self.n_y.setValue(defaults.n_composition)
+        form.addRow("Composition points", self.n_y)
+        form.addRow(QLabel("P is in the units of the samples' saturation-pressure field,\n"
+                           "or relative to the instrument P0 when there is none."))
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    @staticmethod
+    def _spin(value):
+        sb = QDoubleSpinBox()
+        sb.setDecimals(4)
+        sb.setRange(1e-4, 1e5)
+        sb.setValue(value)
+        return sb
+
+    def settings(self) -> IastSettings:
+        return IastSettings(self.gas1.currentText(), self.gas2.currentText(), self.model.currentText(),
+                            self.p_min.value(), self.p_max.value(), self.n_p.value(), self.n_y.value())
+
+
+class IastResultDialog(QDialog):
+    """Sorbents ranked by selectivity; loadings of the selected one; Excel export."""
+
+    def __init__(self, model, result, parent=None):
+        super().__init__(parent)
+        s = result.settings
+        self.setWindowTitle(f"IAST {s.gas1}/{s.gas2} ({s.model})")
+        self.resize(1000, 560)
+        self.model = model
+        self.result = result
+        self.order = result.ranking()
+        j = int(np.abs(result.y1 - 0.5).argmin())
+        S = result.selectivity[:, j, -1]
+
+        lay = QHBoxLayout(self)
+        left = QVBoxLayout()
+        left.addWidget(QLabel(f"{len(result)} sorbent(s), S at y1 = 0.5, P = {result.pressure[-1]:g}"
+                              + (f"; {len(result.skipped)} skipped" if result.skipped else "")))
+        self.table = QTableWidget(len(self.order), 4)
+        self.table.setHorizontalHeaderLabels(["Material", "T [K]", f"S {s.gas1}/{s.gas2}", "min R²"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        for r, i in enumerate(self.order):
+            t = result.temperatures[i]
+            for c, text in enumerate((result.materials[i], "" if t != t else f"{t:g}",
+                                      f"{S[i]:.3g}", f"{np.nanmin(result.r2[i]):.4f}")):
+                self.table.setItem(r, c, QTableWidgetItem(text))
+        left.addWidget(self.table, 1)
+
+        self.pressure = QComboBox()
+        self.pressure.addItems([f"{p:.4g}" for p in result.pressure])
+        self.pressure.setCurrentIndex(len(result.pressure) - 1)
+        row = QHBoxLayout()
+        row.addWidget(QLabel("P"))
+        row.addWidget(self.pressure, 1)
+        left.addLayout(row)
+
+        btns = QHBoxLayout()
+        export_btn = QPushButton("Export to Excel…")
+        export_btn.clicked.connect(self._export)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        btns.addStretch(1)
+        btns.addWidget(export_btn)
+        btns.addWidget(close_btn)
+        left.addLayout(btns)
+        lay.addLayout(left, 1)
+
+        fig = Figure(figsize=(6, 4))
+        self.ax = fig.add_subplot(111)
+        self.canvas = FigureCanvas(fig)
+        lay.addWidget(self.canvas, 2)
+
+        self.table.itemSelectionChanged.connect(self.redraw)
+        self.pressure.currentIndexChanged.connect(self.redraw)
+        if len(self.order):
+            self.table.selectRow(0)
+        self.redraw()
+
+    def _current(self):
+        rows = self.table.selectionModel().selectedRows()
+        return self.order[rows[0].row()] if rows else None
+
+    def redraw(self):
+        self.ax.clear()
+        i = self._current()
+        s = self.result.settings
+        if i is not None:
+            b = self.pressure.currentIndex()
+            y = self.result.y1
+            self.ax.plot(y, self.result.q1[i, :, b], marker="o", markersize=3, label=f"q {s.gas1}")
+            self.ax.plot(y, self.result.q2[i, :, b], marker="s", markersize=3, label=f"q {s.gas2}")
+            self.ax.plot(y, self.result.q1[i, :, b] + self.result.q2[i, :, b], linestyle="--", label="total")
+            self.ax.set_title(f"{self.result.materials[i]}, P = {self.result.pressure[b]:.4g}")
+            self.ax.legend(fontsize=8)
+        self.ax.set_xlabel(f"y {s.gas1} (gas phase)")
+        self.ax.set_ylabel("Loading [cc(STP)/g]")
+        self.ax.figure.tight_layout()
+        self.canvas.draw()
+
+    def _export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export IAST", filter="Excel Files (*.xlsx)")
+        if not path:
+            return
+        names = [n for pair in (self.result.names[i] for i in self.order) for n in pair]
+        SampleExporter(self.model, parent_widget=self).export(path, names, extra_sheets=self.result.sheets())
@@ -0,0 +1,57 @@
+# view/isosteric_heat_dialog.py
+from PySide6.QtWidgets import (
+    QDialog, QHBoxLayout, QVBoxLayout, QListWidget, QAbstractItemView, QLabel, QPushButton
+)
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+
+MAX_DEFAULT = 8
+
+
+class IsostericHeatDialog(QDialog):
+    """Qst vs loading for the materials of an IsostericResult; plots the selected ones."""
+
+    def __init__(self, result, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Isosteric Heat of Adsorption")
+        self.resize(900, 520)
+        self.groups = result.groups
+
+        lay = QHBoxLayout(self)
+        left = QVBoxLayout()
+        left.addWidget(QLabel(f"{len(self.groups)} material(s)"))
+        self.list = QListWidget()
+        self.list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        for g in self.groups:
+            low, _ = g.summary()
+            temps = "/".join(f"{t:g}" for t in sorted(set(round(t, 1) for t in g.temperatures)))
+            self.list.addItem(f"{g.material} ({g.adsorbate}) · {temps} K · {low:.1f} kJ/mol")
+        left.addWidget(self.list, 1)
+        if result.skipped:
+            left.addWidget(QLabel(f"{len(result.skipped)} material(s) skipped (fewer than two temperatures)"))
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        left.addWidget(close_btn)
+        lay.addLayout(left, 1)
+
+        fig = Figure(figsize=(6, 4))
+        self.ax = fig.add_subplot(111)
+        self.canvas = FigureCanvas(fig)
+        lay.addWidget(self.canvas, 2)
+
+        self.list.itemSelectionChanged.connect(self.redraw)
+        for r in range(min(MAX_DEFAULT, len(self.groups))):
+            self.list.item(r).setSelected(True)
+        self.redraw()
+
+    def redraw(self):
+        self.ax.clear()
+        for r in sorted(self.list.row(i) for i in self.list.selectedItems()):
+            g = self.groups[r]
+            self.ax.plot(g.loading, g.qst, marker="o", markersize=3, label=f"{g.material} ({g.adsorbate})")
+        self.ax.set_xlabel("Loading [cc(STP)/g]")
+        self.ax.set_ylabel("Qst [kJ/mol]")
+        if self.ax.lines:
+            self.ax.legend(fontsize=8)
+        self.ax.figure.tight_layout()
+        self.canvas.draw()
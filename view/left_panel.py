@@ -5,6 +5,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, Signal
 from view.skip_subfolders_dialog import SkipSubfoldersDialog
 from automation.external_view import ExternalWindow
+# same module object the automation package imports (flat), so the scan snapshots are shared
+from file_discovery import DiscoveryRules, discover_files
 import os
 from pathlib import Path
 
@@ -342,6 +344,19 @@ class LeftPanel(QWidget):
         paste_action = menu.addAction("Paste")
         menu.addSeparator()
         plot_action = menu.addAction("Plot")
+        analysis_menu = menu.addMenu("Analysis")
+        psd_action = analysis_menu.addAction("PSD Inversion (kernel)…")
+        bet_action = analysis_menu.addAction("BET (Rouquerol)")
+        micropore_action = analysis_menu.addAction("t-Plot / αs…")
+        bjh_action = analysis_menu.addAction("BJH (ads + des)")
+        fit_action = analysis_menu.addAction("Fit Isotherm Models")
+        isosteric_action = analysis_menu.addAction("Isosteric Heat (by material)…")
+        iast_action = analysis_menu.addAction("IAST Binary Mixture…")
+        similar_action = analysis_menu.addAction("Find Similar Samples…")
+        cluster_action = analysis_menu.addAction("Cluster by PSD (whole DB)…")
+        iupac_action = analysis_menu.addAction("Classify Isotherms (whole DB)")
+        analysis_menu.addSeparator()
+        grid_action = analysis_menu.addAction("Rebuild Isotherm Grid (whole DB)")
 
         action = menu.exec(self.sample_table.viewport().mapToGlobal(pos))
         if action == copy_action:
@@ -352,6 +367,28 @@ class LeftPanel(QWidget):
             self.controller.paste_samples()
         elif action == plot_action:
             self.controller.plot_samples()
+        elif action == psd_action:
+            self.controller.run_psd_inversion()
+        elif action == bet_action:
+            self.controller.run_bet()
+        elif action == micropore_action:
+            self.controller.run_micropore()
+        elif action == bjh_action:
+            self.controller.run_bjh()
+        elif action == fit_action:
+            self.controller.run_model_fit()
+        elif action == isosteric_action:
+            self.controller.run_isosteric()
+        elif action == iast_action:
+            self.controller.run_iast()
+        elif action == similar_action:
+            self.controller.find_similar_samples()
+        elif action == cluster_action:
+            self.controller.run_psd_cluster()
+        elif action == iupac_action:
+            self.controller.run_iupac()
+        elif action == grid_action:
+            self.controller.backfill_isotherm_grid()
     
     def get_selected_sample_names(self) -> list[str]:
         selected_rows = self.sample_table.selectionModel().selectedRows()
@@ -391,22 +428,18 @@ class LeftPanel(QWidget):
             return
         skip_first_level = set(dlg.skipped())  # names of first-level dirs to skip
 
-        exts = {".xlsx", ".xlsm", ".xls"}
-        files: list[str] = []
-
-        # recurse; prune skipped subfolders at the TOP level
-        for dirpath, dirnames, filenames in os.walk(root_path):
-            # if we are at the root level, remove skipped folder names from traversal
-            if Path(dirpath) == root_path:
-                dirnames[:] = [d for d in dirnames if d not in skip_first_level]
-            # ignore hidden/lock/temp items anywhere
-            dirnames[:] = [d for d in dirnames if not d.startswith(".") and not d.startswith("~$")]
-            for fn in filenames:
-                if fn.startswith("~$") or fn.startswith("._"):
-                    continue
-                p = Path(dirpath) / fn
-                if p.suffix.lower() in exts:
-                    files.append(str(p.resolve()))
+        # one parallel scandir pass; skipped first-level folders are pruned,
+        # hidden/lock/temp items are ignored anywhere
+        rules = DiscoveryRules(
+            extensions={".xlsx", ".xlsm", ".xls"},
+            ignore_prefixes=("~$", "._"),
+            exclude_dirs=skip_first_level,
+            skip_hidden_dirs=True,
+        )
+        # resolve the root once instead of every file
+        found = discover_files(str(root_path.resolve()), rules)
+        self.set_status(f"Scanned {found.summary()}")
+        files = found.files
 
         files = sorted(set(files))
         if not files:
@@ -0,0 +1,62 @@
+# view/micropore_dialog.py
+from PySide6.QtWidgets import (
+    QDialog, QFormLayout, QComboBox, QDoubleSpinBox, QHBoxLayout, QCheckBox, QDialogButtonBox, QWidget
+)
+
+from analysis.micropore import THICKNESS, MicroporeSettings
+
+
+class MicroporeDialog(QDialog):
+    """Settings for the t-plot / αs engine."""
+
+    def __init__(self, sample_names: list[str], n_selected: int, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("t-Plot / αs")
+        defaults = MicroporeSettings()
+        form = QFormLayout(self)
+
+        self.thickness = QComboBox()
+        self.thickness.addItems(sorted(THICKNESS))
+        self.thickness.setCurrentText(defaults.thickness)
+        form.addRow("Thickness equation", self.thickness)
+        self.t_lo, self.t_hi = self._range_row(form, "t range [nm]", defaults.t_range, 0.05, 3.0)
+
+        self.reference = QComboBox()
+        self.reference.addItem("Thickness equation (αs = t / t(0.4))", "thickness")
+        for name in sample_names:
+            self.reference.addItem(f"Reference sample: {name}", f"sample:{name}")
+        form.addRow("αs reference curve", self.reference)
+        self.a_lo, self.a_hi = self._range_row(form, "αs range", defaults.alpha_range, 0.0, 5.0)
+
+        self.whole_db = QCheckBox(f"Whole database (instead of {n_selected} selected)")
+        form.addRow(self.whole_db)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+    @staticmethod
+    def _range_row(form, label, values, lo, hi):
+        row = QWidget()
+        lay = QHBoxLayout(row)
+        lay.setContentsMargins(0, 0, 0, 0)
+        spins = []
+        for v in values:
+            sb = QDoubleSpinBox()
+            sb.setRange(lo, hi)
+            sb.setDecimals(3)
+            sb.setSingleStep(0.05)
+            sb.setValue(v)
+            lay.addWidget(sb)
+            spins.append(sb)
+        form.addRow(label, row)
+        return spins
+
+    def settings(self) -> MicroporeSettings:
+        return MicroporeSettings(
+            thickness=self.thickness.currentText(),
+            t_range=(self.t_lo.value(), self.t_hi.value()),
+            reference=self.reference.currentData(),
+            alpha_range=(self.a_lo.value(), self.a_hi.value()),
+        )
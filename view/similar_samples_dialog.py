@@ -0,0 +1,91 @@
+# view/similar_samples_dialog.py
+import time
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QSpinBox, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox
+)
+
+from analysis.similarity import MODES, names_for
+from view.comparison_plot_dialog import ComparisonPlotDialog
+
+
+class SimilarSamplesDialog(QDialog):
+    """K most similar samples to one sample; re-queries the in-memory index on every change."""
+
+    def __init__(self, model, index, sample_id, sample_name, names, mode="isotherm", k=10, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Similar to {sample_name}")
+        self.resize(560, 480)
+        self.model = model
+        self.index = index
+        self.sample_id = sample_id
+        self.sample_name = sample_name
+        self.names = names          # {sample_id: name}, filled lazily
+
+        lay = QVBoxLayout(self)
+        row = QHBoxLayout()
+        row.addWidget(QLabel("Compare by"))
+        self.mode = QComboBox()
+        self.mode.addItems(MODES)
+        self.mode.setCurrentText(mode)
+        row.addWidget(self.mode)
+        row.addWidget(QLabel("K"))
+        self.k = QSpinBox()
+        self.k.setRange(1, 500)
+        self.k.setValue(k)
+        row.addWidget(self.k)
+        row.addStretch(1)
+        self.timing = QLabel()
+        row.addWidget(self.timing)
+        lay.addLayout(row)
+
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["#", "Sample", "Cosine"])
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        lay.addWidget(self.table, 1)
+
+        btns = QHBoxLayout()
+        plot_btn = QPushButton("Send to Plot")
+        plot_btn.clicked.connect(self._plot)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        btns.addStretch(1)
+        btns.addWidget(plot_btn)
+        btns.addWidget(close_btn)
+        lay.addLayout(btns)
+
+        self.mode.currentTextChanged.connect(self.refresh)
+        self.k.valueChanged.connect(self.refresh)
+        self.hits = []
+        self.refresh()
+
+    def refresh(self):
+        t0 = time.perf_counter()
+        try:
+            self.hits = self.index.query(self.sample_id, self.k.value(), self.mode.currentText())
+        except (KeyError, ValueError) as e:
+            self.hits = []
+            self.timing.setText(str(e))
+        else:
+            self.timing.setText(f"{len(self.index)} samples, {(time.perf_counter() - t0) * 1000:.1f} ms")
+        missing = [sid for sid, _ in self.hits if sid not in self.names]
+        if missing:
+            self.names.update(names_for(self.model.conn, missing))
+        self.table.setRowCount(len(self.hits))
+        for r, (sid, score) in enumerate(self.hits):
+            self.table.setItem(r, 0, QTableWidgetItem(str(r + 1)))
+            self.table.setItem(r, 1, QTableWidgetItem(self.names.get(sid, str(sid))))
+            self.table.setItem(r, 2, QTableWidgetItem(f"{score:.4f}"))
+
+    def _plot(self):
+        rows = sorted({i.row() for i in self.table.selectedIndexes()}) or range(len(self.hits))
+        names = [self.sample_name] + [self.names.get(self.hits[r][0]) for r in rows]
+        names = [n for n in names if n]
+        if len(names) < 2:
+            QMessageBox.information(self, "Send to Plot", "No similar samples to plot.")
+            return
+        ComparisonPlotDialog(self.model, names, parent=self).exec()